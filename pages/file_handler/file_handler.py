@@ -10,6 +10,7 @@ from utils.components.buttons import create_button, create_logout_button, create
 from utils.grid_utils import create_ship_grid, validate_ship_grid
 from utils.logging import log_action
 from tasks.ship_balancer import update_ship_grid
+from tasks.balance_tracker import BalanceTracker
 from config.db_config import DBConfig
 
 # Initialize DBConfig
@@ -64,6 +65,7 @@ def file_handler():
         update_ship_grid(
             file_lines, st.session_state.ship_grid, st.session_state.containers
         )
+        st.session_state.balance_tracker = BalanceTracker.from_grid(st.session_state.ship_grid)
 
         # Validate grid structure
         try:
@@ -12,6 +12,11 @@ from tasks.ship_balancer import (
     calculate_balance,
     balance,
 )
+from tasks.balance_anytime import plan_balance, improve_plan, FIRST_PLAN_BUDGET_MS
+from tasks.balance_oracle import balance_oracle_for_grid
+from tasks.balance_tracker import BalanceTracker
+from tasks.plan_cache import PLAN_CACHE
+from tasks.move_plan import Move
 
 from tasks.balancing_utils import (
     plotly_visualize_grid,
@@ -64,24 +69,112 @@ def visualize_steps_with_overlay():
             "Select Movement (Sub-Step)", min_value=1, max_value=total_sub_steps, value=1, step=1
         ) - 1
         # Get current sub-step details
-        current_sub_step = selected_step[sub_step_number]
-        from_coords, to_coords = current_sub_step.replace("[", "").replace("]", "").split(" to ")
-        from_x, from_y = map(int, from_coords.split(","))
-        to_x, to_y = map(int, to_coords.split(","))
+        current_move = selected_step[sub_step_number]
         # Overlay the sub-step movement on the base grid
         overlay_plot = plotly_visualize_grid_with_overlay(
-            base_grid, (from_x, from_y), (to_x,
-                                          to_y), title=f"Movement for Container {step_number + 1}, Sub-Step {sub_step_number + 1}"
+            base_grid, current_move.start, current_move.end,
+            title=f"Movement for Container {step_number + 1}, Sub-Step {sub_step_number + 1}"
         )
         st.plotly_chart(overlay_plot, use_container_width=True)
 
 
+def apply_balance_plan(plan):
+    """
+    Shows plan as the current balancing plan, replacing any earlier one.
+    """
+    st.session_state.balance_plan = plan
+    st.session_state.steps = plan.steps
+    st.session_state.ship_grids = plan.ship_grids
+    if plan.ship_grids:
+        st.session_state.ship_grid = plan.ship_grids[-1]
+
+    # Replay the moves on the tracker instead of rescanning the final grid
+    tracker = st.session_state.initial_balance_tracker.copy()
+    for step, grid_after in zip(plan.steps, plan.ship_grids):
+        tracker.apply_step(step, grid_after)
+    st.session_state.balance_tracker = tracker
+    st.session_state.pop("final_balance_metrics", None)
+
+    # Visualize final grid
+    st.session_state.final_plot = plotly_visualize_grid(
+        st.session_state.ship_grid, title="Final Ship Grid After Balancing"
+    )
+
+
+def describe_optimality(plan):
+    """
+    How close a plan is to the best possible one, from its proven lower bound.
+
+    Returns:
+        str: "Optimal plan" or "Within X% of optimal", or None when the plan has no bound.
+    """
+    gap = plan.gap()
+    if gap is None:
+        return None
+    if plan.optimal:
+        return "Optimal plan: no plan can take less time."
+    return f"Within {gap:.0%} of optimal: no plan can take less than {plan.lower_bound} minutes."
+
+
+@st.fragment(run_every=1)
+def watch_plan_improvement():
+    """
+    Polls the background search and swaps in a cheaper plan when one arrives.
+    """
+    future = st.session_state.get("plan_future")
+    plan = st.session_state.get("balance_plan")
+    if future is None or plan is None:
+        return
+
+    if not future.done():
+        optimality = describe_optimality(plan)
+        st.info(
+            f"Current plan: {plan.minutes} minutes" + (f" ({optimality})" if optimality else "") +
+            " Searching for a better plan...")
+        return
+
+    st.session_state.plan_future = None
+    try:
+        better = future.result()
+    except Exception as e:
+        # Keep the plan already shown
+        st.error(f"The search for a better plan failed: {e}")
+        return
+    username = st.session_state.get("username", "User")
+    if better.status is True and better.minutes < plan.minutes:
+        apply_balance_plan(better)
+        log_action(username=username, action="BALANCE_PLAN_IMPROVED",
+                   notes=f"Balancing plan improved from {plan.minutes} to {better.minutes} minutes.")
+    elif better.status is True:
+        # Same plan, but the search may have tightened its bound
+        st.session_state.balance_plan = better
+    st.rerun()
+
+
 def display_total_moves_and_time():
     """
-    Count the total number of sub-steps and display the total moves and time taken.
+    Display the total crane time of the plan and where it goes.
     """
     # Check if steps exist in the session state
     if "steps" in st.session_state and st.session_state.steps:
+        plan = st.session_state.get("balance_plan")
+        if plan is not None:
+            # Crane time under the cost model, empty travel between moves included
+            cost = plan.cost
+            st.markdown(
+                f"#### 🕒 Total Time to Balance all Containers: {cost.total} minutes")
+            st.caption(
+                f"Carrying containers: {cost.loaded} min · Empty crane travel: {cost.empty} min · "
+                f"Buffer transfers: {cost.transfer} min")
+            if plan.saved:
+                st.caption(f"Move-sequence optimizer saved {plan.saved} minutes on this plan.")
+            optimality = describe_optimality(plan)
+            if optimality:
+                st.caption(optimality)
+            for line in PLAN_CACHE.describe():
+                st.caption(f"Plan cache, {line}")
+            return
+
         # Count the total number of sub-steps
         total_sub_steps = sum(len(step) for step in st.session_state.steps)
         total_time = total_sub_steps  # Each sub-step equals one minute
@@ -129,6 +222,7 @@ def balancing_page():
     # Initialize session state
     if "ship_grid" not in st.session_state:
         st.session_state.ship_grid = create_ship_grid(rows, columns)
+        st.session_state.balance_tracker = BalanceTracker.from_grid(st.session_state.ship_grid)
 
     # Use manifest from file_handler
     elif "ship_grid" in st.session_state:
@@ -145,6 +239,11 @@ def balancing_page():
     else:
         st.error(
             "No manifest available. Please upload a file in the File Handler page.")
+
+    # Side totals for the current grid; the pages that replace ship_grid rebuild them,
+    # and the plan's moves keep them up to date after balancing
+    if "balance_tracker" not in st.session_state:
+        st.session_state.balance_tracker = BalanceTracker.from_grid(st.session_state.ship_grid)
     # Display initial grid
     if st.session_state.initial_plot:
         st.subheader("Initial Ship Grid")
@@ -152,8 +251,7 @@ def balancing_page():
 
     # Display current balance
     if st.button("Calculate Initial Balance"):
-        left_balance, right_balance, _ = calculate_balance(
-            st.session_state.ship_grid)
+        left_balance, right_balance, _ = st.session_state.balance_tracker.totals()
         st.session_state.initial_balance = (left_balance, right_balance)
         # Display metrics for current balance
         st.markdown("### 🚢 **Balance Metrics Before Balancing**")
@@ -178,6 +276,11 @@ def balancing_page():
         else:
             st.error(
                 "The ship is significantly unbalanced. Balancing is highly recommended.")
+
+        oracle = balance_oracle_for_grid(st.session_state.ship_grid)
+        if not oracle.feasible and oracle.best_ratio is not None:
+            st.warning(
+                f"No layout reaches the 0.9 - 1.1 range (best achievable ratio {oracle.best_ratio:.3f}). Balancing will use SIFT.")
    # Perform balancing
     if st.button("Balance Ship"):
         # Save the initial grid only once to preserve its state
@@ -186,8 +289,7 @@ def balancing_page():
                 row.copy() for row in st.session_state.ship_grid]
         
         # Calculate balance and perform balancing
-        left_balance, right_balance, balanced = calculate_balance(
-            st.session_state.ship_grid)
+        left_balance, right_balance, balanced = st.session_state.balance_tracker.totals()
         if balanced:
             st.success("The ship is already balanced!")
         else:
@@ -196,38 +298,49 @@ def balancing_page():
             log_action(username=username, action="BALANCE_START", 
                     notes=f"{username} started ship balancing.")
 
-            # Perform balancing and get steps
-            steps, ship_grids, status = balance(
-                st.session_state.ship_grid, st.session_state.containers)
-            
-            # Store intermediate grids and steps
-            st.session_state.steps = steps
-            st.session_state.ship_grids = ship_grids  
-            st.session_state.ship_grid = ship_grids[-1]
-            
-            # Visualize final grid
-            st.session_state.final_plot = plotly_visualize_grid(
-                st.session_state.ship_grid, title="Final Ship Grid After Balancing"
-            )
-
-            # Log each substep
-            for step_number, step_list in enumerate(steps):
-                for sub_step_number, sub_step in enumerate(step_list):
-                    log_action(
-                        username=username,
-                        action="BALANCE_STEP",
-                        notes=f"{username} performed Step {step_number + 1}, Sub-Step {sub_step_number + 1}: {sub_step}"
-                    )
+            # Best plan within the first-plan budget; a background search keeps improving it
+            initial_grid = st.session_state.ship_grid
+            st.session_state.initial_balance_tracker = st.session_state.balance_tracker.copy()
+            try:
+                plan = plan_balance(initial_grid, FIRST_PLAN_BUDGET_MS, st.session_state.containers)
+            except Exception as e:
+                plan = None
+                st.error(f"Error planning the balance: {e}")
+            else:
+                if plan.status is None:
+                    st.error("No balancing or SIFT plan could be found for this ship; the grid is unchanged.")
+                    plan = None
 
-            # Display success or warning message
-            if status:
-                st.success("Ship balanced successfully!")
-                log_action(username=username, action="BALANCE_COMPLETE", 
-                        notes=f"{username} successfully balanced the ship.")
+            if plan is None:
+                log_action(username=username, action="BALANCE_FAILED",
+                           notes=f"{username} could not get a balancing plan.")
             else:
-                st.warning("Ship could not be perfectly balanced. Using SIFT.")
-                log_action(username=username, action="BALANCE_PARTIAL", 
-                        notes=f"{username} could not perfectly balance the ship.")
+                steps, status = plan.steps, plan.status
+                apply_balance_plan(plan)
+
+                previous = st.session_state.get("plan_future")
+                if previous is not None:
+                    previous.cancel()
+                st.session_state.plan_future = None if plan.optimal or not status else improve_plan(initial_grid, plan)
+
+                # Log each substep
+                for step_number, step_list in enumerate(steps):
+                    for sub_step_number, sub_step in enumerate(step_list):
+                        log_action(
+                            username=username,
+                            action="BALANCE_STEP",
+                            notes=f"{username} performed Step {step_number + 1}, Sub-Step {sub_step_number + 1}: {sub_step}"
+                        )
+
+                # Display success or warning message
+                if status:
+                    st.success("Ship balanced successfully!")
+                    log_action(username=username, action="BALANCE_COMPLETE", 
+                            notes=f"{username} successfully balanced the ship.")
+                else:
+                    st.warning("Ship could not be perfectly balanced. Using SIFT.")
+                    log_action(username=username, action="BALANCE_PARTIAL", 
+                            notes=f"{username} could not perfectly balance the ship.")
 
 
     # Tabs for navigation
@@ -245,20 +358,9 @@ def balancing_page():
                 # Use an expander for each step to make the display compact
                 with st.expander(f"Step {step_number + 1}"):
                     st.markdown(f"### Step {step_number + 1}:")
-                    for sub_step_number, sub_step in enumerate(step_list):
-                        # Parse and increment the coordinates
-                        original_step = sub_step.replace("[", "").replace("]", "")  # Remove brackets for processing
-                        from_coords, to_coords = original_step.split(" to ")  # Split into 'from' and 'to' parts
-                        from_x, from_y = map(int, from_coords.split(","))
-                        to_x, to_y = map(int, to_coords.split(","))
-                        # Increment the coordinates
-                        from_x += 1
-                        from_y += 1
-                        to_x += 1
-                        to_y += 1
-                        # Format back into the desired string
-                        incremented_step = f"[{from_x},{from_y}] to [{to_x},{to_y}]"
-                        st.write(f"{sub_step_number + 1}. {incremented_step}")
+                    for sub_step_number, move in enumerate(step_list):
+                        # Shown with 1-based coordinates, like the manifest
+                        st.write(f"{sub_step_number + 1}. {move.label()}")
 
     elif selected_tab == "Steps with Grids":
         # visualize_steps_with_grids()
@@ -273,37 +375,17 @@ def balancing_page():
             st.subheader("Summarized Steps with Plots")
 
             def summarize_steps(steps):
-                summarized_steps = []
-                for step_number, step_list in enumerate(steps):
-                    if not step_list:
-                        continue
-                    start_coords = None
-                    end_coords = None
-                    for sub_step in step_list:
-                        # Parse the coordinates
-                        from_coords, to_coords = sub_step.replace("[", "").replace("]", "").split(" to ")
-                        from_x, from_y = map(int, from_coords.split(","))
-                        to_x, to_y = map(int, to_coords.split(","))
-                        if start_coords is None:
-                            # Convert to 1-based index
-                            start_coords = (from_x + 1, from_y + 1)
-                        # Update the latest destination
-                        end_coords = (to_x + 1, to_y + 1)
-                    summarized_steps.append(
-                        f"[{start_coords[0]},{start_coords[1]}] to [{end_coords[0]},{end_coords[1]}]")
-                return summarized_steps
+                # One move from where each container starts to where it ends up
+                return [
+                    Move.between(step_list[0].start, step_list[-1].end, step_list[0].container)
+                    for step_list in steps if step_list
+                ]
             # Summarize the steps
             summarized_steps = summarize_steps(st.session_state.steps)
 
             for step_number, summary in enumerate(summarized_steps):
                 # Use an expander for each step
-                with st.expander(f"Step {step_number + 1}: {summary}"):
-                    # Extract start and end coordinates
-                    start_coords, end_coords = summary.split(" to ")
-                    start_x, start_y = map(int, start_coords.replace(
-                        "[", "").replace("]", "").split(","))
-                    end_x, end_y = map(int, end_coords.replace(
-                        "[", "").replace("]", "").split(","))
+                with st.expander(f"Step {step_number + 1}: {summary.label()}"):
                     # Get the base grid for this step
                     base_grid = (
                         st.session_state.ship_grids[step_number - 1]
@@ -318,8 +400,7 @@ def balancing_page():
                         for row_idx, row in enumerate(grid):
                             z_row = []
                             for col_idx, slot in enumerate(row):
-                                # Convert back to 0-based index
-                                if (row_idx, col_idx) == (start[0] - 1, start[1] - 1):
+                                if (row_idx, col_idx) == start:
                                     # Starting position (semi-transparent red)
                                     z_row.append(2)
                                     if slot.container:
@@ -337,8 +418,7 @@ def balancing_page():
                                                     size=12, color="white"),
                                             )
                                         )
-                                # Convert back to 0-based index
-                                elif (row_idx, col_idx) == (end[0] - 1, end[1] - 1):
+                                elif (row_idx, col_idx) == end:
                                     z_row.append(3)  # Ending position (green)
                                     annotations.append(
                                         dict(
@@ -406,13 +486,13 @@ def balancing_page():
                         )
                         return fig
                     # Plot for this summarized step
-                    plot = plot_grid_with_summary(
-                        base_grid, (start_x, start_y), (end_x, end_y))
+                    plot = plot_grid_with_summary(base_grid, summary.start, summary.end)
                     st.plotly_chart(plot, use_container_width=True)
 
     print("Steps in session state:", st.session_state.get(
         "steps", "No steps recorded"))
     display_total_moves_and_time()
+    watch_plan_improvement()
 
     # Display final grid after balancing
     if st.session_state.final_plot:
@@ -422,8 +502,7 @@ def balancing_page():
         # Check if final balance metrics are already stored in session state
         if "final_balance_metrics" not in st.session_state:
             # Calculate and save the final balance metrics
-            left_balance_final, right_balance_final, _ = calculate_balance(
-                st.session_state.ship_grid)
+            left_balance_final, right_balance_final, _ = st.session_state.balance_tracker.totals()
             total_weight_final = left_balance_final + right_balance_final
             st.session_state.final_balance_metrics = {
                 "left_balance": left_balance_final,
@@ -1,5 +1,8 @@
 import streamlit as st
 from tasks.ship_loader import load_containers, unload_containers
+from tasks.transfer_planner import transfer_containers
+from tasks.plan_cache import PLAN_CACHE
+from tasks.balance_tracker import BalanceTracker
 from utils.grid_utils import create_ship_grid, plotly_visualize_grid
 from utils.components.buttons import (
     create_navigation_button,
@@ -13,6 +16,7 @@ import os
 def initialize_session_state(rows, cols):
     if "ship_grid" not in st.session_state:
         st.session_state.ship_grid = create_ship_grid(rows, cols)
+        st.session_state.balance_tracker = BalanceTracker.from_grid(st.session_state.ship_grid)
     if "messages" not in st.session_state:
         st.session_state.messages = []
     if "total_cost" not in st.session_state:
@@ -31,6 +35,8 @@ def initialize_session_state(rows, cols):
         st.session_state.load_steps = []
     if "unload_steps" not in st.session_state:
         st.session_state.unload_steps = []
+    if "transfer_steps" not in st.session_state:
+        st.session_state.transfer_steps = []
 
 
 def reset_loading_state():
@@ -54,7 +60,7 @@ def loading_task():
 
     # Action selection
     tab = st.radio("Choose Action", [
-                   "Load Containers", "Unload Containers"], horizontal=True)
+                   "Load Containers", "Unload Containers", "Load and Unload"], horizontal=True)
 
     # Step visualization based on selected tab
     if tab == "Load Containers" and st.session_state.load_steps:
@@ -80,6 +86,15 @@ def loading_task():
         st.info(f"Step Cost: {step_data['cost']} seconds")
         for msg in step_data['messages']:
             st.write(msg)
+
+    elif tab == "Load and Unload" and st.session_state.transfer_steps:
+        step_names = [f"{i}. {step['name']}" for i, step in enumerate(st.session_state.transfer_steps)]
+        step = st.selectbox("View transfer steps:", options=step_names)
+        step_data = st.session_state.transfer_steps[step_names.index(step)]
+        plotly_visualize_grid(step_data['grid'], title=f"Ship Grid - {step_data['name']}")
+        st.info(f"Step Cost: {step_data['cost']} seconds")
+        for msg in step_data['messages']:
+            st.write(msg)
     else:
         plotly_visualize_grid(st.session_state.ship_grid,
                               title="Current Ship Grid")
@@ -124,6 +139,7 @@ def loading_task():
                     st.session_state.container_weights
                 )
                 st.session_state.ship_grid = updated_grid
+                st.session_state.balance_tracker = BalanceTracker.from_grid(updated_grid)
                 st.session_state.messages.extend(messages)
                 st.session_state.total_cost += cost
                 st.session_state.load_steps = steps
@@ -150,6 +166,7 @@ def loading_task():
                     st.session_state.ship_grid, container_names
                 )
                 st.session_state.ship_grid = updated_grid
+                st.session_state.balance_tracker = BalanceTracker.from_grid(updated_grid)
                 st.session_state.messages.extend(messages)
                 st.session_state.total_cost += cost
                 st.session_state.unload_steps = steps
@@ -162,9 +179,65 @@ def loading_task():
             else:
                 st.error("Please provide valid container names.")
 
+    elif tab == "Load and Unload":
+        st.subheader("Load and Unload Containers")
+        unload_input = st.text_input(
+            "Container Names to Unload (comma-separated)",
+            placeholder="Enter container names (e.g., Alpha,Beta,Gamma)",
+            key="transfer_unload_names"
+        )
+        load_input = st.text_input(
+            "Container Names to Load (comma-separated)",
+            placeholder="Enter container names (e.g., Delta,Echo)",
+            key="transfer_load_names"
+        )
+        unload_names = [name.strip() for name in unload_input.split(",") if name.strip()]
+        load_names = [name.strip() for name in load_input.split(",") if name.strip()]
+        load_weights = {
+            name: st.number_input(
+                f"Weight for '{name}' (kg):",
+                min_value=0,
+                max_value=99999,
+                step=1,
+                format="%d",
+                key=f"transfer_{name}_weight"
+            )
+            for name in load_names
+        }
+
+        if st.button("Plan Transfer"):
+            if unload_names or load_names:
+                plan = transfer_containers(
+                    st.session_state.ship_grid, unload_names, load_names, load_weights
+                )
+                if not plan.complete:
+                    # Leave the ship as it is rather than apply part of a plan
+                    for message in plan.messages:
+                        if message.startswith("Error"):
+                            st.error(message)
+                else:
+                    st.session_state.ship_grid = plan.grid
+                    st.session_state.balance_tracker = BalanceTracker.from_grid(plan.grid)
+                    st.session_state.messages.extend(plan.messages)
+                    st.session_state.total_cost += plan.seconds
+                    st.session_state.transfer_steps = plan.steps
+
+                    # Log user action
+                    for name in unload_names:
+                        log_action(username=username, action="UNLOAD",
+                                   notes=f"{username} unloaded {name}")
+                    for name in load_names:
+                        log_action(username=username, action="LOAD",
+                                   notes=f"{username} loaded {name}")
+                    st.rerun()
+            else:
+                st.error("Please provide container names to load or unload.")
+
     # Display total cost
     st.subheader("Operation Summary")
     st.info(f"Total Operation Cost: {st.session_state.total_cost} seconds")
+    for line in PLAN_CACHE.describe():
+        st.caption(f"Plan cache, {line}")
 
     # Manifest handling
     st.subheader("Update/Download Manifest")
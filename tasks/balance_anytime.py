@@ -0,0 +1,219 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tasks.ship_balancer import balance, calculate_balance
+from tasks.balance_oracle import BalanceOracle, side_capacities
+from tasks.balance_search import (
+    MAX_EXPANSIONS,
+    balance_lower_bound,
+    check_plan,
+    read_columns,
+    replay_moves,
+    search_balance_plan,
+)
+from tasks.balance_layout import layout_moves
+from tasks.balance_beam import search_beam_plan
+from tasks.crane_cost import DEFAULT_COST_MODEL, CostBreakdown
+from tasks.plan_cache import PLAN_CACHE, plan_key
+from tasks.plan_optimizer import optimize_moves, optimize_plan
+from tasks.sift_planner import sift_balance, sift_lower_bound, sift_targets
+
+
+# Wall-clock budget for the plan shown as soon as the operator presses "Balance Ship"
+FIRST_PLAN_BUDGET_MS = 250
+
+# Wall-clock budget for the background search that tries to beat it
+IMPROVE_BUDGET_MS = 10000
+
+# One worker: a newer request queues behind the running search instead of competing with it
+EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+
+class BalancePlan:
+    """
+    A balancing plan together with its cost and a proven bound on the best cost.
+
+    steps, ship_grids and status are what balance() returns, except that status
+    is None, with no steps, when no planner found a plan at all. cost is the plan's
+    CostBreakdown under the crane cost model, minutes its total, and lower_bound a
+    proven lower bound on the cheapest plan of the same kind (balancing, or SIFT
+    when status is False), or None when there is none. moves
+    holds the (src, dst) column moves when the plan came from the column planners,
+    so a later search can use it as the plan to beat. saved is what the post-plan
+    optimizer took off the planner's own plan, in minutes.
+    """
+
+    def __init__(self, steps, ship_grids, status, cost, lower_bound, moves=None, source="", saved=0):
+        self.steps = steps
+        self.ship_grids = ship_grids
+        self.status = status
+        self.cost = cost
+        self.minutes = cost.total
+        self.lower_bound = lower_bound
+        self.moves = moves
+        self.source = source
+        self.saved = saved
+
+    @property
+    def optimal(self):
+        """True when no plan of the same kind can be cheaper than this one."""
+        return self.lower_bound is not None and self.minutes <= self.lower_bound
+
+    def gap(self):
+        """Fraction the plan may exceed the optimum by, or None without a bound."""
+        if self.lower_bound is None:
+            return None
+        if self.lower_bound == 0:
+            return 0.0 if self.minutes == 0 else None
+        return max(self.minutes - self.lower_bound, 0) / self.lower_bound
+
+
+def plan_from_moves(ship_grid, moves, lower_bound, source, cost_model, saved=0):
+    """Replays column moves on a copy of ship_grid and wraps them in a BalancePlan."""
+    steps, ship_grids = replay_moves(ship_grid, moves)
+    floors, stacks, _ = read_columns(ship_grid)
+    cost = cost_model.column_plan(len(ship_grid), floors, stacks, moves)
+    return BalancePlan(steps, ship_grids, True, cost, max(lower_bound, 0), moves, source, saved)
+
+
+def plan_balance(ship_grid, budget_ms=FIRST_PLAN_BUDGET_MS, containers=None, incumbent=None,
+                 max_expansions=MAX_EXPANSIONS, cost_model=None):
+    """
+    Anytime balancing: the best plan found within a wall-clock budget.
+
+    The two-phase layout planner (or, when it is stuck, the beam search) gives a
+    valid plan in milliseconds; A* then spends the rest of the budget looking for a
+    cheaper one, pruned by the plan in hand. When A* finishes, the result is proven
+    optimal; when time runs out, its open list still proves a lower bound. If
+    none of them has a plan by then, the greedy balance() is tried, then SIFT;
+    a plan either of them makes is only taken once check_plan() accepts it, and
+    when both fail the plan returned has status None instead of raising.
+    ship_grid is not modified, so the call is safe to run
+    on a worker thread while the page shows an earlier plan. The best plan known for
+    a grid is kept in the plan cache, background improvements included, and a fresh
+    request for the same grid starts from it instead of planning again.
+
+    Args:
+        ship_grid (list): The current ship grid.
+        budget_ms (float): Wall-clock budget in milliseconds.
+        containers (list): Locations of the containers, only needed by the greedy fallback.
+        incumbent (BalancePlan): A plan already shown for this grid, to improve on.
+        max_expansions (int): Cap on A* states, which bounds memory as well as time.
+        cost_model (CraneCostModel): Prices the plans; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        BalancePlan: The cheapest plan found, never worse than incumbent.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    key = plan_key("balance plan", ship_grid, cost_model)
+    if incumbent is None:
+        cached = PLAN_CACHE.get("balance plan", key)
+        if cached is not None:
+            return cached
+
+    plan = search_plan(ship_grid, budget_ms, containers, incumbent, max_expansions, cost_model)
+    if plan.status is not None:
+        PLAN_CACHE.put("balance plan", key, plan)
+    return plan
+
+
+def sift_plan(ship_grid, floors, stacks, weights, cost_model):
+    """SIFT as a BalancePlan with status False, or the no-plan BalancePlan if the SIFT planner has none."""
+    steps, ship_grids = sift_balance([row[:] for row in ship_grid], cost_model)
+    if steps is None:
+        return BalancePlan([], [], None, CostBreakdown(), None, None, "none")
+    steps, ship_grids, saved = optimize_plan(ship_grid, steps, ship_grids, cost_model)
+    lower_bound = sift_lower_bound(stacks, sift_targets(len(ship_grid), floors, weights), weights)
+    return BalancePlan(steps, ship_grids, False, cost_model.step_plan(ship_grid, steps, ship_grids),
+                       lower_bound, None, "sift", saved)
+
+
+def search_plan(ship_grid, budget_ms, containers, incumbent, max_expansions, cost_model):
+    """Does the work of plan_balance() for a grid that is not in the plan cache."""
+    deadline = time.perf_counter() + budget_ms / 1000
+
+    left_balance, right_balance, balanced = calculate_balance(ship_grid)
+    if balanced:
+        return BalancePlan([], [], True, CostBreakdown(), 0, [], "balanced")
+    if incumbent is not None and incumbent.optimal:
+        return incumbent
+
+    rows, cols = len(ship_grid), len(ship_grid[0])
+    floors, stacks, grid_containers = read_columns(ship_grid)
+    weights = [container.weight for container in grid_containers]
+    oracle = BalanceOracle(weights, *side_capacities(ship_grid))
+
+    if not oracle.feasible:
+        print("Balance could not be achieved, beginning SIFT...")
+        return sift_plan(ship_grid, floors, stacks, weights, cost_model)
+
+    lower_bound = balance_lower_bound(stacks, weights, left_balance, right_balance, cols // 2, oracle, floors, rows,
+                                      cost_model.park(rows))
+    if incumbent is not None and incumbent.lower_bound is not None:
+        lower_bound = max(lower_bound, incumbent.lower_bound)
+
+    best = incumbent if incumbent is not None and incumbent.moves is not None else None
+    if best is None:
+        moves = layout_moves(rows, floors, stacks, weights, oracle, cost_model)
+        if moves is not None:
+            moves, before, after = optimize_moves(rows, floors, stacks, moves, cost_model)
+            best = plan_from_moves(ship_grid, moves, lower_bound, "layout", cost_model, before.total - after.total)
+        else:
+            # The layout planner is stuck (full parking columns, usually); a beam
+            # plan still gives A* a bound to prune against
+            moves, _ = search_beam_plan(rows, floors, stacks, weights, oracle=oracle, cost_model=cost_model)
+            if moves is not None:
+                moves, before, after = optimize_moves(rows, floors, stacks, moves, cost_model)
+                best = plan_from_moves(ship_grid, moves, lower_bound, "beam", cost_model, before.total - after.total)
+
+    upper_bound = best.minutes if best is not None else None
+    moves, minutes, status = search_balance_plan(
+        rows, floors, stacks, weights, max_expansions, oracle, deadline, upper_bound, cost_model
+    )
+
+    if status is True:
+        # A* finished below the bound, so this plan is optimal
+        return plan_from_moves(ship_grid, moves, minutes, "astar", cost_model)
+
+    if status is False and best is not None:
+        # Nothing cheaper than the plan in hand exists
+        lower_bound = best.minutes
+    elif status is None:
+        lower_bound = max(lower_bound, minutes)
+
+    if best is None:
+        grid = [row[:] for row in ship_grid]
+        if containers is None:
+            containers = [[r, c] for r in range(rows) for c in range(cols) if grid[r][c].hasContainer]
+        try:
+            steps, ship_grids, status = balance(grid, containers)
+            check_plan(ship_grid, steps)
+        except (ValueError, IndexError) as error:
+            # The greedy planner's own SIFT fallback fails on crowded ships
+            print(f"Greedy balancing failed: {error}")
+            status = None
+        if status is not True:
+            return sift_plan(ship_grid, floors, stacks, weights, cost_model)
+        steps, ship_grids, saved = optimize_plan(ship_grid, steps, ship_grids, cost_model)
+        return BalancePlan(steps, ship_grids, status, cost_model.step_plan(ship_grid, steps, ship_grids),
+                           lower_bound, None, "greedy", saved)
+
+    return BalancePlan(best.steps, best.ship_grids, True, best.cost, min(lower_bound, best.minutes),
+                       best.moves, best.source, best.saved)
+
+
+def improve_plan(ship_grid, plan, budget_ms=IMPROVE_BUDGET_MS, cost_model=None):
+    """
+    Keeps searching for a cheaper plan on the background worker.
+
+    Args:
+        ship_grid (list): The grid plan was made for; copied before the worker sees it.
+        plan (BalancePlan): The plan currently shown.
+        budget_ms (float): Wall-clock budget for the search.
+        cost_model (CraneCostModel): The model plan was priced with.
+
+    Returns:
+        concurrent.futures.Future: Resolves to a BalancePlan no worse than plan.
+    """
+    grid = [row[:] for row in ship_grid]
+    return EXECUTOR.submit(plan_balance, grid, budget_ms, None, plan, MAX_EXPANSIONS * 10, cost_model)
@@ -0,0 +1,247 @@
+import os
+from itertools import chain
+
+from tasks.ship_balancer import Slot, balance, calculate_balance
+from tasks.balance_oracle import BalanceOracle, side_capacities
+from tasks.balance_bounds import BalanceBounds
+from tasks.balance_search import is_balanced, read_columns, replay_moves, move_minutes, weight_classes
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.plan_optimizer import optimize_moves
+from tasks.sift_planner import sift_fallback
+
+
+# Partial plans kept per depth; set BEAM_WIDTH in the environment to trade plan quality for latency
+BEAM_WIDTH = int(os.getenv("BEAM_WIDTH", "16"))
+
+# Moves per container before the beam gives up on reaching balance
+MAX_DEPTH_PER_CONTAINER = 2
+
+# Depths searched past the first balanced plan for a cheaper one
+EXTRA_DEPTHS = 2
+
+# Depths the best score in the beam may go without improving before the search gives up
+STALL_DEPTHS = 12
+
+
+def column_candidates(c, stack, weights, halfway_line, cache):
+    """(minutes, weight) of sending each container of a column across the keel line, cheapest first."""
+    key = (c, stack)
+    if key not in cache:
+        distance = halfway_line - c if c < halfway_line else c - halfway_line + 1
+        cache[key] = [(distance + 2 * depth, weights[idx]) for depth, idx in enumerate(reversed(stack))]
+    return cache[key]
+
+
+def deficit_estimate(stacks, weights, left_balance, right_balance, halfway_line, oracle=None, cache=None):
+    """
+    Estimates the crane minutes still needed to balance the ship, for ranking beams.
+
+    Unlike balance_lower_bound() this is a guess, not a bound: every heavy-side
+    container is charged its column distance to the keel line plus two minutes for
+    each container stacked on it, and the estimate is the cheapest run of the
+    cheapest containers whose weight covers the deficit. Charging for blockers is
+    what keeps partial plans that dig out a heavy container in the beam.
+
+    Args:
+        cache (dict): Per-column candidate lists shared across calls; a move only
+            changes two columns, so most of them carry over between states.
+    """
+    if is_balanced(left_balance, right_balance):
+        return 0
+
+    heavy_is_left = left_balance > right_balance
+    heavy, light = (left_balance, right_balance) if heavy_is_left else (right_balance, left_balance)
+    if oracle is not None and oracle.feasible:
+        deficit = oracle.transfer_needed(left_balance) - 0.5
+    elif heavy_is_left:
+        deficit = (heavy - 1.1 * light) / 2.1
+    else:
+        deficit = (0.9 * heavy - light) / 1.9
+
+    cache = {} if cache is None else cache
+    heavy_columns = range(halfway_line) if heavy_is_left else range(halfway_line, len(stacks))
+    candidates = sorted(chain.from_iterable(
+        column_candidates(c, stacks[c], weights, halfway_line, cache) for c in heavy_columns
+    ))
+
+    best, spent, moved = None, 0, 0
+    for cost, weight in candidates:
+        if moved + weight > deficit and (best is None or spent + cost < best):
+            best = spent + cost
+        spent += cost
+        moved += weight
+        if best is not None and spent >= best:
+            break
+    return best if best is not None else spent
+
+
+def search_beam_plan(rows, floors, stacks, weights, width=None, oracle=None, cost_model=None, max_depth=None):
+    """
+    Beam search over whole-ship states for a cheap balancing plan.
+
+    States are expanded a move at a time like in search_balance_plan(), but only the
+    width partial plans with the lowest crane minutes so far plus deficit_estimate()
+    survive each depth, so the work per depth is fixed by the width. Once a balanced
+    plan turns up, the search goes EXTRA_DEPTHS further at most, and stops sooner
+    when no partial plan left in the beam scores below it or the plan meets the
+    BalanceBounds lower bound, which no plan can beat. A beam whose best score has
+    not improved for STALL_DEPTHS depths is wandering and is given up.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        floors (list): NAN floor height of each column.
+        stacks (list): Container indices of each column, bottom up; not modified.
+        weights (list): Weight of each container index.
+        width (int): Beam width; BEAM_WIDTH when omitted.
+        oracle (BalanceOracle): Tightens the deficit estimate when given.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+        max_depth (int): Move limit; MAX_DEPTH_PER_CONTAINER per container when omitted.
+
+    Returns:
+        tuple: (moves, minutes) for the cheapest balanced plan found, or (None, None).
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    width = max(1, width or BEAM_WIDTH)
+    if max_depth is None:
+        max_depth = MAX_DEPTH_PER_CONTAINER * max(1, len(weights))
+
+    cols = len(stacks)
+    halfway_line = cols // 2
+    park = cost_model.park(rows)
+
+    # Containers of equal weight are interchangeable, so their orderings are one state
+    stacks, weights = weight_classes(stacks, weights)
+    total_weight = sum(weights[label] for stack in stacks for label in stack)
+
+    start = (tuple(tuple(stack) for stack in stacks), -1)
+    left = sum(weights[label] for c in range(halfway_line) for label in stacks[c])
+    if is_balanced(left, total_weight - left):
+        return [], 0
+
+    bound = BalanceBounds.from_stacks(floors, stacks, weights, halfway_line, oracle, rows).minutes_needed(park)
+
+    # (score, g, node, left, moves)
+    beam = [(0, 0, start, left, [])]
+    seen = {start: 0}
+    best = None
+    cache = {}
+    best_score, stalled = float("inf"), 0
+
+    for depth in range(max_depth):
+        children = {}
+        for _, g, (state, crane_col), left, moves in beam:
+            heights = [floors[c] + len(state[c]) for c in range(cols)]
+            crane = park if crane_col == -1 else (heights[crane_col] - 1, crane_col)
+            for src in range(cols):
+                if not state[src]:
+                    continue
+                idx = state[src][-1]
+                empty = cost_model.empty_travel(heights, crane, (heights[src] - 1, src))
+                for dst in range(cols):
+                    if dst == src:
+                        continue
+                    if (src < halfway_line) == (dst < halfway_line) != (left > total_weight - left):
+                        # Reshuffling the light side never brings balance closer
+                        continue
+                    minutes = move_minutes(heights, src, dst, rows)
+                    if minutes == -1:
+                        continue
+
+                    child_g = g + empty + minutes * cost_model.loaded_minutes
+                    if best is not None and child_g >= best[0]:
+                        continue
+
+                    child = list(state)
+                    child[src] = state[src][:-1]
+                    child[dst] = state[dst] + (idx,)
+                    child = (tuple(child), dst)
+                    if child_g >= seen.get(child, float("inf")):
+                        continue
+                    seen[child] = child_g
+
+                    child_left = left
+                    if src < halfway_line <= dst:
+                        child_left -= weights[idx]
+                    elif dst < halfway_line <= src:
+                        child_left += weights[idx]
+
+                    if is_balanced(child_left, total_weight - child_left):
+                        if best is None:
+                            last_depth = depth + EXTRA_DEPTHS
+                        best = (child_g, moves + [(src, dst)])
+                        continue
+                    children[child] = (child_g, child_left, moves + [(src, dst)])
+
+        if best is not None and best[0] <= bound:
+            # Proven optimal; nothing deeper can be cheaper
+            break
+
+        scored = []
+        for node, (child_g, child_left, moves) in children.items():
+            if seen[node] < child_g:
+                continue
+            h = deficit_estimate(node[0], weights, child_left, total_weight - child_left, halfway_line, oracle, cache)
+            if best is None or child_g + h < best[0]:
+                scored.append((child_g + h, child_g, node, child_left, moves))
+        if not scored:
+            break
+
+        scored.sort(key=lambda entry: entry[:2])
+        beam = scored[:width]
+        if best is not None and (best[0] <= beam[0][0] or depth >= last_depth):
+            break
+
+        if beam[0][0] < best_score:
+            best_score, stalled = beam[0][0], 0
+        else:
+            stalled += 1
+            if best is None and stalled >= STALL_DEPTHS:
+                break
+
+    if best is None:
+        return None, None
+    return best[1], best[0]
+
+
+def beam_balance(ship_grid, containers, width=None, cost_model=None):
+    """
+    Balances the ship with a beam search of the given width.
+
+    Drop-in for balance(): a width of 1 behaves like a look-ahead-free greedy
+    planner, and wider beams approach the A* plan at a cost that grows linearly
+    with the width instead of with the search space. Manifests no split can
+    balance go to SIFT; if the beam runs out of moves, balance() takes over.
+
+    Args:
+        ship_grid (list): The current ship grid, left in its final layout.
+        containers (list): Locations of the containers on the ship.
+        width (int): Beam width; BEAM_WIDTH when omitted.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        tuple: (steps, ship_grids, status) like balance(); status is None, with no
+        moves, when the ship needs SIFT and sift_balance() finds no plan.
+    """
+    _, _, balanced = calculate_balance(ship_grid)
+    if balanced:
+        return [], [], True
+
+    rows = len(ship_grid)
+    floors, stacks, grid_containers = read_columns(ship_grid)
+    weights = [container.weight for container in grid_containers]
+    oracle = BalanceOracle(weights, *side_capacities(ship_grid))
+    if not oracle.feasible:
+        print("Balance could not be achieved, beginning SIFT...")
+        return sift_fallback(ship_grid, cost_model)
+
+    moves, _ = search_beam_plan(rows, floors, stacks, weights, width, oracle, cost_model)
+    if moves is None:
+        return balance(ship_grid, containers)
+    moves, _, _ = optimize_moves(rows, floors, stacks, moves, cost_model)
+
+    steps, ship_grids = replay_moves(ship_grid, moves)
+    if ship_grids:
+        for r, row in enumerate(ship_grids[-1]):
+            ship_grid[r][:] = [Slot(slot.container, slot.hasContainer, slot.available) for slot in row]
+
+    return steps, ship_grids, True
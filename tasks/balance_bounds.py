@@ -0,0 +1,282 @@
+import bisect
+from functools import lru_cache
+from itertools import accumulate
+
+
+def is_balanced(left_balance, right_balance):
+    """Applies the same 0.9 - 1.1 rule as calculate_balance."""
+    if left_balance == 0 and right_balance == 0:
+        return True
+    if right_balance == 0:
+        return False
+    return 0.9 < left_balance / right_balance < 1.1
+
+
+def weight_deficit(left_balance, right_balance, oracle=None):
+    """
+    Weight the heavy side must give away before the ship can be balanced.
+
+    A transfer balances the ship once the weight moved is strictly greater than
+    the deficit. With a BalanceOracle the deficit is measured to the nearest split
+    that is actually reachable rather than to the edge of the 0.9 - 1.1 window.
+
+    Returns:
+        float: The deficit, or None if the ship is already balanced.
+    """
+    if is_balanced(left_balance, right_balance):
+        return None
+
+    if oracle is not None and oracle.feasible:
+        # Integer weights: covering the transfer exactly is enough
+        return oracle.transfer_needed(left_balance) - 0.5
+    if left_balance > right_balance:
+        # Smallest transfer t with (heavy - t) / (light + t) < 1.1
+        return (left_balance - 1.1 * right_balance) / 2.1
+    # Smallest transfer t with (light + t) / (heavy - t) > 0.9
+    return (0.9 * right_balance - left_balance) / 1.9
+
+
+@lru_cache(maxsize=None)
+def crossing_distances(count, halfway_line, capacities=None):
+    """
+    Columns from each column to the nearest usable column across the keel line.
+
+    Args:
+        count (int): Number of columns.
+        halfway_line (int): First starboard column.
+        capacities (tuple): Non-NAN slots of each column; every column counts as
+            usable when omitted, which gives the distance to the keel line itself.
+
+    Returns:
+        tuple: Distance per column, None where no column across is usable.
+    """
+    distances = []
+    for c in range(count):
+        across = range(halfway_line, count) if c < halfway_line else range(halfway_line)
+        distances.append(min((abs(c - d) for d in across if capacities is None or capacities[d] > 0), default=None))
+    return tuple(distances)
+
+
+class BalanceBounds:
+    """
+    Admissible lower bounds on the moves and crane minutes still needed to balance.
+
+    Three tables back the bounds. Each side keeps its container weights sorted,
+    with prefix sums of the heaviest first, so the fewest containers that can cover
+    a deficit is one bisect. Each column keeps its containers bottom up, so the
+    number of containers sitting on any of them is known, and each column knows its
+    distance to the nearest column on the other side that has any slot at all.
+    Like BalanceTracker the tables are built with one scan and then kept current
+    per container added, removed or moved; prefix sums are only rebuilt for a side
+    that changed, the next time a bound is read.
+
+    Every container the heavy side gives away crosses the keel line, which costs at
+    least its column's distance in loaded travel, and every container lifted off it
+    first costs at least one more minute. The hook covers at least the Manhattan
+    distance between two cells, so the bounds stay admissible under any
+    CraneCostModel that charges at least one minute per cell, loaded or empty.
+
+    Args:
+        columns (list): (row, weight) of the containers of each column, bottom up.
+        halfway_line (int): First starboard column.
+        oracle (BalanceOracle): Measures the deficit to a reachable split when given.
+        capacities (list): Non-NAN slots of each column; every column counts as
+            usable when omitted.
+    """
+
+    def __init__(self, columns, halfway_line, oracle=None, capacities=None):
+        self.columns = [list(column) for column in columns]
+        self.halfway_line = halfway_line
+        self.oracle = oracle
+        self.capacities = None if capacities is None else tuple(capacities)
+        self.sides = tuple(
+            sorted(weight for c in self.side_columns(side) for _, weight in self.columns[c]) for side in (0, 1)
+        )
+        self.totals = [sum(weights) for weights in self.sides]
+        self._prefix = [None, None]
+        self.distances = crossing_distances(len(self.columns), halfway_line, self.capacities)
+
+    @classmethod
+    def from_stacks(cls, floors, stacks, weights, halfway_line, oracle=None, rows=None):
+        """
+        Builds the tables from the column view read_columns() returns.
+
+        Args:
+            floors (list): NAN floor height of each column.
+            stacks (list): Container indices of each column, bottom up.
+            weights (list): Weight of each container index.
+            halfway_line (int): First starboard column.
+            oracle (BalanceOracle): Measures the deficit to a reachable split when given.
+            rows (int): Number of rows in the grid; without it every column counts as usable.
+        """
+        columns = [[(floors[c] + i, weights[idx]) for i, idx in enumerate(stack)] for c, stack in enumerate(stacks)]
+        capacities = None if rows is None else [rows - floor for floor in floors]
+        return cls(columns, halfway_line, oracle, capacities)
+
+    @classmethod
+    def from_state(cls, state, oracle=None):
+        """Builds the tables from a ShipState."""
+        columns = [[] for _ in range(state.columns)]
+        for r, c in state.container_locations():
+            columns[c].append((r, state.weights[r, c].item()))
+        capacities = [state.rows - int(floor) for floor in state.floors]
+        return cls(columns, state.columns // 2, oracle, capacities)
+
+    def copy(self):
+        bounds = BalanceBounds.__new__(BalanceBounds)
+        bounds.columns = [list(column) for column in self.columns]
+        bounds.halfway_line = self.halfway_line
+        bounds.oracle = self.oracle
+        bounds.capacities = self.capacities
+        bounds.sides = (list(self.sides[0]), list(self.sides[1]))
+        bounds.totals = list(self.totals)
+        bounds._prefix = list(self._prefix)
+        bounds.distances = self.distances
+        return bounds
+
+    def _side(self, column):
+        return 0 if column < self.halfway_line else 1
+
+    def _count(self, weight, column):
+        side = self._side(column)
+        bisect.insort(self.sides[side], weight)
+        self.totals[side] += weight
+        self._prefix[side] = None
+
+    def _uncount(self, weight, column):
+        side = self._side(column)
+        weights = self.sides[side]
+        del weights[bisect.bisect_left(weights, weight)]
+        self.totals[side] -= weight
+        self._prefix[side] = None
+
+    def add(self, weight, row, column):
+        """Counts a container placed at (row, column)."""
+        bisect.insort(self.columns[column], (row, weight))
+        self._count(weight, column)
+
+    def remove(self, row, column):
+        """Stops counting the container at (row, column). Returns its weight."""
+        stack = self.columns[column]
+        i = bisect.bisect_left(stack, (row,))
+        _, weight = stack.pop(i)
+        self._uncount(weight, column)
+        return weight
+
+    def apply_move(self, from_pos, to_pos):
+        """Updates the tables for a container moved between two cells."""
+        weight = self.remove(*from_pos)
+        self.add(weight, *to_pos)
+
+    def heaviest_first(self, side):
+        """Prefix sums of one side's weights, heaviest container first."""
+        if self._prefix[side] is None:
+            self._prefix[side] = list(accumulate(reversed(self.sides[side])))
+        return self._prefix[side]
+
+    def deficit(self):
+        """(heavy side, weight it must give away), or None if the ship is balanced."""
+        left_balance, right_balance = self.totals
+        deficit = weight_deficit(left_balance, right_balance, self.oracle)
+        if deficit is None:
+            return None
+        return (0 if left_balance > right_balance else 1), deficit
+
+    def side_columns(self, side):
+        """Columns of port (0) or starboard (1)."""
+        return range(self.halfway_line) if side == 0 else range(self.halfway_line, len(self.columns))
+
+    def _dig_depth(self, heavy, deficit):
+        """
+        Fewest containers stacked on top of one another that some crossing container must have.
+
+        The containers at depth below j in every heavy column weigh W(j); while
+        W(j) does not cover the deficit, some container at depth j or deeper has
+        to cross, and everything above it has to be lifted off first.
+        """
+        columns = [self.columns[c] for c in self.side_columns(heavy) if self.columns[c]]
+        moved, depth = 0, 0
+        while columns:
+            moved += sum(column[-1 - depth][1] for column in columns)
+            if moved > deficit:
+                return depth
+            depth += 1
+            columns = [column for column in columns if len(column) > depth]
+        return depth
+
+    def moves_needed(self):
+        """Admissible bound on the container moves still needed to balance the ship."""
+        deficit = self.deficit()
+        if deficit is None:
+            return 0
+        heavy, deficit = deficit
+        prefix = self.heaviest_first(heavy)
+        crossing = bisect.bisect_right(prefix, deficit) + 1
+        return max(1, min(crossing, len(prefix)), self._dig_depth(heavy, deficit) + 1)
+
+    def _approach(self, heavy, crane):
+        """Cells from the hook to the nearest heavy-side container."""
+        if crane is None:
+            return 0
+        r0, c0 = crane
+        nearest = None
+        for c in self.side_columns(heavy):
+            column = self.columns[c]
+            if not column:
+                continue
+            bottom, top = column[0][0], column[-1][0]
+            rise = r0 - top if r0 > top else (bottom - r0 if r0 < bottom else 0)
+            cells = rise + abs(c0 - c)
+            if nearest is None or cells < nearest:
+                nearest = cells
+        return nearest or 0
+
+    def _cheapest(self, heavy, needed, distances):
+        """
+        Sum of the needed smallest per-container distances on the heavy side.
+
+        Distances across the keel line only grow outwards from it, so columns are
+        taken from the keel line out, without sorting.
+        """
+        columns = self.side_columns(heavy)
+        total = 0
+        for c in reversed(columns) if heavy == 0 else columns:
+            if needed <= 0 or distances[c] is None:
+                break
+            take = min(len(self.columns[c]), needed)
+            total += take * distances[c]
+            needed -= take
+        return total
+
+    def minutes_needed(self, crane=None):
+        """
+        Admissible bound on the crane minutes still needed to balance the ship.
+
+        The larger of two bounds, both starting with the hook's trip to the first
+        heavy-side container it picks. Either the fewest containers that can cover
+        the deficit each cross the keel line and, after the first, the hook comes
+        back for them; or the hook digs down to a container that has to cross,
+        lifting every container above it off and returning to the column each time.
+
+        Args:
+            crane (tuple): (row, column) of the hook; the approach is not counted when omitted.
+        """
+        deficit = self.deficit()
+        if deficit is None:
+            return 0
+        heavy, deficit = deficit
+        prefix = self.heaviest_first(heavy)
+        needed = min(bisect.bisect_right(prefix, deficit) + 1, len(prefix))
+
+        keel = crossing_distances(len(self.columns), self.halfway_line)
+        crossing = self._cheapest(heavy, needed, self.distances) + self._cheapest(heavy, needed - 1, keel)
+
+        depth = self._dig_depth(heavy, deficit)
+        dig = 0
+        if depth:
+            dig = min(
+                (self.distances[c] + 2 * depth for c in self.side_columns(heavy)
+                 if len(self.columns[c]) > depth and self.distances[c] is not None),
+                default=0,
+            )
+        return self._approach(heavy, crane) + max(1, crossing, dig)
@@ -0,0 +1,403 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from tasks.ship_balancer import Slot, calculate_balance
+from tasks.balance_oracle import BalanceOracle, side_capacities
+from tasks.balance_search import (
+    astar_balance,
+    read_columns,
+    replay_moves,
+    move_minutes,
+)
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.sift_planner import sift_fallback
+from tasks.plan_optimizer import optimize_moves
+
+
+# Upper bound on branch-and-bound nodes while choosing which containers cross
+MAX_SPLIT_NODES = 5000
+
+# Assignment cost of a slot the crane cannot reach
+UNREACHABLE = 10 ** 6
+
+
+def crossing_estimates(rows, stacks, heights, halfway_line):
+    """
+    Estimates the crane minutes for sending each container to the other side.
+
+    A container on top of its stack is charged the real crane path to the cheapest
+    column across the keel line. A buried container additionally pays two minutes
+    for every container above it, roughly what it takes to lift a blocker aside.
+
+    Returns:
+        list: (container index, column, estimated minutes)
+    """
+    cols = len(stacks)
+    estimates = []
+
+    for c, stack in enumerate(stacks):
+        crossing = [move_minutes(heights, c, dst, rows) for dst in range(cols)
+                    if (dst < halfway_line) != (c < halfway_line)]
+        crossing = [minutes for minutes in crossing if minutes != -1]
+        base = min(crossing) if crossing else rows + cols
+
+        for depth, idx in enumerate(reversed(stack)):
+            estimates.append((idx, c, base + depth * 2))
+
+    return estimates
+
+
+def choose_crossing_set(estimates, weights, transfer_range, halfway_line, heavy_is_left, free_slots,
+                        max_nodes=MAX_SPLIT_NODES):
+    """
+    Phase one: picks the containers that should end up on the other side.
+
+    Branch and bound over the candidates, cheapest first, for the subset whose net
+    weight moved off the heavy side falls inside transfer_range with the lowest
+    summed estimate. Light-side containers count negatively, so swaps are found
+    when sending heavy containers alone cannot hit the window. Suffix subset-sum
+    bitsets prune any branch that can no longer reach the range, and a greedy pass
+    over the same bitsets seeds the bound so pruning starts right away.
+
+    Args:
+        estimates (list): Output of crossing_estimates.
+        weights (list): Container weights by index.
+        transfer_range (tuple): Inclusive (low, high) net weight that has to cross.
+        halfway_line (int): First starboard column.
+        heavy_is_left (bool): Whether the port side is the heavy one.
+        free_slots (tuple): Free (port, starboard) slots, capping how many can cross.
+        max_nodes (int): Node budget; the best subset found so far is returned.
+
+    Returns:
+        list: Container indices to move across, or None if no subset works.
+    """
+    low, high = transfer_range
+    if low > high:
+        return None
+
+    items = sorted(estimates, key=lambda item: (item[2], -weights[item[0]]))
+    signed = [int(round(weights[idx])) * (1 if (c < halfway_line) == heavy_is_left else -1)
+              for idx, c, _ in items]
+
+    # Containers leaving the heavy side land on the light side and vice versa
+    heavy_free, light_free = (free_slots[0], free_slots[1]) if heavy_is_left else (free_slots[1], free_slots[0])
+
+    # suffix[i] holds every subset sum of items[i:], offset by the total negative weight
+    offset = -sum(weight for weight in signed if weight < 0)
+    suffix = [1 << offset] * (len(items) + 1)
+    for i in range(len(items) - 1, -1, -1):
+        shifted = suffix[i + 1] << signed[i] if signed[i] >= 0 else suffix[i + 1] >> -signed[i]
+        suffix[i] = suffix[i + 1] | shifted
+
+    window = (1 << (high - low + 1)) - 1
+
+    def can_reach(i, moved):
+        shift = low - moved + offset
+        bits = suffix[i] >> shift if shift >= 0 else suffix[i] << -shift
+        return (bits & window) != 0
+
+    if not can_reach(0, 0):
+        return None
+
+    best = [float("inf"), None]
+    capacity = (light_free, heavy_free)
+
+    def greedy(order, heavy_only):
+        # Take each container in order that keeps the window reachable without overshooting
+        moved, cost, chosen, counts = 0, 0, [], [0, 0]
+        for i in order:
+            if low <= moved <= high:
+                break
+            side = 0 if signed[i] > 0 else 1
+            if heavy_only and (side == 1 or moved + signed[i] > high):
+                continue
+            if counts[side] < capacity[side] and (heavy_only or can_reach(i + 1, moved + signed[i])):
+                moved, cost = moved + signed[i], cost + items[i][2]
+                counts[side] += 1
+                chosen.append(items[i][0])
+        if low <= moved <= high and cost < best[0]:
+            best[0], best[1] = cost, chosen
+
+    # Seed the bound: cheapest first, heaviest first, then any reachable subset
+    by_cost = range(len(items))
+    by_weight = sorted(by_cost, key=lambda i: -signed[i])
+    greedy(by_cost, True)
+    greedy(by_weight, True)
+    if best[1] is None:
+        greedy(by_cost, False)
+
+    nodes = [0]
+
+    def search(i, moved, cost, chosen, counts):
+        nodes[0] += 1
+        if nodes[0] > max_nodes:
+            return
+        if low <= moved <= high:
+            if cost < best[0]:
+                best[0], best[1] = cost, list(chosen)
+            return
+        # At least one more container has to cross, and items are sorted by cost
+        if i == len(items) or cost + items[i][2] >= best[0] or not can_reach(i, moved):
+            return
+
+        side = 0 if signed[i] > 0 else 1
+        if counts[side] < capacity[side]:
+            counts[side] += 1
+            chosen.append(items[i][0])
+            search(i + 1, moved + signed[i], cost + items[i][2], chosen, counts)
+            chosen.pop()
+            counts[side] -= 1
+        search(i + 1, moved, cost, chosen, counts)
+
+    search(0, 0, 0, [], [0, 0])
+    return best[1]
+
+
+def assign_columns(rows, floors, stacks, heights, movers, halfway_line):
+    """
+    Phase two: assigns every crossing container to a concrete slot on the other side.
+
+    The candidates are the free slots of columns that hold no crossing container, so
+    nothing is ever dropped on a container that still has to leave. The cost of a
+    slot is the crane distance from the container's current cell over the current
+    stack heights, and the Hungarian algorithm (scipy's linear_sum_assignment) picks
+    the cheapest one-to-one assignment per side. Only the number of containers per
+    column is kept, since a column fills from the bottom up anyway.
+
+    Returns:
+        dict: Container index -> destination column, or None if a side is full.
+    """
+    positions = {}
+    for c, stack in enumerate(stacks):
+        for level, idx in enumerate(stack):
+            positions[idx] = (floors[c] + level, c)
+
+    mover_set = set(movers)
+    open_columns = [c for c, stack in enumerate(stacks) if not mover_set.intersection(stack)]
+    destinations = {}
+
+    for to_left in (True, False):
+        group = [idx for idx in movers if (positions[idx][1] < halfway_line) != to_left]
+        if not group:
+            continue
+
+        slots = [(r, c) for c in open_columns if (c < halfway_line) == to_left for r in range(heights[c], rows)]
+        if len(slots) < len(group):
+            return None
+
+        cost = np.zeros((len(group), len(slots)))
+        for i, idx in enumerate(group):
+            row, col = positions[idx]
+            for j, (r, c) in enumerate(slots):
+                lo, hi = (col, c) if col < c else (c, col)
+                clearance = max([row, r] + [heights[k] for k in range(lo + 1, hi)])
+                if clearance >= rows:
+                    # A full column in between: the crane can never carry it there
+                    cost[i, j] = UNREACHABLE
+                else:
+                    cost[i, j] = (clearance - row) + (hi - lo) + (clearance - r)
+
+        group_idx, slot_idx = linear_sum_assignment(cost)
+        if cost[group_idx, slot_idx].max() >= UNREACHABLE:
+            return None
+        destinations.update({group[i]: slots[j][1] for i, j in zip(group_idx, slot_idx)})
+
+    return destinations
+
+
+def cut_off(rows, heights, columns, destinations, pending, src, dst):
+    """
+    Lists the pending containers a move would cut off for good.
+
+    Dropping the top of src on dst can fill dst to the last row, after which the crane
+    can never carry anything across it; destination columns only ever grow, so that
+    path stays blocked.
+
+    Args:
+        columns (dict): Current column of every container.
+
+    Returns:
+        list: Pending container indices whose crane path the move would block.
+    """
+    after = list(heights)
+    after[src] -= 1
+    after[dst] += 1
+
+    cut = []
+    for idx in pending:
+        c, target = columns[idx], destinations[idx]
+        lo, hi = (c, target) if c < target else (target, c)
+        if any(after[k] >= rows > heights[k] for k in range(lo + 1, hi)):
+            cut.append(idx)
+    return cut
+
+
+def order_moves(rows, floors, stacks, destinations, halfway_line, cost_model=None):
+    """
+    Phase three: orders the moves so nothing is ever dropped on a pending container.
+
+    The accessible crossing container that is cheapest to reach and carry from
+    where the crane stands goes first, unless its drop would fill a
+    column that another pending container still has to pass; destinations on the same
+    side are interchangeable, so the two swap columns instead. When every pending one
+    is buried, the top blocker of the least buried one is set aside on its own side of
+    the keel line, on a column with no pending containers and room left for the ones
+    still coming, which keeps the weight split intact.
+
+    Args:
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        list: (src, dst) column moves, or None if a blocker has nowhere to go.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    crane = cost_model.park(rows)
+    cols = len(stacks)
+    stacks = [list(stack) for stack in stacks]
+    destinations = dict(destinations)
+    pending = set(destinations)
+    moves = []
+    swaps = len(destinations) ** 2
+
+    while pending:
+        heights = [floors[c] + len(stacks[c]) for c in range(cols)]
+        columns = {idx: c for c, stack in enumerate(stacks) for idx in stack}
+
+        ready = []
+        for c, stack in enumerate(stacks):
+            if stack and stack[-1] in pending:
+                cost = cost_model.column_move(heights, crane, c, destinations[stack[-1]], rows)
+                if cost is not None:
+                    ready.append((cost.total, c, stack[-1]))
+        ready.sort()
+
+        src = dst = None
+        swapped = False
+        for _, c, idx in ready:
+            cut = [other for other in cut_off(rows, heights, columns, destinations, pending, c, destinations[idx])
+                   if other != idx]
+            if not cut:
+                src, dst = c, destinations[idx]
+                break
+
+            same_side = [other for other in cut
+                         if (destinations[other] < halfway_line) == (destinations[idx] < halfway_line)]
+            if same_side and swaps:
+                # Send this one past the full column and let the cut-off one take its slot
+                swaps -= 1
+                other = same_side[0]
+                destinations[idx], destinations[other] = destinations[other], destinations[idx]
+                swapped = True
+                break
+        if swapped:
+            continue
+
+        if src is None:
+            buried = [(sum(1 for idx in stack[stack.index(p):] if idx not in pending), c)
+                      for c, stack in enumerate(stacks) for p in stack if p in pending]
+            _, src = min(buried)
+            if stacks[src][-1] in pending:
+                # A crossing container whose crane path is blocked
+                return None
+
+            incoming = [destinations[idx] for idx in pending]
+            parking = [(cost_model.column_move(heights, crane, src, c, rows), c) for c in range(cols)
+                       if c != src and (c < halfway_line) == (src < halfway_line)
+                       and rows - heights[c] > incoming.count(c) and not pending.intersection(stacks[c])
+                       and not cut_off(rows, heights, columns, destinations, pending, src, c)]
+            parking = [(cost.total, c) for cost, c in parking if cost is not None]
+            if not parking:
+                return None
+            _, dst = min(parking)
+
+        pending.discard(stacks[src][-1])
+        stacks[dst].append(stacks[src].pop())
+        moves.append((src, dst))
+        crane = (heights[dst], dst)
+
+    return moves
+
+
+def layout_moves(rows, floors, stacks, weights, oracle, cost_model=None):
+    """
+    Runs the three phases on a column view of the ship.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        floors (list): NAN floor height of each column.
+        stacks (list): Container indices of each column, bottom up; not modified.
+        weights (list): Weight of each container index.
+        oracle (BalanceOracle): Feasibility oracle for the manifest; must be feasible.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        list: (src, dst) column moves reaching a balanced layout, or None when a phase
+        finds no plan.
+    """
+    cols = len(stacks)
+    halfway_line = cols // 2
+
+    left_balance = sum(weights[idx] for c in range(halfway_line) for idx in stacks[c])
+    right_balance = sum(weights[idx] for c in range(halfway_line, cols) for idx in stacks[c])
+
+    heavy_is_left = left_balance > right_balance
+    low, high = oracle.window
+    transfer_range = (left_balance - high, left_balance - low) if heavy_is_left else (low - left_balance, high - left_balance)
+
+    heights = [floors[c] + len(stacks[c]) for c in range(cols)]
+    free_slots = (sum(rows - heights[c] for c in range(halfway_line)),
+                  sum(rows - heights[c] for c in range(halfway_line, cols)))
+
+    estimates = crossing_estimates(rows, stacks, heights, halfway_line)
+    movers = choose_crossing_set(estimates, weights, transfer_range, halfway_line, heavy_is_left, free_slots)
+    if movers is None:
+        return None
+
+    destinations = assign_columns(rows, floors, stacks, heights, movers, halfway_line)
+    if not destinations:
+        return None
+    return order_moves(rows, floors, stacks, destinations, halfway_line, cost_model)
+
+
+def layout_balance(ship_grid, containers, cost_model=None):
+    """
+    Two-phase balancing: synthesise the goal layout, then plan the moves to reach it.
+
+    Phase one chooses which containers cross the keel line, phase two assigns them to
+    legal slots with a min-cost assignment over crane distances and phase three orders
+    the moves so no container is buried; optimize_moves() then merges and reorders
+    what it can. Runs in milliseconds on full manifests where
+    a state-space search would not finish; manifests this cannot plan (for example
+    when every parking column is full) go to astar_balance().
+
+    Args:
+        ship_grid (list): The current ship grid, left in its final layout.
+        containers (list): Locations of the containers on the ship.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        tuple: (steps, ship_grids, status) like balance(); status is None, with no
+        moves, when the ship needs SIFT and sift_balance() finds no plan.
+    """
+    _, _, balanced = calculate_balance(ship_grid)
+    if balanced:
+        return [], [], True
+
+    floors, stacks, grid_containers = read_columns(ship_grid)
+    weights = [container.weight for container in grid_containers]
+    oracle = BalanceOracle(weights, *side_capacities(ship_grid))
+    if not oracle.feasible:
+        print("Balance could not be achieved, beginning SIFT...")
+        return sift_fallback(ship_grid, cost_model)
+
+    moves = layout_moves(len(ship_grid), floors, stacks, weights, oracle, cost_model)
+    if moves is None:
+        return astar_balance(ship_grid, containers, cost_model=cost_model)
+    moves, _, _ = optimize_moves(len(ship_grid), floors, stacks, moves, cost_model)
+
+    steps, ship_grids = replay_moves(ship_grid, moves)
+    if ship_grids:
+        for r, row in enumerate(ship_grids[-1]):
+            ship_grid[r][:] = [Slot(slot.container, slot.hasContainer, slot.available) for slot in row]
+
+    return steps, ship_grids, True
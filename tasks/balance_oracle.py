@@ -0,0 +1,159 @@
+import os
+import time
+
+
+# Wall-clock cap on the slot-capacity pass; past it the oracle ignores capacity
+ORACLE_BUDGET_MS = float(os.getenv("ORACLE_BUDGET_MS", "50"))
+
+
+class BalanceOracle:
+    """
+    Subset-sum oracle over container weights for the 0.9 - 1.1 balance rule.
+
+    Every weight the port side can end up with is one bit of a Python integer, so
+    building the oracle is one shift-or per container and answering a query is a
+    couple of bit operations. This tells the planners up front whether balance is
+    achievable at all, the best ratio any layout can reach, and the weight split to
+    aim for.
+
+    Honouring slot capacity needs one bitset per container count, which gets slow
+    on full ships with heavy containers, so that pass stops after ORACLE_BUDGET_MS
+    and the oracle falls back to the sums of any number of containers. exact is
+    False then: the sums are a superset of the reachable ones, so feasible may be
+    True for a ship that cannot balance and the distances it gives are still
+    lower bounds.
+    """
+
+    def __init__(self, weights, left_capacity=None, right_capacity=None):
+        self.weights = [int(round(weight)) for weight in weights]
+        self.total = sum(self.weights)
+
+        # Balanced port-side weights s satisfy 0.9 < s / (total - s) < 1.1
+        self.window = (9 * self.total // 19 + 1, (11 * self.total - 1) // 21)
+
+        self.exact = True
+        self.reachable = self._reachable_sums(left_capacity, right_capacity)
+        window_width = max(self.window[1] - self.window[0] + 1, 0)
+        self.balanced = (self.reachable >> self.window[0]) & ((1 << window_width) - 1)
+
+        self.feasible = self.total == 0 or self.balanced != 0
+        self.best_left = self._best_left()
+        self.best_ratio = None if self.best_left is None else self.ratio(self.best_left)
+
+    def _reachable_sums(self, left_capacity, right_capacity):
+        """Bitset of port-side weights, honouring slot capacity when it can bind."""
+        count = len(self.weights)
+        left_capacity = count if left_capacity is None else left_capacity
+        right_capacity = count if right_capacity is None else right_capacity
+
+        if count <= min(left_capacity, right_capacity):
+            return self._any_count_sums()
+
+        # by_count[k] holds the sums of exactly k containers, up to the most the port side takes
+        most = min(count, left_capacity)
+        deadline = time.perf_counter() + ORACLE_BUDGET_MS / 1000
+        by_count = [1] + [0] * most
+        for n, weight in enumerate(self.weights):
+            if time.perf_counter() > deadline:
+                self.exact = False
+                return self._any_count_sums()
+            for k in range(min(n + 1, most), 0, -1):
+                by_count[k] |= by_count[k - 1] << weight
+
+        reachable = 0
+        for k in range(max(0, count - right_capacity), most + 1):
+            reachable |= by_count[k]
+        return reachable
+
+    def _any_count_sums(self):
+        """Bitset of port-side weights with no limit on the containers per side."""
+        reachable = 1
+        for weight in self.weights:
+            reachable |= reachable << weight
+        return reachable
+
+    def _best_left(self):
+        """Reachable port-side weight whose ratio is closest to 1.0, or None."""
+        if self.total == 0:
+            return 0
+
+        half = self.total // 2
+        below = (self.reachable & ((1 << (half + 1)) - 1)).bit_length() - 1
+        above_bits = self.reachable >> (half + 1)
+        above = half + (above_bits & -above_bits).bit_length() if above_bits else -1
+
+        candidates = [s for s in (below, above) if s >= 0]
+        if not candidates:
+            # The containers do not fit on the ship at all
+            return None
+        return max(candidates, key=lambda s: min(s, self.total - s) / max(s, self.total - s))
+
+    def ratio(self, left_balance):
+        """Port / starboard ratio for a given port-side weight."""
+        right_balance = self.total - left_balance
+        if right_balance == 0:
+            return 1.0 if left_balance == 0 else float("inf")
+        return left_balance / right_balance
+
+    def transfer_needed(self, left_balance):
+        """
+        Smallest weight that has to cross the keel line to reach a balanced split.
+
+        Args:
+            left_balance (int): Current port-side weight.
+
+        Returns:
+            int: Distance from left_balance to the nearest balanced reachable split,
+            or -1 if balance is impossible.
+        """
+        if not self.feasible:
+            return -1
+        if self.total == 0:
+            return 0
+
+        offset = int(round(left_balance)) - self.window[0]
+        if offset < 0:
+            above_bits = self.balanced
+            return (above_bits & -above_bits).bit_length() - 1 - offset
+
+        below = (self.balanced & ((1 << (offset + 1)) - 1)).bit_length() - 1
+        above_bits = self.balanced >> offset
+        above = offset + (above_bits & -above_bits).bit_length() - 1 if above_bits else -1
+
+        distances = [abs(offset - s) for s in (below, above) if s >= 0]
+        return min(distances)
+
+
+def side_capacities(ship_grid):
+    """
+    Counts the usable (non-NAN) slots on each side of the keel line.
+
+    Returns:
+        tuple: (left_capacity, right_capacity)
+    """
+    halfway_line = len(ship_grid[0]) // 2
+    left_capacity, right_capacity = 0, 0
+
+    for row in ship_grid:
+        for c, slot in enumerate(row):
+            if slot.available or slot.hasContainer:
+                if c < halfway_line:
+                    left_capacity += 1
+                else:
+                    right_capacity += 1
+
+    return left_capacity, right_capacity
+
+
+def balance_oracle_for_grid(ship_grid):
+    """
+    Builds a BalanceOracle for the containers currently on the ship.
+
+    Args:
+        ship_grid (list): 2D grid of Slot objects.
+
+    Returns:
+        BalanceOracle: Oracle over every container weight on the grid.
+    """
+    weights = [slot.container.weight for row in ship_grid for slot in row if slot.hasContainer]
+    return BalanceOracle(weights, *side_capacities(ship_grid))
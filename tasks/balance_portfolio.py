@@ -0,0 +1,185 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import time
+import traceback
+
+from tasks.ship_balancer import Slot, balance, calculate_balance
+from tasks.balance_oracle import BalanceOracle, side_capacities
+from tasks.balance_search import balance_lower_bound, read_columns
+from tasks.balance_layout import layout_balance
+from tasks.balance_anytime import plan_balance
+from tasks.balance_beam import beam_balance
+from tasks.sift_planner import sift_fallback
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.plan_optimizer import optimize_plan
+
+
+# Seeds for the greedy variants; seed None is the unshuffled balance()
+GREEDY_SEEDS = (None, 1, 2, 3, 4, 5)
+
+# Budget for the anytime A* variant, which also proves the bound for the early exit
+ANYTIME_BUDGET_MS = 2000
+
+# Wall-clock limit for the whole portfolio; the greedy planner can stall on crowded ships
+PORTFOLIO_TIMEOUT_S = 10.0
+
+# What a planner raises when it fails on a crowded ship
+PLANNER_ERRORS = (ValueError, IndexError)
+
+
+def portfolio_variants(seeds=GREEDY_SEEDS):
+    """
+    Planner variants raced by portfolio_balance(), cheapest first so a small pool
+    still reaches the early exit quickly.
+
+    Returns:
+        list: (planner, seed) pairs; planner is "layout", "beam", "anytime" or "greedy".
+    """
+    return [("layout", None)] + [("greedy", seed) for seed in seeds] + [("beam", None), ("anytime", None)]
+
+
+def run_variant(ship_grid, containers, variant, cost_model=None):
+    """
+    Runs one planner variant in a worker process.
+
+    Args:
+        ship_grid (list): A private copy of the ship grid; the planner updates it.
+        containers (list): Locations of the containers on the ship.
+        variant (tuple): (planner, seed) as listed by portfolio_variants().
+        cost_model (CraneCostModel): Model the anytime planner optimises.
+
+    Returns:
+        tuple: (variant, steps, ship_grids, status, lower_bound) where lower_bound is
+        the bound the anytime planner proved, or None. A variant that fails with one
+        of PLANNER_ERRORS comes back with status None and no plan.
+    """
+    planner, seed = variant
+    lower_bound = None
+    initial = [row[:] for row in ship_grid]
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            if planner == "layout":
+                steps, ship_grids, status = layout_balance(ship_grid, containers, cost_model)
+            elif planner == "beam":
+                steps, ship_grids, status = beam_balance(ship_grid, containers, cost_model=cost_model)
+            elif planner == "anytime":
+                plan = plan_balance(ship_grid, ANYTIME_BUDGET_MS, containers, cost_model=cost_model)
+                steps, ship_grids, status, lower_bound = plan.steps, plan.ship_grids, plan.status, plan.lower_bound
+            else:
+                steps, ship_grids, status = balance(ship_grid, containers, seed=seed)
+                if status is not None:
+                    steps, ship_grids, _ = optimize_plan(initial, steps, ship_grids, cost_model)
+        except PLANNER_ERRORS:
+            return variant, None, None, None, None
+    return variant, steps, ship_grids, status, lower_bound
+
+
+def run_variant_job(job):
+    """run_variant() on one (ship_grid, containers, variant, cost_model) job, for Pool.imap_unordered()."""
+    return run_variant(*job)
+
+
+def plan_minutes(ship_grid, steps, ship_grids, status, cost_model=None):
+    """
+    Crane minutes of a plan under the cost model, or None if the plan does not end balanced.
+
+    Greedy runs that stall record a move to [-1, -1], which makes the plan
+    unusable.
+    """
+    if status is not True or not ship_grids:
+        return None
+    if any(move.stalled for step in steps for move in step):
+        return None
+    if not calculate_balance(ship_grids[-1])[2]:
+        return None
+    return (cost_model or DEFAULT_COST_MODEL).step_plan(ship_grid, steps, ship_grids).total
+
+
+def portfolio_balance(ship_grid, containers, variants=None, max_workers=None, timeout=PORTFOLIO_TIMEOUT_S,
+                      cost_model=None):
+    """
+    Races several balance planners on a process pool and keeps the plan with the
+    least crane time under the cost model, empty travel included.
+
+    The greedy balance() is sensitive to how it breaks ties, so seeded greedy runs
+    are raced against the layout planner and the anytime A* planner. As soon as a
+    plan matches the admissible lower bound (or the tighter one A* proves) no other
+    variant can beat it, and the pool is terminated, which stops the running
+    variants along with the pending ones. Variants that fail the way the greedy
+    planner does drop out; any other exception is printed with its traceback
+    before the race goes on without that variant. Drop-in for balance(); ship_grid
+    is left in the final layout of the chosen plan.
+
+    Args:
+        ship_grid (list): The current ship grid.
+        containers (list): Locations of the containers on the ship.
+        variants (list): (planner, seed) pairs; portfolio_variants() when omitted.
+        max_workers (int): Worker processes; one per CPU when omitted.
+        timeout (float): Seconds to wait before settling for the best plan so far.
+        cost_model (CraneCostModel): Prices the plans; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        tuple: (steps, ship_grids, status); status is None, with no moves, when no
+        planner, the fallback balance() included, found one, or when the ship
+        needs SIFT and sift_balance() finds no plan.
+    """
+    _, _, balanced = calculate_balance(ship_grid)
+    if balanced or not containers:
+        return [], [], True
+
+    floors, stacks, grid_containers = read_columns(ship_grid)
+    weights = [container.weight for container in grid_containers]
+    oracle = BalanceOracle(weights, *side_capacities(ship_grid))
+    if not oracle.feasible:
+        # Every variant would fall back to SIFT
+        return sift_fallback(ship_grid, cost_model)
+
+    left_balance, right_balance, _ = calculate_balance(ship_grid)
+    rows = len(ship_grid)
+    lower_bound = balance_lower_bound(stacks, weights, left_balance, right_balance, len(stacks) // 2, oracle, floors,
+                                      rows, (cost_model or DEFAULT_COST_MODEL).park(rows))
+
+    variants = variants or portfolio_variants()
+    max_workers = max_workers or min(len(variants), os.cpu_count() or 1)
+
+    best = None
+    jobs = [([row[:] for row in ship_grid], [list(loc) for loc in containers], variant, cost_model)
+            for variant in variants]
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    pool = multiprocessing.Pool(processes=max_workers)
+    try:
+        results = pool.imap_unordered(run_variant_job, jobs)
+        for _ in jobs:
+            try:
+                _, steps, ship_grids, status, proven = results.next(
+                    None if deadline is None else max(deadline - time.perf_counter(), 0)
+                )
+            except multiprocessing.TimeoutError:
+                break
+            except Exception:
+                print(f"Portfolio variant crashed:\n{traceback.format_exc()}")
+                continue
+            if proven is not None:
+                lower_bound = max(lower_bound, proven)
+            minutes = plan_minutes(ship_grid, steps, ship_grids, status, cost_model)
+            if minutes is not None and (best is None or minutes < best[0]):
+                best = (minutes, steps, ship_grids)
+            if best is not None and best[0] <= lower_bound:
+                break
+    finally:
+        pool.terminate()
+        pool.join()
+
+    if best is None:
+        # No variant produced a balanced plan in time; fall back to the plain planner
+        try:
+            return balance(ship_grid, containers)
+        except PLANNER_ERRORS:
+            return [], [], None
+
+    _, steps, ship_grids = best
+    for r, row in enumerate(ship_grids[-1]):
+        ship_grid[r][:] = [Slot(slot.container, slot.hasContainer, slot.available) for slot in row]
+    return steps, ship_grids, True
@@ -0,0 +1,306 @@
+import heapq
+import time
+
+from tasks.ship_balancer import Slot, ShipState, balance
+from tasks.balance_oracle import BalanceOracle, side_capacities
+from tasks.balance_bounds import BalanceBounds, is_balanced
+from tasks.crane_cost import DEFAULT_COST_MODEL, crane_path, move_minutes
+from tasks.move_plan import Move, Plan
+from tasks.plan_history import PlanHistory
+
+
+# Upper bound on expanded states before giving up on an optimal plan
+MAX_EXPANSIONS = 20000
+
+
+def read_columns(ship_grid):
+    """
+    Reads a ship grid column by column.
+
+    Args:
+        ship_grid (list): 2D grid of Slot objects, row 0 at the bottom.
+
+    Returns:
+        tuple: (floors, stacks, containers) where floors[c] is the number of NAN
+        cells at the bottom of column c, stacks[c] is a list of container indices
+        from the bottom up and containers holds the Container objects.
+    """
+    rows, cols = len(ship_grid), len(ship_grid[0])
+    floors, stacks, containers = [], [], []
+
+    for c in range(cols):
+        floor = 0
+        while floor < rows and not ship_grid[floor][c].available and not ship_grid[floor][c].hasContainer:
+            floor += 1
+
+        stack = []
+        for r in range(floor, rows):
+            if ship_grid[r][c].hasContainer:
+                stack.append(len(containers))
+                containers.append(ship_grid[r][c].container)
+
+        floors.append(floor)
+        stacks.append(stack)
+
+    return floors, stacks, containers
+
+
+def weight_classes(stacks, weights):
+    """
+    Relabels containers by weight, so interchangeable containers share one label.
+
+    Containers of equal weight can trade places without changing any balance
+    metric, so search states that differ only in which of them sits where are one
+    state. Plans are (src, dst) column moves, which replay unchanged on the real
+    grid; the names come back there.
+
+    Returns:
+        tuple: (stacks of weight labels, weight of each label)
+    """
+    labels = {weight: label for label, weight in enumerate(sorted(set(weights)))}
+    return [[labels[weights[idx]] for idx in stack] for stack in stacks], sorted(labels)
+
+
+def balance_lower_bound(stacks, weights, left_balance, right_balance, halfway_line, oracle=None, floors=None,
+                        rows=None, crane=None):
+    """
+    Admissible estimate of the crane minutes still needed to balance the ship.
+
+    One-off use of the BalanceBounds tables: the fewest heavy-side containers whose
+    weight covers the deficit each cross the keel line, and a container buried under
+    others can only cross once they are lifted off. left_balance and right_balance
+    are the totals of stacks, which the tables add up themselves. With floors and
+    rows, crossings are measured to the nearest column that has any slot at all, and
+    with the crane's (row, column) the hook's trip to the heavy side is counted too.
+    """
+    if is_balanced(left_balance, right_balance):
+        return 0
+    if floors is None:
+        floors = [0] * len(stacks)
+        rows = None
+    return BalanceBounds.from_stacks(floors, stacks, weights, halfway_line, oracle, rows).minutes_needed(crane)
+
+
+def search_balance_plan(rows, floors, stacks, weights, max_expansions=MAX_EXPANSIONS, oracle=None,
+                        deadline=None, upper_bound=None, cost_model=None):
+    """
+    Runs A* over whole-ship states for the cheapest balancing plan.
+
+    A state is the tuple of column stacks plus the column the crane last dropped on
+    (-1 while it is still parked); an action sends the hook there to the top
+    container of one column and drops it on another along the lowest clear crane
+    path, priced by the cost model. Stacks hold weight_classes() labels, so layouts
+    that only swap containers of equal weight are searched once.
+
+    Args:
+        deadline (float): time.perf_counter() value at which to stop searching.
+        upper_bound (int): Minutes of a plan already in hand; only cheaper plans are
+            searched for.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        tuple: (moves, minutes, status) where moves is a list of (src, dst) column
+        pairs. status is True when a plan was found, False when the search space was
+        exhausted without reaching balance (or a plan under upper_bound) and None
+        when max_expansions or the deadline ran out, in which case minutes is the
+        proven lower bound on the optimal plan.
+    """
+    if oracle is not None and not oracle.feasible:
+        return [], 0, False
+
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    cols = len(stacks)
+    halfway_line = cols // 2
+    park = cost_model.park(rows)
+
+    stacks, weights = weight_classes(stacks, weights)
+    start = (tuple(tuple(stack) for stack in stacks), -1)
+    total_weight = sum(weights[label] for stack in stacks for label in stack)
+    left = sum(weights[label] for c in range(halfway_line) for label in stacks[c])
+
+    g_score = {start: 0}
+    parents = {start: None}
+    h = balance_lower_bound(start[0], weights, left, total_weight - left, halfway_line, oracle, floors, rows, park)
+    if upper_bound is not None and h >= upper_bound:
+        # The plan in hand already meets the bound; nothing cheaper exists
+        return [], h, False
+    open_set = [(h, h, 0, 0, start, left)]
+    tie = 1
+    expansions = 0
+
+    while open_set:
+        f, _, _, g, node, left = heapq.heappop(open_set)
+        if g > g_score[node]:
+            # A cheaper path to this state was queued after this entry
+            continue
+
+        if is_balanced(left, total_weight - left):
+            moves = []
+            while parents[node] is not None:
+                node, move = parents[node]
+                moves.append(move)
+            return moves[::-1], g, True
+
+        expansions += 1
+        if expansions > max_expansions or (deadline is not None and time.perf_counter() > deadline):
+            # f of the cheapest open entry bounds every plan still reachable
+            return [], f, None
+
+        state, crane_col = node
+        heights = [floors[c] + len(state[c]) for c in range(cols)]
+        crane = park if crane_col == -1 else (heights[crane_col] - 1, crane_col)
+        for src in range(cols):
+            if not state[src]:
+                continue
+            idx = state[src][-1]
+            empty = cost_model.empty_travel(heights, crane, (heights[src] - 1, src))
+            for dst in range(cols):
+                if dst == src:
+                    continue
+                minutes = move_minutes(heights, src, dst, rows)
+                if minutes == -1:
+                    continue
+
+                child = list(state)
+                child[src] = state[src][:-1]
+                child[dst] = state[dst] + (idx,)
+                child = (tuple(child), dst)
+
+                child_g = g + empty + minutes * cost_model.loaded_minutes
+                if child_g >= g_score.get(child, float("inf")):
+                    continue
+                if upper_bound is not None and child_g >= upper_bound:
+                    continue
+
+                child_left = left
+                if src < halfway_line <= dst:
+                    child_left -= weights[idx]
+                elif dst < halfway_line <= src:
+                    child_left += weights[idx]
+
+                g_score[child] = child_g
+                parents[child] = (node, (src, dst))
+                h = balance_lower_bound(child[0], weights, child_left, total_weight - child_left, halfway_line,
+                                        oracle, floors, rows, (heights[dst], dst))
+                if upper_bound is not None and child_g + h >= upper_bound:
+                    continue
+                heapq.heappush(open_set, (child_g + h, h, tie, child_g, child, child_left))
+                tie += 1
+
+    return [], 0, False
+
+
+def replay_moves(ship_grid, moves):
+    """
+    Replays (src, dst) column moves on a ShipState copy of the grid.
+
+    Returns:
+        tuple: (steps, ship_grids) in the same format balance() returns, a Plan
+        with one list of cell-to-cell Moves per container move and the
+        PlanHistory of the grid after each.
+    """
+    state = ShipState.from_grid(ship_grid)
+    steps, ship_grids = Plan(), PlanHistory.from_state(state)
+
+    for src, dst in moves:
+        path = crane_path(state.heights.tolist(), src, dst, state.rows)
+        name = state.container_at(*path[0]).name
+        steps.append([Move.between(a, b, name) for a, b in zip(path, path[1:])])
+
+        state.move(path[0], path[-1])
+        ship_grids.record(state)
+
+    return steps, ship_grids
+
+
+def check_plan(ship_grid, steps):
+    """
+    Replays a balancing plan on a ShipState copy of the grid, checking that a
+    crane can make every move.
+
+    Each container move has to lift the top container of a column, carry it one
+    cell at a time through empty cells inside the grid and set it down on top of
+    a column.
+
+    Args:
+        ship_grid (list): The grid the plan starts from; not modified.
+        steps (list): The plan, one list of Moves per container move.
+
+    Returns:
+        ShipState: The layout the plan ends on.
+
+    Raises:
+        ValueError: Naming the first move that breaks a rule.
+    """
+    state = ShipState.from_grid(ship_grid)
+    for i, step in enumerate(steps):
+        if not step:
+            continue
+        where = f"Step {i + 1}"
+        if any(move.stalled for move in step):
+            raise ValueError(f"{where} has no destination")
+
+        (row, col), (to_row, to_col) = step[0].start, step[-1].end
+        if not (0 <= row < state.rows and 0 <= col < state.columns) or state.top(col) != row:
+            raise ValueError(f"{where} does not start from the top container of a column")
+        for before, after in zip(step, step[1:]):
+            if before.end != after.start:
+                raise ValueError(f"{where} is not one connected crane path")
+        for move in step:
+            r, c = move.end
+            if abs(r - move.from_row) + abs(c - move.from_col) != 1:
+                raise ValueError(f"{where} moves more than one cell at a time")
+            if not (0 <= r < state.rows and 0 <= c < state.columns) or not state.available[r, c]:
+                raise ValueError(f"{where} passes through [{r + 1}, {c + 1}], which is not free")
+
+        landing = row if to_col == col else state.lowest_free(to_col)
+        if to_row != landing:
+            raise ValueError(f"{where} does not set the container down on top of a column")
+        state.move((row, col), (to_row, to_col))
+    return state
+
+
+def astar_balance(ship_grid, containers, max_expansions=MAX_EXPANSIONS, cost_model=None):
+    """
+    Balances the ship with the plan that takes the fewest crane minutes.
+
+    Drop-in replacement for balance(): returns (steps, ship_grids, status) and leaves
+    ship_grid in its final layout. A BalanceOracle decides up front whether any
+    balanced split exists, so impossible manifests go straight to SIFT; the greedy
+    balance() is the fallback when the search budget runs out.
+
+    Args:
+        ship_grid (list): The current ship grid.
+        containers (list): Locations of the containers on the ship.
+        max_expansions (int): Number of states A* may expand before falling back.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        tuple: (steps, ship_grids, status)
+    """
+    rows = len(ship_grid)
+    floors, stacks, grid_containers = read_columns(ship_grid)
+
+    if not grid_containers:
+        return [], [], True
+
+    weights = [container.weight for container in grid_containers]
+    oracle = BalanceOracle(weights, *side_capacities(ship_grid))
+    moves, _, status = search_balance_plan(rows, floors, stacks, weights, max_expansions, oracle,
+                                           cost_model=cost_model)
+
+    if status is None:
+        return balance(ship_grid, containers)
+
+    if status is False:
+        print("Balance could not be achieved, beginning SIFT...")
+        # sift_planner imports this module, so its SIFT fallback is imported here
+        from tasks.sift_planner import sift_fallback
+        return sift_fallback(ship_grid, cost_model)
+
+    steps, ship_grids = replay_moves(ship_grid, moves)
+    if ship_grids:
+        for r, row in enumerate(ship_grids[-1]):
+            ship_grid[r][:] = [Slot(slot.container, slot.hasContainer, slot.available) for slot in row]
+
+    return steps, ship_grids, True
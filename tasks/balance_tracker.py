@@ -0,0 +1,130 @@
+class BalanceTracker:
+    """
+    Running port / starboard weight totals.
+
+    Built with one scan of the grid, then kept current in O(1) per container that
+    is added, removed or moved, so the planners and the balancing page never rescan
+    the grid to read the balance or to score a candidate move.
+    """
+
+    def __init__(self, left_balance=0, right_balance=0, halfway_line=6):
+        self.left_balance = left_balance
+        self.right_balance = right_balance
+        self.halfway_line = halfway_line
+
+    @classmethod
+    def from_grid(cls, ship_grid):
+        """
+        Builds a tracker with one scan of a Slot grid.
+
+        Args:
+            ship_grid (list): 2D grid of Slot objects.
+
+        Returns:
+            BalanceTracker: Tracker holding the grid's port and starboard totals.
+        """
+        tracker = cls(halfway_line=len(ship_grid[0]) // 2)
+        for row in ship_grid:
+            for c, slot in enumerate(row):
+                if slot.container is not None:
+                    tracker.add(slot.container.weight, c)
+        return tracker
+
+    def copy(self):
+        return BalanceTracker(self.left_balance, self.right_balance, self.halfway_line)
+
+    def is_left(self, column):
+        return column < self.halfway_line
+
+    def add(self, weight, column):
+        """Counts a container placed in column."""
+        if self.is_left(column):
+            self.left_balance += weight
+        else:
+            self.right_balance += weight
+
+    def remove(self, weight, column):
+        """Stops counting a container taken out of column."""
+        if self.is_left(column):
+            self.left_balance -= weight
+        else:
+            self.right_balance -= weight
+
+    def apply_move(self, weight, from_column, to_column):
+        """Updates the totals for a container moved between columns."""
+        if self.is_left(from_column) != self.is_left(to_column):
+            self.remove(weight, from_column)
+            self.add(weight, to_column)
+
+    def apply_step(self, step, ship_grid_after):
+        """
+        Applies one planned container move.
+
+        Args:
+            step (list): Moves of one container move.
+            ship_grid_after (list): Grid snapshot after the move, used for the weight.
+        """
+        if not step:
+            return
+        _, from_column = step[0].start
+        to_row, to_column = step[-1].end
+        container = ship_grid_after[to_row][to_column].container
+        if container is not None:
+            self.apply_move(container.weight, from_column, to_column)
+
+    def totals(self):
+        """
+        Same result as calculate_balance() on the tracked grid.
+
+        Returns:
+            tuple: (left_balance, right_balance, balanced)
+        """
+        left_balance, right_balance = self.left_balance, self.right_balance
+        if left_balance == 0 and right_balance == 0:
+            return left_balance, right_balance, True
+        elif right_balance == 0:
+            return left_balance, right_balance, False
+        return left_balance, right_balance, 0.9 < left_balance / right_balance < 1.1
+
+    @property
+    def total_weight(self):
+        return self.left_balance + self.right_balance
+
+    @property
+    def balanced(self):
+        return self.totals()[2]
+
+    def ratio(self):
+        """Port / starboard ratio, or None when the starboard side is empty."""
+        return self.left_balance / self.right_balance if self.right_balance else None
+
+    def ratio_delta(self, weight, from_column, to_column):
+        """
+        Change in the port / starboard ratio if a container were moved, without moving it.
+
+        Returns:
+            float: New ratio minus current ratio, or None if either is undefined.
+        """
+        left_balance, right_balance = self.left_balance, self.right_balance
+        if self.is_left(from_column) and not self.is_left(to_column):
+            left_balance, right_balance = left_balance - weight, right_balance + weight
+        elif not self.is_left(from_column) and self.is_left(to_column):
+            left_balance, right_balance = left_balance + weight, right_balance - weight
+
+        current = self.ratio()
+        if current is None or right_balance == 0:
+            return None
+        return left_balance / right_balance - current
+
+    def closeness_after_crossing(self, weight):
+        """
+        Distance from a 1.0 ratio after a container leaves the heavier side.
+
+        Matches close_to_balance(): the heavier side over the lighter side once the
+        container has crossed the keel line.
+        """
+        if self.left_balance > self.right_balance:
+            closeness = (self.left_balance - weight) / (self.right_balance + weight)
+        else:
+            closeness = (self.right_balance - weight) / (self.left_balance + weight)
+        return abs(1.0 - closeness)
@@ -1,6 +1,5 @@
 import streamlit as st
 import plotly.graph_objects as go
-from copy import deepcopy
 from tasks.ship_balancer import (
     create_ship_grid,
     update_ship_grid,
@@ -9,6 +8,7 @@ from tasks.ship_balancer import (
     calculate_balance,
     balance,
 )
+from tasks.persistent_grid import PersistentGrid
 import os
 
 def plotly_visualize_grid(grid, title="Ship Grid"):
@@ -350,11 +350,9 @@ def generate_animation_with_annotations():
                 if step_index > 0
                 else st.session_state.initial_grid
             )
-            for sub_step in step:
-                # Parse coordinates
-                from_coords, to_coords = sub_step.replace("[", "").replace("]", "").split(" to ")
-                from_x, from_y = map(int, from_coords.split(","))
-                to_x, to_y = map(int, to_coords.split(","))
+            for move in step:
+                from_x, from_y = move.start
+                to_x, to_y = move.end
                 # Prepare z values and annotations for this frame
                 z_frame = []
                 annotations_frame = []
@@ -471,16 +469,13 @@ def generate_animation_with_annotations():
 def generate_stepwise_animation(initial_grid, steps, ship_grids):
     
     frames = []
-    base_grid = deepcopy(initial_grid)
+    base_grid = PersistentGrid.from_grid(initial_grid)
     # Add a frame for each step and sub-step
     for step_idx, (step, step_grid) in enumerate(zip(steps, ship_grids)):
-        for sub_step_idx, sub_step in enumerate(step):
-            from_coords, to_coords = sub_step.replace("[", "").replace("]", "").split(" to ")
-            from_x, from_y = map(int, from_coords.split(","))
-            to_x, to_y = map(int, to_coords.split(","))
+        for sub_step_idx, move in enumerate(step):
             # Create the plot for this sub-step
             frame_fig = plotly_visualize_grid_with_overlay(
-                base_grid, (from_x, from_y), (to_x, to_y),
+                base_grid, move.start, move.end,
                 title=f"Step {step_idx + 1}, Sub-Step {sub_step_idx + 1}"
             )
             # Add the frame to the animation
@@ -491,7 +486,7 @@ def generate_stepwise_animation(initial_grid, steps, ship_grids):
                 )
             )
         # Update base grid to the final state of the current step
-        base_grid = deepcopy(step_grid)
+        base_grid = PersistentGrid.from_grid(step_grid)
     # Create the main figure
     fig = go.Figure(
         data=frames[0].data if frames else [],
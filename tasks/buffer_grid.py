@@ -0,0 +1,122 @@
+from tasks.crane_cost import DEFAULT_COST_MODEL, CostBreakdown
+
+
+# Size of the buffer area on the dock, in container slots
+BUFFER_ROWS = 4
+BUFFER_COLUMNS = 24
+
+
+class BufferGrid:
+    """
+    The buffer area on the dock, a grid of stacks like the ship.
+
+    Containers go on the lowest free slot of a column and only the top one of a
+    column can be taken, so the buffer hands containers back last in, first out.
+    The crane reaches the buffer through its door, one row above its last column,
+    which is the column nearest the ship; it fills the columns from the door
+    outwards. Inside, the hook travels like on the ship and has to clear every
+    stack between two columns. Getting a container between the ship's park
+    position and the door is the cost model's buffer transfer time; store() and
+    take() price only the travel inside.
+
+    Args:
+        rows (int): Rows of the buffer.
+        columns (int): Columns of the buffer.
+        limit (int): Containers that may be staged at once; every slot when omitted.
+        cost_model (CraneCostModel): Prices the travel; DEFAULT_COST_MODEL when omitted.
+    """
+
+    def __init__(self, rows=BUFFER_ROWS, columns=BUFFER_COLUMNS, limit=None, cost_model=None):
+        self.rows = rows
+        self.columns = columns
+        self.limit = rows * columns if limit is None else min(limit, rows * columns)
+        self.model = cost_model or DEFAULT_COST_MODEL
+        self.stacks = [[] for _ in range(columns)]
+        self.count = 0
+
+    def copy(self):
+        buffer = BufferGrid.__new__(BufferGrid)
+        buffer.rows, buffer.columns, buffer.limit, buffer.model = self.rows, self.columns, self.limit, self.model
+        buffer.stacks = [list(stack) for stack in self.stacks]
+        buffer.count = self.count
+        return buffer
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def door(self):
+        """Cell the crane enters the buffer through."""
+        return self.rows, self.columns - 1
+
+    def heights(self):
+        return [len(stack) for stack in self.stacks]
+
+    def has_room(self):
+        return self.count < self.limit
+
+    def free_slot(self):
+        """Slot the next container goes to: the lowest free one nearest the door, or None."""
+        if not self.has_room():
+            return None
+        for c in range(self.columns - 1, -1, -1):
+            if len(self.stacks[c]) < self.rows:
+                return len(self.stacks[c]), c
+        return None
+
+    def top_slot(self):
+        """Slot of the container take() returns: the top of the column filled last, or None."""
+        for c in range(self.columns):
+            if self.stacks[c]:
+                return len(self.stacks[c]) - 1, c
+        return None
+
+    def store_cost(self):
+        """Travel inside the buffer to set the next container down and come back to the door."""
+        slot = self.free_slot()
+        if slot is None:
+            return None
+        heights = self.heights()
+        loaded = self.model.loaded_travel(heights, self.door, slot)
+        heights[slot[1]] += 1
+        return CostBreakdown(loaded, self.model.empty_travel(heights, slot, self.door))
+
+    def take_cost(self):
+        """Travel inside the buffer to fetch the container take() returns and bring it to the door."""
+        slot = self.top_slot()
+        if slot is None:
+            return None
+        heights = self.heights()
+        empty = self.model.empty_travel(heights, self.door, slot)
+        return CostBreakdown(self.model.loaded_travel(heights, slot, self.door), empty)
+
+    def store(self, item):
+        """
+        Sets a container down on the next free slot.
+
+        Args:
+            item: What to keep there; the loader keeps (container, column it came from).
+
+        Returns:
+            CostBreakdown: The travel inside the buffer, or None if it is full.
+        """
+        cost = self.store_cost()
+        if cost is None:
+            return None
+        self.stacks[self.free_slot()[1]].append(item)
+        self.count += 1
+        return cost
+
+    def take(self):
+        """
+        Takes the last container stored.
+
+        Returns:
+            tuple: (item, CostBreakdown of the travel inside the buffer), or None if it is empty.
+        """
+        slot = self.top_slot()
+        if slot is None:
+            return None
+        cost = self.take_cost()
+        self.count -= 1
+        return self.stacks[slot[1]].pop(), cost
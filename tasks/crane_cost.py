@@ -0,0 +1,288 @@
+def crane_clearance(heights, src, dst, rows):
+    """
+    Returns the lowest row the crane can carry the top container of src over to dst.
+
+    Args:
+        heights (list): Occupied height (NAN floor plus containers) of each column.
+        src (int): Column the container is picked from.
+        dst (int): Column the container is dropped on.
+        rows (int): Number of rows in the grid.
+
+    Returns:
+        int: Travel row, or -1 if the drop slot or the path is blocked.
+    """
+    if heights[dst] >= rows:
+        return -1
+
+    lo, hi = (src, dst) if src < dst else (dst, src)
+    clearance = max(heights[src] - 1, heights[dst])
+    for c in range(lo + 1, hi):
+        if heights[c] > clearance:
+            clearance = heights[c]
+
+    return clearance if clearance < rows else -1
+
+
+def crane_path(heights, src, dst, rows):
+    """
+    Lists the cells the top container of src passes through on its way to dst.
+
+    Returns:
+        list: [r, c] cells from pick-up to drop-off, or [] if the move is blocked.
+    """
+    clearance = crane_clearance(heights, src, dst, rows)
+    if clearance == -1:
+        return []
+
+    step = 1 if dst > src else -1
+    path = [[r, src] for r in range(heights[src] - 1, clearance + 1)]
+    path += [[clearance, c] for c in range(src + step, dst + step, step)]
+    path += [[r, dst] for r in range(clearance - 1, heights[dst] - 1, -1)]
+
+    return path
+
+
+def move_minutes(heights, src, dst, rows):
+    """Returns the crane minutes for moving the top container of src to dst, or -1 if blocked."""
+    clearance = crane_clearance(heights, src, dst, rows)
+    if clearance == -1:
+        return -1
+    return (clearance - heights[src] + 1) + abs(src - dst) + (clearance - heights[dst])
+
+
+def column_heights(ship_grid):
+    """Occupied height (NAN floor plus containers) of each column of a Slot grid."""
+    rows, cols = len(ship_grid), len(ship_grid[0])
+    heights = [0] * cols
+    for r in range(rows):
+        for c in range(cols):
+            slot = ship_grid[r][c]
+            if slot.hasContainer or not slot.available:
+                heights[c] = r + 1
+    return heights
+
+
+class CostBreakdown:
+    """
+    Crane minutes of a plan, split by what the crane was doing.
+
+    loaded is travel with a container on the hook, empty the travel of the bare hook
+    from the park position or the last drop to the next pick-up, and transfer the
+    fixed hand-over time whenever a container goes to or comes from the buffer.
+    """
+
+    def __init__(self, loaded=0, empty=0, transfer=0):
+        self.loaded = loaded
+        self.empty = empty
+        self.transfer = transfer
+
+    @property
+    def total(self):
+        return self.loaded + self.empty + self.transfer
+
+    def add(self, other):
+        """Adds another breakdown into this one and returns self."""
+        self.loaded += other.loaded
+        self.empty += other.empty
+        self.transfer += other.transfer
+        return self
+
+    def as_dict(self):
+        return {"loaded": self.loaded, "empty": self.empty, "transfer": self.transfer, "total": self.total}
+
+    def __str__(self):
+        return f"{self.total} minutes (loaded {self.loaded}, empty {self.empty}, transfer {self.transfer})"
+
+
+class CraneCostModel:
+    """
+    Prices crane work in minutes.
+
+    The hook moves one cell at a time and has to rise above every stack between two
+    columns, loaded or not. Between jobs the crane rests one row above the top-left
+    slot, so the first move of a plan pays the trip in from there. Containers handed
+    to or taken from the buffer go through the park position and pay a fixed
+    transfer time on top. Planners take a cost_model argument, so another crane (or
+    a model that ignores empty travel) plugs in by passing different rates.
+
+    Args:
+        loaded_minutes (int): Minutes per cell with a container on the hook.
+        empty_minutes (int): Minutes per cell with the hook empty.
+        buffer_transfer_minutes (int): Minutes for a ship-to-buffer or buffer-to-ship hand-over.
+    """
+
+    def __init__(self, loaded_minutes=1, empty_minutes=1, buffer_transfer_minutes=4):
+        self.loaded_minutes = loaded_minutes
+        self.empty_minutes = empty_minutes
+        self.buffer_transfer_minutes = buffer_transfer_minutes
+
+    def __repr__(self):
+        # Also keys the plan cache, so plans priced with other rates are kept apart
+        return (f"CraneCostModel(loaded_minutes={self.loaded_minutes}, empty_minutes={self.empty_minutes}, "
+                f"buffer_transfer_minutes={self.buffer_transfer_minutes})")
+
+    def park(self, rows):
+        """Cell the crane starts from and passes through to reach the buffer."""
+        return (rows, 0)
+
+    def travel(self, heights, start, end):
+        """
+        Cells the hook travels from start to end, rising above the stacks in between.
+
+        Args:
+            heights (list): Occupied height of each column.
+            start (tuple): (row, column) the hook leaves from.
+            end (tuple): (row, column) the hook arrives at.
+        """
+        (r0, c0), (r1, c1) = start, end
+        if c0 == c1:
+            return abs(r0 - r1)
+
+        lo, hi = (c0, c1) if c0 < c1 else (c1, c0)
+        clearance = max(r0, r1)
+        for c in range(lo + 1, hi):
+            if heights[c] > clearance:
+                clearance = heights[c]
+        return (clearance - r0) + (hi - lo) + (clearance - r1)
+
+    def empty_travel(self, heights, crane, pick):
+        """Minutes for the bare hook to go from crane to the pick-up cell."""
+        return self.empty_minutes * self.travel(heights, crane, pick)
+
+    def loaded_travel(self, heights, start, end):
+        """Minutes for carrying a container from start to end."""
+        return self.loaded_minutes * self.travel(heights, start, end)
+
+    def column_move(self, heights, crane, src, dst, rows):
+        """
+        Prices moving the top container of src onto dst with the crane at crane.
+
+        Returns:
+            CostBreakdown: The move's cost, or None if the crane path is blocked.
+        """
+        minutes = move_minutes(heights, src, dst, rows)
+        if minutes == -1:
+            return None
+        empty = self.empty_travel(heights, crane, (heights[src] - 1, src))
+        return CostBreakdown(minutes * self.loaded_minutes, empty)
+
+    def column_plan(self, rows, floors, stacks, moves):
+        """
+        Prices a plan of (src, dst) column moves from the park position.
+
+        Returns:
+            CostBreakdown: The plan's cost, or None if a move is blocked.
+        """
+        heights = [floors[c] + len(stacks[c]) for c in range(len(stacks))]
+        crane = self.park(rows)
+        cost = CostBreakdown()
+
+        for src, dst in moves:
+            move = self.column_move(heights, crane, src, dst, rows)
+            if move is None:
+                return None
+            cost.add(move)
+            heights[src] -= 1
+            crane = (heights[dst], dst)
+            heights[dst] += 1
+
+        return cost
+
+    def step_plan(self, ship_grid, steps, ship_grids):
+        """
+        Prices a plan in the step format balance() returns.
+
+        Every sub-step is one cell of loaded travel; the empty travel to each move's
+        first cell is measured over the grid as it stood before that move.
+
+        Args:
+            ship_grid (list): Grid before the first step.
+            steps (list): One list of Moves per container move.
+            ship_grids (list): Grid after each move.
+
+        Returns:
+            CostBreakdown: The plan's cost.
+        """
+        crane = self.park(len(ship_grid))
+        cost = CostBreakdown()
+        before = ship_grid
+
+        for step, after in zip(steps, ship_grids):
+            if step:
+                cost.empty += self.empty_travel(column_heights(before), crane, step[0].start)
+                cost.loaded += self.loaded_minutes * len(step)
+                crane = step[-1].end
+            before = after
+
+        return cost
+
+
+# Model used wherever a planner is not handed one explicitly
+DEFAULT_COST_MODEL = CraneCostModel()
+
+
+class CraneRun:
+    """
+    Follows the crane through a plan that is built move by move, as the loader does.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+    """
+
+    def __init__(self, rows, cost_model=None):
+        self.model = cost_model or DEFAULT_COST_MODEL
+        self.rows = rows
+        self.position = self.model.park(rows)
+        self.cost = CostBreakdown()
+
+    def copy(self):
+        crane = CraneRun(self.rows, self.model)
+        crane.position = self.position
+        crane.cost = CostBreakdown().add(self.cost)
+        return crane
+
+    def move(self, heights, start, end):
+        """
+        Sends the hook to start and carries the container there to end.
+
+        Returns:
+            int: Minutes charged for the move, empty travel included.
+        """
+        empty = self.model.empty_travel(heights, self.position, start)
+        loaded = self.model.loaded_travel(heights, start, end)
+        self.cost.add(CostBreakdown(loaded, empty))
+        self.position = end
+        return empty + loaded
+
+    def to_buffer(self, heights, start, inside=None):
+        """
+        Carries the container at start off the ship to the buffer. Returns the minutes charged.
+
+        Args:
+            inside (CostBreakdown): Travel inside the buffer, as BufferGrid.store() prices it.
+        """
+        minutes = self.move(heights, start, self.model.park(self.rows))
+        self.cost.transfer += self.model.buffer_transfer_minutes
+        if inside is not None:
+            self.cost.add(inside)
+            minutes += inside.total
+        return minutes + self.model.buffer_transfer_minutes
+
+    def from_buffer(self, heights, end, inside=None):
+        """
+        Brings a container from the buffer back to end on the ship. Returns the minutes charged.
+
+        Args:
+            inside (CostBreakdown): Travel inside the buffer, as BufferGrid.take() prices it.
+        """
+        park = self.model.park(self.rows)
+        empty = self.model.empty_travel(heights, self.position, park)
+        loaded = self.model.loaded_travel(heights, park, end)
+        self.cost.add(CostBreakdown(loaded, empty, self.model.buffer_transfer_minutes))
+        self.position = end
+        minutes = empty + loaded + self.model.buffer_transfer_minutes
+        if inside is not None:
+            self.cost.add(inside)
+            minutes += inside.total
+        return minutes
@@ -0,0 +1,174 @@
+from tasks.crane_cost import DEFAULT_COST_MODEL
+
+
+def reachable_sums(weights):
+    """Bitset of the weights a subset of the containers can add up to, like BalanceOracle keeps."""
+    reachable = 1
+    for weight in weights:
+        reachable |= reachable << int(round(weight))
+    return reachable
+
+
+def balance_miss(left_balance, right_balance, rest_weight, reachable):
+    """
+    Weight by which the best split of the remaining loads misses the 0.9 - 1.1 rule.
+
+    Positive when the port side ends up too heavy, negative when the starboard
+    side does.
+
+    Args:
+        left_balance (float): Port-side weight before the remaining loads.
+        right_balance (float): Starboard weight before the remaining loads.
+        rest_weight (float): Total weight of the remaining loads.
+        reachable (int): reachable_sums() of the remaining loads, the weights they can add to port.
+
+    Returns:
+        int: 0 when some split balances the ship.
+    """
+    left_balance = int(round(left_balance))
+    total = left_balance + int(round(right_balance)) + int(round(rest_weight))
+    if total == 0:
+        return 0
+
+    # Port-side additions s that balance the ship: 0.9 < (left + s) / (total - left - s) < 1.1
+    low = max(9 * total // 19 + 1 - left_balance, 0)
+    high = (11 * total - 1) // 21 - left_balance
+    if high < 0:
+        return -high
+    if low <= high and (reachable >> low) & ((1 << (high - low + 1)) - 1):
+        return 0
+
+    misses = []
+    below = (reachable & ((1 << low) - 1)).bit_length() - 1
+    if below >= 0:
+        misses.append(below - low)
+    above_bits = reachable >> (high + 1)
+    if above_bits:
+        misses.append((above_bits & -above_bits).bit_length())
+    return min(misses, key=abs)
+
+
+def rebalance_minutes(state, miss, cost_model):
+    """
+    Estimated crane minutes of the balancing pass a miss would take afterwards.
+
+    Costed like deficit_estimate(): each container on the heavy side is charged
+    its column distance to the keel line plus two cells for each container on
+    top of it, and the estimate is the cheapest run of the cheapest containers
+    whose weight covers the miss.
+
+    Args:
+        miss (int): balance_miss() of the ship.
+    """
+    if miss == 0:
+        return 0
+
+    halfway_line = state.columns // 2
+    heavy_columns = range(halfway_line) if miss > 0 else range(halfway_line, state.columns)
+    candidates = []
+    for c in heavy_columns:
+        distance = halfway_line - c if c < halfway_line else c - halfway_line + 1
+        cells = [r for r in range(int(state.heights[c]) - 1, -1, -1) if state.occupied[r, c]]
+        candidates.extend((distance + 2 * depth, state.weights[r, c].item()) for depth, r in enumerate(cells))
+    candidates.sort()
+
+    best, spent, moved = None, 0, 0
+    for cost, weight in candidates:
+        if moved + weight >= abs(miss) and (best is None or spent + cost < best):
+            best = spent + cost
+        spent += cost
+        moved += weight
+        if best is not None and spent >= best:
+            break
+    return cost_model.loaded_minutes * (best if best is not None else spent)
+
+
+def burial_minutes(heights, cost_model, slot, pending, rows):
+    """
+    Crane minutes for taking a container set down on slot off again, or 0 if
+    nothing pending is below it.
+
+    The container goes to the nearest free slot clear of pending unloads, or
+    through the buffer and back when no column has room.
+
+    Args:
+        heights (list): Occupied height of each column before the load.
+        pending (set): Cells of the containers due to be unloaded.
+    """
+    if not any(col == slot[1] and row < slot[0] for row, col in pending):
+        return 0
+
+    after = list(heights)
+    after[slot[1]] += 1
+    columns = {col for _, col in pending}
+    slots = [(after[c], c) for c in range(len(after)) if c != slot[1] and after[c] < rows]
+    slots = [drop for drop in slots if drop[1] not in columns] or slots
+    if slots:
+        return min(cost_model.loaded_travel(after, slot, drop) for drop in slots)
+    park = cost_model.park(rows)
+    return 2 * (cost_model.loaded_travel(after, slot, park) + cost_model.buffer_transfer_minutes)
+
+
+def choose_load_slot(state, weight, rest, origin, cost_model=None, pending=(), then=None, exclude=()):
+    """
+    Slot for the next container to load, weighing balance, crane time and burial.
+
+    The balance_miss() of the ship once this container is down, the pending
+    unloads are off and the loads still to come are split as well as they can
+    be ranks first: while some slot keeps balance in reach, only those slots are
+    considered, so the ship comes out of the load cycle within tolerance and
+    needs no balancing pass. Among them, each slot is charged the loaded trip
+    from the origin, the empty trip on to then, and the minutes to move the
+    container off again before a pending unload it would bury. When balance is
+    out of reach whatever the slot, the charge also covers rebalance_minutes()
+    for the miss, so a load goes out of its way for balance only when that is
+    cheaper than the balancing it saves.
+
+    Args:
+        state (ShipState): Layout before the load; not modified.
+        weight (float): Weight of the container to load.
+        rest (list): Weights of the containers to load after it.
+        origin (tuple): Cell containers come aboard through.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+        pending (set): Cells of the containers due to be unloaded.
+        then (tuple): Cell the hook goes to next; the origin when omitted.
+        exclude (set): Columns not to load on.
+
+    Returns:
+        tuple: (row, column), or None if no slot is free.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    then = then or origin
+    heights = state.heights.tolist()
+
+    left_balance, right_balance, _ = state.balance()
+    for row, col in pending:
+        if state.tracker.is_left(col):
+            left_balance -= state.weights[row, col].item()
+        else:
+            right_balance -= state.weights[row, col].item()
+    reachable, rest_weight = reachable_sums(rest), sum(rest)
+    misses = (
+        balance_miss(left_balance, right_balance + weight, rest_weight, reachable),
+        balance_miss(left_balance + weight, right_balance, rest_weight, reachable),
+    )
+    penalties = [rebalance_minutes(state, miss, cost_model) for miss in misses]
+
+    best, best_score = None, None
+    for c in range(state.columns):
+        row = state.lowest_free(c)
+        if c in exclude or row == -1:
+            continue
+        slot = (row, c)
+
+        after = list(heights)
+        after[c] += 1
+        minutes = cost_model.loaded_travel(heights, origin, slot) + cost_model.empty_travel(after, slot, then)
+        minutes += burial_minutes(heights, cost_model, slot, pending, state.rows)
+
+        side = state.tracker.is_left(c)
+        score = (misses[side] != 0, minutes + penalties[side], abs(misses[side]), c)
+        if best_score is None or score < best_score:
+            best, best_score = slot, score
+
+    return best
@@ -0,0 +1,122 @@
+# What a crane move does; the balancing planners only emit BALANCE moves
+BALANCE = "balance"
+RELOCATE = "relocate"
+BUFFER = "buffer"
+LOAD = "load"
+UNLOAD = "unload"
+MOVE_KINDS = (BALANCE, RELOCATE, BUFFER, LOAD, UNLOAD)
+
+
+class Move:
+    """
+    One crane move of a container from one cell to another.
+
+    The balancing planners emit one Move per cell the container travels, so a
+    container move is a list of them; the loader emits one per crane trip.
+    Cells are 0-based (row, column) pairs with row 0 at the bottom, as in the
+    grid. A move to (-1, -1) is a greedy run that found nowhere to go.
+
+    Args:
+        container (str): Name of the container carried.
+        cost (int): Crane minutes the move takes.
+        kind (str): One of MOVE_KINDS.
+    """
+
+    __slots__ = ("from_row", "from_col", "to_row", "to_col", "container", "cost", "kind")
+
+    def __init__(self, from_row, from_col, to_row, to_col, container=None, cost=1, kind=BALANCE):
+        self.from_row = from_row
+        self.from_col = from_col
+        self.to_row = to_row
+        self.to_col = to_col
+        self.container = container
+        self.cost = cost
+        self.kind = kind
+
+    @classmethod
+    def between(cls, start, end, container=None, cost=1, kind=BALANCE):
+        """Move from the start cell to the end cell."""
+        return cls(int(start[0]), int(start[1]), int(end[0]), int(end[1]), container, cost, kind)
+
+    @property
+    def start(self):
+        return self.from_row, self.from_col
+
+    @property
+    def end(self):
+        return self.to_row, self.to_col
+
+    @property
+    def stalled(self):
+        """True for the move a stalled greedy run records instead of a destination."""
+        return self.to_row < 0 or self.to_col < 0
+
+    def label(self):
+        """The move in the 1-based [row,column] cells the pages show."""
+        return f"[{self.from_row + 1},{self.from_col + 1}] to [{self.to_row + 1},{self.to_col + 1}]"
+
+    def as_tuple(self):
+        return self.from_row, self.from_col, self.to_row, self.to_col, self.container, self.cost, self.kind
+
+    def __reduce__(self):
+        # Pickles as the bare tuple, which keeps plans sent between processes small
+        return Move, self.as_tuple()
+
+    def __eq__(self, other):
+        return isinstance(other, Move) and self.as_tuple() == other.as_tuple()
+
+    def __hash__(self):
+        return hash(self.as_tuple())
+
+    def __str__(self):
+        return f"[{self.from_row}, {self.from_col}] to [{self.to_row}, {self.to_col}]"
+
+    def __repr__(self):
+        return f"Move({str(self)}, {self.container!r}, cost={self.cost}, kind={self.kind!r})"
+
+
+class Plan(list):
+    """
+    A plan as the balancing planners return it: one list of Moves per container move.
+
+    It is a list, so the pages index and iterate it as before, with Move objects
+    where the "[r, c] to [r, c]" strings used to be.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_paths(cls, paths, containers=None, kind=BALANCE):
+        """
+        Builds a plan from the cells each container passes through.
+
+        Args:
+            paths (list): Per container move, the cells from pick-up to drop-off.
+            containers (list): Name of the container on each path; None when unknown.
+        """
+        plan = cls()
+        for i, path in enumerate(paths):
+            container = containers[i] if containers is not None else None
+            plan.append([Move.between(a, b, container, kind=kind) for a, b in zip(path, path[1:])])
+        return plan
+
+    def moves(self):
+        """Every Move of the plan, in order."""
+        return [move for step in self for move in step]
+
+    def endpoints(self, index):
+        """(start cell, end cell) of one container move."""
+        step = self[index]
+        return step[0].start, step[-1].end
+
+    @property
+    def stalled(self):
+        return any(move.stalled for step in self for move in step)
+
+    def as_tuples(self):
+        """The plan as nested tuples of ints and strings, for storage."""
+        return tuple(tuple(move.as_tuple() for move in step) for step in self)
+
+    @classmethod
+    def from_tuples(cls, rows):
+        return cls([Move(*row) for row in step] for step in rows)
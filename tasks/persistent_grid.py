@@ -0,0 +1,132 @@
+class PersistentGrid:
+    """
+    A ship grid whose copies share their rows until one of them is written.
+
+    It reads like the list-of-lists grids the pages use: grid[r][c] is the Slot
+    in row r, column c, len(grid) is the number of rows and iterating yields the
+    rows. The rows are kept as tuples of Slots, so copy() shares them all and is
+    O(1), and writing a cell, through grid[r][c] = slot or grid[r][:] = row,
+    copies only the row written and the tuple of rows in the grid written to.
+    with_cells() builds the grid after a step the same way, so a run of grids
+    that differ by a few cells shares everything else.
+
+    Slot objects are shared between the grids too: replace a cell rather than
+    change its Slot's attributes.
+
+    Args:
+        rows (tuple): Tuple of rows, each a tuple of Slot objects, row 0 at the bottom.
+    """
+
+    __slots__ = ("rows",)
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def from_grid(cls, ship_grid):
+        """A PersistentGrid holding the grid's Slots; a copy() when it already is one."""
+        if isinstance(ship_grid, PersistentGrid):
+            return ship_grid.copy()
+        return cls(tuple(tuple(row) for row in ship_grid))
+
+    @classmethod
+    def from_cells(cls, cells, columns):
+        """A PersistentGrid of Slots listed row by row."""
+        return cls(tuple(tuple(cells[i:i + columns]) for i in range(0, len(cells), columns)))
+
+    def copy(self):
+        return PersistentGrid(self.rows)
+
+    def with_cells(self, changes):
+        """
+        The grid with some cells replaced; this one is not modified.
+
+        Only the rows holding a changed cell are copied.
+
+        Args:
+            changes (iterable): (row * columns + column, Slot) pairs.
+        """
+        columns = len(self.rows[0])
+        touched = {}
+        for i, slot in changes:
+            r, c = divmod(i, columns)
+            if r not in touched:
+                touched[r] = list(self.rows[r])
+            touched[r][c] = slot
+        if not touched:
+            return self.copy()
+        rows = list(self.rows)
+        for r, row in touched.items():
+            rows[r] = tuple(row)
+        return PersistentGrid(tuple(rows))
+
+    def set_row(self, r, row):
+        """Replaces row r of this grid only."""
+        rows = list(self.rows)
+        rows[r] = tuple(row)
+        self.rows = tuple(rows)
+
+    def to_lists(self):
+        """The grid as a list of lists of the same Slots."""
+        return [list(row) for row in self.rows]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, r):
+        if isinstance(r, slice):
+            return [GridRow(self, i) for i in range(*r.indices(len(self.rows)))]
+        if r < 0:
+            r += len(self.rows)
+        if not 0 <= r < len(self.rows):
+            raise IndexError("grid row out of range")
+        return GridRow(self, r)
+
+    def __setitem__(self, r, row):
+        self.set_row(r, row)
+
+    def __iter__(self):
+        for r in range(len(self.rows)):
+            yield GridRow(self, r)
+
+    def __reduce__(self):
+        return PersistentGrid, (self.rows,)
+
+    def __repr__(self):
+        return f"PersistentGrid({len(self.rows)}x{len(self.rows[0]) if self.rows else 0})"
+
+
+class GridRow:
+    """
+    Row r of a PersistentGrid, read and written like a list of Slots.
+
+    Writes go to the grid, which copies the row first, so other grids sharing
+    it are not affected. Slices come back as lists.
+    """
+
+    __slots__ = ("grid", "r")
+
+    def __init__(self, grid, r):
+        self.grid = grid
+        self.r = r
+
+    def __len__(self):
+        return len(self.grid.rows[self.r])
+
+    def __getitem__(self, c):
+        row = self.grid.rows[self.r]
+        return list(row[c]) if isinstance(c, slice) else row[c]
+
+    def __setitem__(self, c, value):
+        row = list(self.grid.rows[self.r])
+        row[c] = value
+        self.grid.set_row(self.r, row)
+
+    def __iter__(self):
+        return iter(self.grid.rows[self.r])
+
+    def copy(self):
+        return list(self.grid.rows[self.r])
+
+    def __repr__(self):
+        return f"GridRow({self.r}, {list(self.grid.rows[self.r])!r})"
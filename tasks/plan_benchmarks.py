@@ -0,0 +1,585 @@
+"""
+Wall-time and plan-quality benchmarks for the planners on the bundled manifests.
+
+Run from the repository root:
+
+    python -m tasks.plan_benchmarks
+"""
+
+import contextlib
+import copy
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from tasks.ship_balancer import (
+    ShipState,
+    Slot,
+    TranspositionTable,
+    run_sift,
+    create_ship_grid,
+    update_ship_grid,
+    balance,
+    calculate_balance,
+)
+from tasks.ship_loader import SECONDS_PER_MINUTE, plan_load, plan_unload, unload_containers
+from tasks.transfer_planner import plan_transfer, transfer_baseline
+from tasks.balance_search import astar_balance
+from tasks.balance_layout import layout_balance
+from tasks.balance_anytime import plan_balance
+from tasks.balance_portfolio import portfolio_balance
+from tasks.sift_planner import sift_balance
+from tasks.balance_beam import beam_balance
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.plan_cache import PLAN_CACHE, PlanCache, decode_plan, encode_plan, plan_key
+from tasks.unload_search import UNLOAD_BEAM_WIDTH
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+MANIFESTS = ["ShipCase1", "ShipCase2", "ShipCase3", "ShipCase4", "ShipCase5", "SilverQueen"]
+
+
+def load_manifest(name, rows=8, columns=12):
+    """
+    Loads one of the bundled manifests.
+
+    Returns:
+        tuple: (ship_grid, containers) as produced by update_ship_grid.
+    """
+    ship_grid, containers = create_ship_grid(rows, columns), []
+    with open(os.path.join(DATA_DIR, name + ".txt"), "r") as file:
+        update_ship_grid(file.read().splitlines(), ship_grid, containers)
+    return ship_grid, containers
+
+
+def synthetic_manifest(seed, count, rows=8, columns=12):
+    """
+    Builds a reproducible random manifest with count containers.
+
+    The outer columns get a NAN floor like the bundled manifests, and port-side
+    containers are drawn heavier so the ship starts out of balance.
+
+    Returns:
+        list: Manifest lines in the "[rr,cc], {wwwww}, name" format.
+    """
+    rng = random.Random(seed)
+    floors = [1 if c in (0, columns - 1) else 0 for c in range(columns)]
+    heights = list(floors)
+
+    for _ in range(count):
+        open_columns = [c for c in range(columns) if heights[c] < rows]
+        heights[rng.choice(open_columns)] += 1
+
+    lines = []
+    for r in range(rows):
+        for c in range(columns):
+            if r < floors[c]:
+                weight, name = 0, "NAN"
+            elif r < heights[c]:
+                weight = rng.randint(500, 9999) if c < columns // 2 else rng.randint(100, 5000)
+                name = f"Box{r:02}{c:02}"
+            else:
+                weight, name = 0, "UNUSED"
+            lines.append(f"[{r + 1:02},{c + 1:02}], {{{weight:05}}}, {name}")
+
+    return lines
+
+
+def run_balance_planner(planner, name):
+    """
+    Runs one balance planner on one manifest with its console chatter suppressed.
+
+    Args:
+        planner (callable): balance() or a planner with the same contract.
+        name (str or list): A bundled manifest name, or manifest lines.
+
+    Returns:
+        dict: Wall time, container moves, crane minutes under the default cost model
+        (and the part of them spent travelling empty), status and final balance.
+        status is "no plan" when the planner returned None for its steps.
+        crashed holds the exception a planner raised, as "Type: message", and
+        status is then "crashed"; it is None otherwise.
+    """
+    if isinstance(name, str):
+        ship_grid, containers = load_manifest(name)
+    else:
+        ship_grid, containers = create_ship_grid(8, 12), []
+        update_ship_grid(name, ship_grid, containers)
+
+    initial = [row[:] for row in ship_grid]
+    start = time.perf_counter()
+    crashed = None
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), PLAN_CACHE.disabled():
+            result = planner(ship_grid, containers)
+    except Exception as e:
+        # A crash is a failed run, reported in the row rather than dropped
+        crashed = describe_crash(e)
+        result = ([], [], "crashed")
+    elapsed = time.perf_counter() - start
+
+    steps, ship_grids, status = (result[0] or [], result[1] or [], result[-1])
+    if result[0] is None:
+        # The planner reported it has no plan
+        status = "no plan"
+    cost = DEFAULT_COST_MODEL.step_plan(initial, steps, ship_grids)
+    left_balance, right_balance, _ = calculate_balance(ship_grid)
+
+    return {
+        "ms": elapsed * 1000,
+        "moves": len(steps),
+        "minutes": cost.total,
+        "empty": cost.empty,
+        "status": status,
+        "balance": (left_balance, right_balance),
+        "crashed": crashed,
+    }
+
+
+def describe_crash(error):
+    """An exception as the benchmarks report it: "Type: message"."""
+    return f"{type(error).__name__}: {error}"
+
+
+def benchmark_balance(planners=None):
+    """Prints one row per bundled manifest and planner."""
+    planners = planners or {"greedy": balance, "astar": astar_balance, "layout": layout_balance}
+
+    print(f"{'manifest':<12} {'planner':<10} {'ms':>9} {'moves':>6} {'minutes':>8} {'empty':>6}  status  left/right")
+    for name in MANIFESTS:
+        for label, planner in planners.items():
+            row = run_balance_planner(planner, name)
+            print(
+                f"{name:<12} {label:<10} {row['ms']:>9.1f} {row['moves']:>6} {row['minutes']:>8} {row['empty']:>6}  "
+                f"{str(row['status']):<6}  {row['balance'][0]}/{row['balance'][1]}"
+                + (f"  {row['crashed']}" if row["crashed"] else "")
+            )
+
+
+def benchmark_synthetic(planners=None, counts=(10, 20, 30, 40), seeds=range(5)):
+    """Prints average wall time and crane minutes on synthetic manifests."""
+    planners = planners or {"greedy": balance, "layout": layout_balance}
+
+    print(f"{'containers':>10} {'planner':<10} {'avg ms':>9} {'max ms':>9} {'avg min':>8}  balanced  crashed")
+    for count in counts:
+        manifests = [synthetic_manifest(seed, count) for seed in seeds]
+        for label, planner in planners.items():
+            rows = [run_balance_planner(planner, lines) for lines in manifests]
+            print(
+                f"{count:>10} {label:<10} {sum(r['ms'] for r in rows) / len(rows):>9.1f} "
+                f"{max(r['ms'] for r in rows):>9.1f} {sum(r['minutes'] for r in rows) / len(rows):>8.1f}  "
+                f"{sum(1 for r in rows if r['status'] is True):>4}/{len(rows):<4} "
+                f"{sum(1 for r in rows if r['crashed']):>7}"
+            )
+
+
+def measure(fn, repeat=1):
+    """
+    Runs fn with its console chatter suppressed.
+
+    Returns:
+        tuple: (average milliseconds, peak bytes allocated during one run)
+    """
+    with contextlib.redirect_stdout(io.StringIO()), PLAN_CACHE.disabled():
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+    return (time.perf_counter() - start) * 1000 / repeat, peak
+
+
+def benchmark_state():
+    """
+    Compares a Slot-grid deepcopy with ShipState.copy() per planning step, and the
+    wall time and peak memory of whole greedy balance and unload plans.
+    """
+    print(f"{'manifest':<12} {'deepcopy us':>12} {'kB':>6} {'state us':>9} {'kB':>6}  "
+          f"{'balance ms':>10} {'kB':>7} {'unload ms':>10} {'kB':>7}")
+    for name in MANIFESTS:
+        ship_grid, containers = load_manifest(name)
+        state = ShipState.from_grid(ship_grid)
+        grid_ms, grid_peak = measure(lambda: copy.deepcopy(ship_grid), repeat=200)
+        state_ms, state_peak = measure(lambda: state.copy(), repeat=200)
+
+        balance_ms, balance_peak = measure(lambda: balance(*load_manifest(name)))
+        names = [ship_grid[r][c].container.name for r, c in containers[:3]]
+        unload_ms, unload_peak = measure(lambda: unload_containers(ship_grid, names), repeat=20)
+
+        print(
+            f"{name:<12} {grid_ms * 1000:>12.1f} {grid_peak / 1024:>6.1f} {state_ms * 1000:>9.1f} "
+            f"{state_peak / 1024:>6.1f}  {balance_ms:>10.1f} {balance_peak / 1024:>7.1f} "
+            f"{unload_ms:>10.2f} {unload_peak / 1024:>7.1f}"
+        )
+
+
+def benchmark_transpositions(counts=(10, 20), seeds=range(5)):
+    """Prints nearest_available() cache hits, misses and hit rate for greedy balance() runs."""
+    cases = [(name, name) for name in MANIFESTS]
+    cases += [(f"synth{count}-{seed}", synthetic_manifest(seed, count)) for count in counts for seed in seeds]
+
+    print(f"{'manifest':<12} {'ms':>8}  {'nearest hit/miss':>17} {'rate':>5}")
+    for label, manifest in cases:
+        table = TranspositionTable()
+        row = run_balance_planner(lambda grid, containers: balance(grid, containers, table), manifest)
+        nearest = table.stats().get("nearest_available", (0, 0, 0.0))
+        print(f"{label:<12} {row['ms']:>8.1f}  {nearest[0]:>8}/{nearest[1]:<8} {nearest[2]:>5.0%}")
+
+
+def benchmark_anytime(budgets=(250, 2000), counts=(10, 20, 40), seeds=range(3)):
+    """Prints plan_balance() wall time, plan minutes and proven lower bound per budget."""
+    cases = [(name, name) for name in MANIFESTS]
+    cases += [(f"synth{count}-{seed}", synthetic_manifest(seed, count)) for count in counts for seed in seeds]
+
+    print(f"{'manifest':<12} {'budget':>7} {'ms':>8} {'minutes':>8} {'bound':>6}  source")
+    for label, manifest in cases:
+        for budget in budgets:
+            def planner(grid, containers):
+                plan = plan_balance(grid, budget, containers)
+                return plan.steps, plan.ship_grids, plan
+
+            row = run_balance_planner(planner, manifest)
+            plan = row["status"]
+            if row["crashed"]:
+                print(f"{label:<12} {budget:>7} {row['ms']:>8.1f}  crashed: {row['crashed']}")
+                continue
+            print(
+                f"{label:<12} {budget:>7} {row['ms']:>8.1f} {row['minutes']:>8} "
+                f"{str(plan.lower_bound):>6}  {plan.source}"
+            )
+
+def benchmark_portfolio(counts=(10, 20)):
+    """Compares the greedy planner with the process-pool portfolio of planner variants."""
+    planners = {"greedy": balance, "portfolio": portfolio_balance}
+    benchmark_balance(planners)
+    print()
+    benchmark_synthetic(planners, counts)
+
+
+def benchmark_sift(counts=(10, 20, 40, 60), seeds=range(5)):
+    """Compares the greedy sift() with the SIFT planner: container moves, crane minutes and wall time."""
+    planners = {
+        "sift": lambda grid, containers: run_sift(grid, containers) + (False,),
+        "planner": lambda grid, containers: sift_balance(grid) + (False,),
+    }
+    cases = [(name, name) for name in MANIFESTS]
+    cases += [(f"synth{count}-{seed}", synthetic_manifest(seed, count)) for count in counts for seed in seeds]
+
+    print(f"{'manifest':<12} {'planner':<8} {'ms':>8} {'moves':>6} {'minutes':>8}")
+    for label, manifest in cases:
+        for name, planner in planners.items():
+            row = run_balance_planner(planner, manifest)
+            if row["crashed"]:
+                print(f"{label:<12} {name:<8} {row['ms']:>8.1f}  crashed: {row['crashed']}")
+                continue
+            if row["status"] == "no plan":
+                print(f"{label:<12} {name:<8} {row['ms']:>8.1f}  no plan")
+                continue
+            print(f"{label:<12} {name:<8} {row['ms']:>8.1f} {row['moves']:>6} {row['minutes']:>8}")
+
+
+def benchmark_beam(widths=(1, 2, 4, 8, 16, 32, 64), counts=(10, 20, 40), seeds=range(3)):
+    """
+    Prints the beam width curve: plan minutes and wall time per width.
+
+    Columns cover the bundled manifests and a synthetic set separately; the greedy
+    and layout planners are listed first for reference. Plans that do not end
+    balanced are left out of the minutes; planners that crash are counted too.
+    """
+    sets = {
+        "bundled": list(MANIFESTS),
+        "synthetic": [synthetic_manifest(seed, count) for count in counts for seed in seeds],
+    }
+    planners = {"greedy": balance, "layout": layout_balance}
+    planners.update({
+        f"beam {width}": (lambda width: lambda grid, containers: beam_balance(grid, containers, width))(width)
+        for width in widths
+    })
+
+    print(f"{'planner':<10} {'set':<10} {'avg min':>8} {'balanced':>9} {'avg ms':>8} {'max ms':>8} {'crashed':>7}")
+    for label, planner in planners.items():
+        for name, manifests in sets.items():
+            rows = [run_balance_planner(planner, manifest) for manifest in manifests]
+            done = [r for r in rows if r["status"] is True]
+            minutes = sum(r["minutes"] for r in done) / len(done) if done else float("nan")
+            print(
+                f"{label:<10} {name:<10} {minutes:>8.1f} {len(done):>4}/{len(rows):<4} "
+                f"{sum(r['ms'] for r in rows) / len(rows):>8.1f} {max(r['ms'] for r in rows):>8.1f} "
+                f"{sum(1 for r in rows if r['crashed']):>7}"
+            )
+
+
+def benchmark_cache(path=None):
+    """
+    Prints what the plan cache saves per bundled manifest: the planner run it
+    replaces against answering the same request from memory and from disk.
+
+    Args:
+        path (str): SQLite file for a scratch cache; a temporary file when omitted,
+            so the app's own cache is left alone.
+    """
+    # operation -> (planner, cache key arguments after the grid)
+    operations = {
+        "balance": (balance, lambda containers: ([list(loc) for loc in containers], None)),
+        "balance plan": (lambda grid, containers: plan_balance(grid), lambda containers: (DEFAULT_COST_MODEL,)),
+    }
+
+    with tempfile.TemporaryDirectory() as scratch:
+        path = path or os.path.join(scratch, "plan_cache.sqlite")
+        cache, reopened = PlanCache(path), PlanCache(path)
+
+        def cold_get(operation, key):
+            reopened.memory.clear()
+            return reopened.get(operation, key)
+
+        print(f"{'manifest':<12} {'operation':<13} {'plan ms':>9} {'memory ms':>10} {'disk ms':>9} {'kB':>6}")
+        for name in MANIFESTS:
+            for operation, (planner, key_args) in operations.items():
+                ship_grid, containers = load_manifest(name)
+                initial = [row[:] for row in ship_grid]
+                plan_ms, _ = measure(lambda: planner(*load_manifest(name)))
+                with contextlib.redirect_stdout(io.StringIO()), PLAN_CACHE.disabled():
+                    plan = planner(ship_grid, containers)
+                cache.put(operation, plan_key(operation, initial, *key_args(containers)), plan)
+
+                lookup = lambda get: get(operation, plan_key(operation, initial, *key_args(containers)))
+                memory_ms, _ = measure(lambda: lookup(cache.get), repeat=20)
+                disk_ms, _ = measure(lambda: lookup(cold_get), repeat=20)
+                size = len(cache.memory[plan_key(operation, initial, *key_args(containers))])
+                print(f"{name:<12} {operation:<13} {plan_ms:>9.1f} {memory_ms:>10.2f} {disk_ms:>9.2f} {size / 1024:>6.1f}")
+
+
+def benchmark_unload(sizes=(1, 3, 5, 10, 20, 30), counts=(20, 40, 60, 90), seeds=range(3),
+                     widths=(0, 1, UNLOAD_BEAM_WIDTH)):
+    """
+    Prints unload plan seconds and wall time per transfer-list size and beam width.
+
+    Width 0 is the fixed top-row-first order with blockers sent to the buffer on
+    ships over half full and to the nearest column otherwise; the other widths
+    are search_unload_plan() beams. Lists are drawn at random from the bundled
+    manifests and synthetic ships, and only sizes a ship has enough containers
+    for are counted. Plans that crash or report an error are failed and left
+    out of the seconds; crashes are also counted on their own, and the first
+    one of each row is printed under it.
+    """
+    cases = [load_manifest(name)[0] for name in MANIFESTS]
+    for count in counts:
+        for seed in seeds:
+            ship_grid = create_ship_grid(8, 12)
+            update_ship_grid(synthetic_manifest(seed, count), ship_grid, [])
+            cases.append(ship_grid)
+
+    print(f"{'size':>4} {'width':>5} {'lists':>5} {'avg s':>8} {'avg ms':>7} {'max ms':>7} {'failed':>6} {'crashed':>7}")
+    for size in sizes:
+        rng = random.Random(size)
+        lists = []
+        for ship_grid in cases:
+            names = [slot.container.name for row in ship_grid for slot in row if slot.hasContainer]
+            if len(names) >= size:
+                lists.append((ship_grid, rng.sample(names, size)))
+
+        for width in widths:
+            seconds, times, crashes = [], [], []
+            for ship_grid, names in lists:
+                start = time.perf_counter()
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        _, messages, cost, _ = plan_unload(ship_grid, names, width=width)
+                    if not any(message.startswith("Error") for message in messages):
+                        seconds.append(cost)
+                except Exception as e:
+                    crashes.append(describe_crash(e))
+                times.append((time.perf_counter() - start) * 1000)
+            average = sum(seconds) / len(seconds) if seconds else float("nan")
+            print(
+                f"{size:>4} {width:>5} {len(lists):>5} {average:>8.0f} "
+                f"{sum(times) / len(lists):>7.1f} {max(times):>7.1f} {len(lists) - len(seconds):>6} {len(crashes):>7}"
+            )
+            if crashes:
+                print(f"      first crash: {crashes[0]}")
+
+
+def benchmark_transfer(transfers=((1, 1), (3, 3), (5, 2), (2, 6)), counts=(10, 30, 60), seeds=range(3)):
+    """
+    Compares the interleaved transfer planner with unloading and then loading
+    separately, in crane seconds, on random transfer lists.
+
+    Args:
+        transfers (tuple): (unloads, loads) per transfer list.
+    """
+    cases = [(name, load_manifest(name)[0]) for name in MANIFESTS]
+    for count in counts:
+        for seed in seeds:
+            ship_grid = create_ship_grid(8, 12)
+            update_ship_grid(synthetic_manifest(seed, count), ship_grid, [])
+            cases.append((f"synth{count}-{seed}", ship_grid))
+
+    print(f"{'manifest':<12} {'unload':>6} {'load':>5} {'ms':>7} {'seconds':>8} {'separate':>9} {'saved':>6}")
+    for label, ship_grid in cases:
+        names = [slot.container.name for row in ship_grid for slot in row if slot.hasContainer]
+        rng = random.Random(label)
+        for unloads, loads in transfers:
+            unload_names = rng.sample(names, min(unloads, len(names)))
+            load_names = [f"New{i}" for i in range(loads)]
+            weights = {name: rng.randint(100, 9999) for name in load_names}
+
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                plan = plan_transfer(ship_grid, unload_names, load_names, weights, compare=False)
+            elapsed = (time.perf_counter() - start) * 1000
+            with contextlib.redirect_stdout(io.StringIO()):
+                plan.baseline = transfer_baseline(ship_grid, unload_names, load_names, weights)
+            saved = plan.saved if plan.complete else "failed"
+            print(
+                f"{label:<12} {unloads:>6} {loads:>5} {elapsed:>7.1f} {plan.seconds:>8} {plan.baseline:>9} "
+                f"{saved:>6}"
+            )
+
+
+def benchmark_load(sizes=(2, 4, 8, 12), counts=(10, 30, 60), seeds=range(3), budget_ms=250):
+    """
+    Compares balance-aware load placement with the leftmost-column rule.
+
+    For each mode, prints the loading seconds, how many ships came out within
+    balance tolerance, and the seconds of the balancing pass plan_balance() then
+    plans for the rest, SIFT included. Balancing passes that crash or find no
+    plan are counted as failed and left out of the seconds; crashes are also
+    counted on their own, and the first one of each row is printed under it.
+    """
+    cases = [load_manifest(name)[0] for name in MANIFESTS]
+    for count in counts:
+        for seed in seeds:
+            ship_grid = create_ship_grid(8, 12)
+            update_ship_grid(synthetic_manifest(seed, count), ship_grid, [])
+            cases.append(ship_grid)
+
+    print(f"{'size':>4} {'mode':>8} {'ships':>5} {'load s':>7} {'balanced':>8} {'balance s':>9} {'total s':>8} {'failed':>6} "
+          f"{'crashed':>7}")
+    for size in sizes:
+        rng = random.Random(size)
+        lists = []
+        for ship_grid in cases:
+            names = [f"New{i}" for i in range(size)]
+            lists.append((ship_grid, names, {name: rng.randint(100, 9999) for name in names}))
+
+        for mode in (False, True):
+            load_seconds, balance_seconds, balanced, failed, crashes = 0, 0, 0, 0, []
+            for ship_grid, names, weights in lists:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    grid, _, cost, _ = plan_load(ship_grid, names, weights, balance_aware=mode)
+                load_seconds += cost
+                balanced += calculate_balance(grid)[2]
+                try:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        plan = plan_balance(grid, budget_ms)
+                except Exception as e:
+                    crashes.append(describe_crash(e))
+                    failed += 1
+                    continue
+                if plan.status is None:
+                    failed += 1
+                else:
+                    balance_seconds += plan.minutes * SECONDS_PER_MINUTE
+            label = "balance" if mode else "leftmost"
+            print(
+                f"{size:>4} {label:>8} {len(lists):>5} {load_seconds / len(lists):>7.0f} {balanced:>8} "
+                f"{balance_seconds / len(lists):>9.0f} {(load_seconds + balance_seconds) / len(lists):>8.0f} {failed:>6} "
+                f"{len(crashes):>7}"
+            )
+            if crashes:
+                print(f"      first crash: {crashes[0]}")
+
+
+def resident_bytes(obj):
+    """Bytes a copy of obj takes in memory once decoded, as a plan cache hit loads it."""
+    data = encode_plan(obj)
+    tracemalloc.start()
+    loaded = decode_plan(data)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del loaded
+    return current
+
+
+def benchmark_history(counts=(20, 40, 60), seeds=range(3)):
+    """
+    Compares the memory of SIFT plans' grids kept as a list of Slot-grid
+    snapshots, as the planners used to return them, as a list of the
+    PersistentGrids their PlanHistory hands out, and as the PlanHistory itself.
+
+    Prints the bytes each takes in memory, the bytes of the snapshots and of the
+    history as encode_plan() stores them in the plan cache, and the microseconds
+    to take one snapshot with a deepcopy, with PersistentGrid.copy(), and to read
+    one grid back from the history, for the greedy sift() and the SIFT planner.
+    """
+    planners = {"sift": run_sift, "planner": sift_balance}
+    cases = [(name, load_manifest(name)[0]) for name in MANIFESTS]
+    for count in counts:
+        for seed in seeds:
+            ship_grid = create_ship_grid(8, 12)
+            update_ship_grid(synthetic_manifest(seed, count), ship_grid, [])
+            cases.append((f"synth{count}-{seed}", ship_grid))
+
+    print(f"{'manifest':<12} {'planner':<8} {'moves':>6} {'grids kB':>9} {'persist kB':>10} {'history kB':>10} "
+          f"{'cached kB':>10} {'history':>8} {'deepcopy us':>11} {'copy us':>8} {'read us':>8}")
+    for label, ship_grid in cases:
+        for name, planner in planners.items():
+            try:
+                with contextlib.redirect_stdout(io.StringIO()), PLAN_CACHE.disabled():
+                    history = planner(copy.deepcopy(ship_grid))[1]
+            except Exception as e:
+                print(f"{label:<12} {name:<8}  crashed: {describe_crash(e)}")
+                continue
+            if not history:
+                print(f"{label:<12} {name:<8}  no plan")
+                continue
+            grids = list(history)
+            snapshots = [[[Slot(slot.container, slot.hasContainer, slot.available) for slot in row]
+                          for row in grid] for grid in grids]
+
+            deepcopy_ms, _ = measure(lambda: copy.deepcopy(snapshots[-1]), repeat=50)
+            copy_ms, _ = measure(lambda: grids[-1].copy(), repeat=50)
+            start = time.perf_counter()
+            for i in range(len(history)):
+                history[i]
+            read_us = (time.perf_counter() - start) * 1e6 / len(history)
+
+            print(
+                f"{label:<12} {name:<8} {len(history):>6} {resident_bytes(snapshots) / 1024:>9.1f} "
+                f"{resident_bytes(grids) / 1024:>10.1f} {resident_bytes(history) / 1024:>10.1f} "
+                f"{len(encode_plan(snapshots)) / 1024:>10.1f} {len(encode_plan(history)) / 1024:>8.1f} "
+                f"{deepcopy_ms * 1000:>11.1f} {copy_ms * 1000:>8.2f} {read_us:>8.1f}"
+            )
+
+if __name__ == "__main__":
+    benchmark_balance()
+    print()
+    benchmark_synthetic()
+    print()
+    benchmark_state()
+    print()
+    benchmark_transpositions()
+    print()
+    benchmark_anytime()
+    print()
+    benchmark_portfolio()
+    print()
+    benchmark_sift()
+    print()
+    benchmark_beam()
+    print()
+    benchmark_cache()
+    print()
+    benchmark_unload()
+    print()
+    benchmark_transfer()
+    print()
+    benchmark_load()
+    print()
+    benchmark_history()
@@ -0,0 +1,366 @@
+import contextlib
+import functools
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Plans kept in memory, per process
+PLAN_CACHE_ENTRIES = int(os.getenv("PLAN_CACHE_ENTRIES", "128"))
+
+# SQLite file of the on-disk tier; set PLAN_CACHE_PATH to an empty string to keep plans in memory only
+PLAN_CACHE_PATH = os.getenv(
+    "PLAN_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "plan_cache.sqlite"),
+)
+
+# Compressed plan bytes the on-disk tier may hold before the least recently used plans are evicted
+PLAN_CACHE_MAX_BYTES = int(os.getenv("PLAN_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+
+def planner_version():
+    """
+    Hash of the planner sources, so a cached plan never outlives the code that made it.
+
+    Returns:
+        str: Hex digest over every module in tasks/.
+    """
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()[:16]
+
+
+def grid_signature(ship_grid):
+    """
+    Canonical form of a parsed grid: per cell, whether it is usable and what it holds.
+
+    Two uploads of the same manifest give the same signature however the grid
+    objects were built.
+    """
+    return tuple(
+        tuple(
+            (slot.available, slot.hasContainer,
+             None if slot.container is None else (slot.container.name, slot.container.weight))
+            for slot in row
+        )
+        for row in ship_grid
+    )
+
+
+def plan_key(operation, ship_grid, *args):
+    """
+    Cache key for running an operation on a grid.
+
+    Args:
+        operation (str): "balance", "load", "unload", ...
+        ship_grid (list): Grid the operation starts from.
+        *args: Everything else the result depends on, in a repr()-stable form.
+
+    Returns:
+        str: Hex digest of the operation, grid signature and arguments.
+    """
+    return hashlib.sha256(repr((operation, grid_signature(ship_grid), args)).encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def plan_types():
+    """
+    The classes a cached plan may hold, by "module.name".
+
+    Decoding only ever builds these, so a tampered cache file cannot make the
+    app construct anything else. Imported on first use: the planner modules
+    import this one.
+    """
+    from tasks import (balance_anytime, balancing, crane_cost, move_plan, persistent_grid, plan_history,
+                       ship_balancer, transfer_planner)
+    classes = (
+        balance_anytime.BalancePlan, balancing.Container, balancing.Slot, crane_cost.CostBreakdown,
+        move_plan.Move, move_plan.Plan, persistent_grid.PersistentGrid, plan_history.PlanHistory,
+        plan_history.HistoryStep, ship_balancer.Container, ship_balancer.Slot, transfer_planner.TransferPlan,
+    )
+    return {f"{cls.__module__}.{cls.__name__}": cls for cls in classes}
+
+
+def object_fields(obj):
+    """An object's attributes, from its __dict__ and the __slots__ of its classes."""
+    fields = dict(getattr(obj, "__dict__", {}))
+    for cls in type(obj).__mro__:
+        slots = cls.__dict__.get("__slots__", ())
+        for name in (slots,) if isinstance(slots, str) else slots:
+            if hasattr(obj, name):
+                fields[name] = getattr(obj, name)
+    return fields
+
+
+def encode_plan(plan):
+    """
+    A plan as compressed JSON, the form both cache tiers store.
+
+    Lists, numbers, strings, None and bools are stored as they are; tuples and
+    dicts are tagged, and objects of the plan_types() classes are stored once each
+    as their type and fields and referred to by index, so objects the plan shares,
+    like the Slots of a PlanHistory, stay shared when it is decoded.
+
+    Raises:
+        TypeError: When the plan holds anything else.
+    """
+    types = {cls: name for name, cls in plan_types().items()}
+    objects, refs = [], {}
+
+    def encode(value):
+        if value is None or type(value) in (bool, int, float, str):
+            return value
+        if isinstance(value, np.generic):
+            return value.item()
+        if type(value) is list:
+            return [encode(item) for item in value]
+        if type(value) is tuple:
+            return {"tuple": [encode(item) for item in value]}
+        if type(value) is dict:
+            return {"dict": [[encode(k), encode(v)] for k, v in value.items()]}
+        if type(value) not in types:
+            raise TypeError(f"cannot cache a {type(value).__name__}")
+        if id(value) not in refs:
+            refs[id(value)] = len(objects)
+            entry = [types[type(value)], None, None]
+            objects.append(entry)
+            entry[1] = {name: encode(field) for name, field in object_fields(value).items()}
+            if isinstance(value, dict):
+                entry[2] = [[encode(k), encode(v)] for k, v in dict.items(value)]
+            elif isinstance(value, list):
+                entry[2] = [encode(item) for item in value]
+        return {"ref": refs[id(value)]}
+
+    root = encode(plan)
+    return zlib.compress(json.dumps({"objects": objects, "plan": root}, separators=(",", ":")).encode())
+
+
+def decode_plan(blob):
+    """
+    The plan encode_plan() stored, built from fresh objects.
+
+    Raises:
+        ValueError, KeyError, TypeError: When the blob is not a plan encode_plan() wrote.
+    """
+    data = json.loads(zlib.decompress(blob))
+    types = plan_types()
+    objects = [types[name].__new__(types[name]) for name, _, _ in data["objects"]]
+
+    def decode(value):
+        if isinstance(value, list):
+            return [decode(item) for item in value]
+        if isinstance(value, dict):
+            if "ref" in value:
+                return objects[value["ref"]]
+            if "tuple" in value:
+                return tuple(decode(item) for item in value["tuple"])
+            return {decode(k): decode(v) for k, v in value["dict"]}
+        return value
+
+    for obj, (_, fields, items) in zip(objects, data["objects"]):
+        for name, field in fields.items():
+            object.__setattr__(obj, name, decode(field))
+        if isinstance(obj, dict):
+            dict.update(obj, ((decode(k), decode(v)) for k, v in items))
+        elif isinstance(obj, list):
+            list.extend(obj, decode(items))
+    return decode(data["plan"])
+
+
+class PlanCache:
+    """
+    Two-tier cache of finished plans, so a re-uploaded manifest or a page reload
+    does not re-run the planner.
+
+    Plans are stored as compressed JSON (see encode_plan), in an LRU dict in memory
+    and in an SQLite table on disk that every process of the app shares. The file
+    sits on the bind-mounted data/ volume, so nothing read back is unpickled:
+    decoding only builds the plan classes, and a row that does not decode is
+    dropped and counted as a miss. Rows carry the
+    planner version; rows of another version are dropped when the table is opened,
+    and once the stored bytes pass max_bytes the least recently used rows go. A
+    failing disk tier (read-only volume, locked file) is switched off and the cache
+    carries on in memory. Every lookup decodes a fresh copy, so callers may mutate
+    what they get back. hits and misses are counted per operation like in
+    TranspositionTable, with hits split by the tier that answered.
+
+    Args:
+        path (str): SQLite file of the disk tier; None or "" for memory only.
+        entries (int): Plans kept in memory.
+        max_bytes (int): Compressed bytes the disk tier may hold.
+        version (str): Planner version; planner_version() when omitted.
+    """
+
+    def __init__(self, path=PLAN_CACHE_PATH, entries=PLAN_CACHE_ENTRIES, max_bytes=PLAN_CACHE_MAX_BYTES,
+                 version=None):
+        self.path = path or None
+        self.entries = entries
+        self.max_bytes = max_bytes
+        self.version = version or planner_version()
+        self.memory = OrderedDict()
+        self.hits = {}
+        self.memory_hits = {}
+        self.misses = {}
+        self.enabled = True
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pid = None
+
+    def _connect(self):
+        """Opens the disk tier on first use; None when there is none."""
+        if self.pid != os.getpid():
+            # A forked worker (the portfolio's process pool) must not share its parent's connection
+            self.connection, self.pid = None, os.getpid()
+        if self.connection is None and self.path is not None:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS plans "
+                    "(key TEXT PRIMARY KEY, version TEXT, plan BLOB, size INTEGER, used REAL)"
+                )
+                connection.execute("DELETE FROM plans WHERE version != ?", (self.version,))
+                connection.commit()
+                self.connection = connection
+            except (sqlite3.Error, OSError) as e:
+                print(f"Plan cache: disk tier disabled ({e})")
+                self.path = None
+        return self.connection
+
+    def _disk(self, query, params=()):
+        """Runs one statement on the disk tier; switches the tier off if it fails."""
+        connection = self._connect()
+        if connection is None:
+            return None
+        try:
+            rows = connection.execute(query, params).fetchall()
+            connection.commit()
+            return rows
+        except sqlite3.Error as e:
+            print(f"Plan cache: disk tier disabled ({e})")
+            self.connection, self.path = None, None
+            return None
+
+    def _remember(self, key, blob):
+        self.memory[key] = blob
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.entries:
+            self.memory.popitem(last=False)
+
+    def get(self, operation, key):
+        """Returns a fresh copy of the cached plan, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self.lock:
+            blob = self.memory.get(key)
+            if blob is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits[operation] = self.memory_hits.get(operation, 0) + 1
+            else:
+                rows = self._disk("SELECT plan FROM plans WHERE key = ? AND version = ?", (key, self.version))
+                if rows:
+                    blob = rows[0][0]
+                    self._disk("UPDATE plans SET used = ? WHERE key = ?", (time.time(), key))
+                    self._remember(key, blob)
+
+            if blob is not None:
+                try:
+                    plan = decode_plan(blob)
+                except (ValueError, KeyError, TypeError, IndexError, zlib.error) as e:
+                    print(f"Plan cache: dropped an unreadable {operation} plan ({e!r})")
+                    self.memory.pop(key, None)
+                    self._disk("DELETE FROM plans WHERE key = ?", (key,))
+                    blob = None
+
+            if blob is None:
+                self.misses[operation] = self.misses.get(operation, 0) + 1
+                return None
+            self.hits[operation] = self.hits.get(operation, 0) + 1
+        return plan
+
+    def put(self, operation, key, plan):
+        """Stores a plan in both tiers, evicting the least recently used ones as needed."""
+        if not self.enabled:
+            return
+        try:
+            blob = encode_plan(plan)
+        except TypeError as e:
+            print(f"Plan cache: {operation} plan not cached ({e})")
+            return
+        with self.lock:
+            self._remember(key, blob)
+            self._disk(
+                "INSERT OR REPLACE INTO plans (key, version, plan, size, used) VALUES (?, ?, ?, ?, ?)",
+                (key, self.version, blob, len(blob), time.time()),
+            )
+            self._evict()
+
+    def _evict(self):
+        rows = self._disk("SELECT COALESCE(SUM(size), 0) FROM plans")
+        if not rows or rows[0][0] <= self.max_bytes:
+            return
+        excess = rows[0][0] - self.max_bytes
+        doomed, freed = [], 0
+        for key, size in self._disk("SELECT key, size FROM plans ORDER BY used") or []:
+            if freed >= excess:
+                break
+            doomed.append((key,))
+            freed += size
+        connection = self._connect()
+        if connection is not None and doomed:
+            connection.executemany("DELETE FROM plans WHERE key = ?", doomed)
+            connection.commit()
+
+    def clear(self):
+        """Drops every cached plan from both tiers."""
+        with self.lock:
+            self.memory.clear()
+            self._disk("DELETE FROM plans")
+
+    @contextlib.contextmanager
+    def disabled(self):
+        """Runs the planners without the cache, as the benchmarks need."""
+        enabled, self.enabled = self.enabled, False
+        try:
+            yield self
+        finally:
+            self.enabled = enabled
+
+    def hit_rate(self, operation):
+        """Fraction of lookups of this operation answered from the cache."""
+        hits, misses = self.hits.get(operation, 0), self.misses.get(operation, 0)
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def stats(self):
+        """
+        Returns:
+            dict: operation -> (hits, memory hits, misses, hit rate)
+        """
+        operations = sorted(set(self.hits) | set(self.misses))
+        return {
+            operation: (self.hits.get(operation, 0), self.memory_hits.get(operation, 0),
+                        self.misses.get(operation, 0), self.hit_rate(operation))
+            for operation in operations
+        }
+
+    def describe(self):
+        """One line per operation for the pages, e.g. "balance: 3 hits (2 from memory), 4 misses"."""
+        return [
+            f"{operation}: {hits} hits ({memory_hits} from memory), {misses} misses"
+            for operation, (hits, memory_hits, misses, _) in self.stats().items()
+        ]
+
+
+# Cache the planners consult; one per process, sharing the disk tier
+PLAN_CACHE = PlanCache()
@@ -0,0 +1,123 @@
+import os
+
+from tasks.persistent_grid import PersistentGrid
+
+
+# Steps between the checkpoints a PlanHistory keeps; lower reads a grid faster for more memory
+HISTORY_CHECKPOINT_INTERVAL = int(os.getenv("HISTORY_CHECKPOINT_INTERVAL", "16"))
+
+
+class PlanHistory:
+    """
+    The grids a plan passes through, kept as the layout before the plan plus the
+    cells each step changed.
+
+    It reads like the list of grid snapshots the planners used to return:
+    history[i] is the grid after step i, history[-1] the last one, len() the
+    number of steps, and iterating yields every grid in order. Cells are indexed
+    row by row, and a step is stored as the (index, Slot) pairs it wrote. Every
+    interval steps the layout is kept as a checkpoint, a PersistentGrid sharing
+    the rows the steps since the one before did not touch, so history[i] is
+    rebuilt from the checkpoint before it by replaying fewer than interval steps.
+    The grids handed out are PersistentGrids too: each one copies only the rows
+    that differ from its checkpoint, and iterating copies only the rows each step
+    changed. Container and Slot objects are shared with the plan, not copied.
+
+    Args:
+        rows (int): Rows of the grid.
+        columns (int): Columns of the grid.
+        cells (list): Slots of the layout before the plan, row by row.
+        interval (int): Steps between checkpoints; HISTORY_CHECKPOINT_INTERVAL when omitted.
+    """
+
+    def __init__(self, rows, columns, cells, interval=None):
+        self.rows = rows
+        self.columns = columns
+        self.interval = max(1, interval or HISTORY_CHECKPOINT_INTERVAL)
+        self.last = PersistentGrid.from_cells(cells, columns)
+        self.checkpoints = [self.last]
+        self.deltas = []
+
+    @classmethod
+    def from_state(cls, state, interval=None):
+        """History starting from the layout of a ShipState, which records its changes from here on."""
+        state.take_changes()
+        return cls(state.rows, state.columns, state.cells(), interval)
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def append(self, changes):
+        """
+        Records one step.
+
+        Args:
+            changes (iterable): (cell index, Slot) pairs the step wrote.
+
+        Returns:
+            int: Index of the grid after the step.
+        """
+        delta = tuple(changes)
+        self.last = self.last.with_cells(delta)
+        self.deltas.append(delta)
+        if len(self.deltas) % self.interval == 0:
+            self.checkpoints.append(self.last)
+        return len(self.deltas) - 1
+
+    def record(self, state):
+        """Records the cells the ShipState changed since the last record as one step."""
+        return self.append(state.take_changes())
+
+    def step(self, state, name, messages, cost):
+        """
+        Records a loader step.
+
+        Returns:
+            HistoryStep: The step dict the loading page reads, its 'grid' rebuilt on demand.
+        """
+        return HistoryStep(self, self.record(state), name=name, messages=messages, cost=cost)
+
+    def initial_grid(self):
+        """The grid before the first step."""
+        return self.checkpoints[0].copy()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self.deltas)
+        if not 0 <= index < len(self.deltas):
+            raise IndexError("plan history index out of range")
+
+        done = index + 1
+        checkpoint = done // self.interval
+        changes = {}
+        for delta in self.deltas[checkpoint * self.interval:done]:
+            changes.update(delta)
+        return self.checkpoints[checkpoint].with_cells(changes.items())
+
+    def __iter__(self):
+        grid = self.checkpoints[0]
+        for delta in self.deltas:
+            grid = grid.with_cells(delta)
+            yield grid.copy()
+
+
+class HistoryStep(dict):
+    """
+    A loader step dict ('name', 'messages', 'cost') whose 'grid' is not stored
+    but rebuilt from the PlanHistory each time it is read.
+    """
+
+    def __init__(self, history, index, **fields):
+        super().__init__(fields)
+        self.history = history
+        self.index = index
+
+    def __missing__(self, key):
+        if key == 'grid':
+            return self.history[self.index]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return self[key] if key == 'grid' else super().get(key, default)
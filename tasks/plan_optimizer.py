@@ -0,0 +1,396 @@
+from tasks.balance_search import read_columns, replay_moves
+from tasks.buffer_grid import BufferGrid
+from tasks.crane_cost import DEFAULT_COST_MODEL, CostBreakdown, CraneRun
+from tasks.move_plan import BUFFER, UNLOAD
+
+
+# Passes over the plan before the optimizer settles for what it has
+MAX_ROUNDS = 20
+
+
+def simulate_moves(rows, floors, stacks, moves, cost_model, crane=None, cost=None, trace=None):
+    """
+    Replays (src, dst) column moves on plain column stacks.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        floors (list): NAN floor height of each column.
+        stacks (list): Container indices of each column, bottom up; not modified.
+        moves (list): (src, dst) column moves.
+        cost_model (CraneCostModel): Prices the moves.
+        crane (tuple): Crane cell to start from; the park position when omitted.
+        cost (CostBreakdown): Cost already spent, to resume a replay part-way.
+        trace (list): When given, receives (stacks, crane, cost) before every move,
+            which is exactly what a later replay needs to resume from there.
+
+    Returns:
+        tuple: (final stacks, index of the container each move carries, CostBreakdown),
+        or None if a move picks from an empty column or its crane path is blocked.
+    """
+    stacks = [list(stack) for stack in stacks]
+    heights = [floors[c] + len(stacks[c]) for c in range(len(stacks))]
+    crane = crane or cost_model.park(rows)
+    cost = CostBreakdown().add(cost) if cost is not None else CostBreakdown()
+    carried = []
+
+    for src, dst in moves:
+        if src == dst or not stacks[src]:
+            return None
+        if trace is not None:
+            trace.append(([list(stack) for stack in stacks], crane, CostBreakdown().add(cost)))
+        move = cost_model.column_move(heights, crane, src, dst, rows)
+        if move is None:
+            return None
+        cost.add(move)
+
+        carried.append(stacks[src][-1])
+        stacks[dst].append(stacks[src].pop())
+        heights[src] -= 1
+        crane = (heights[dst], dst)
+        heights[dst] += 1
+
+    return stacks, carried, cost
+
+
+def undisturbed(column, moves):
+    """True if moves only ever lift off column what they dropped on it themselves."""
+    depth = 0
+    for src, dst in moves:
+        if dst == column:
+            depth += 1
+        elif src == column:
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+
+def chain_edits(moves, carried):
+    """
+    Candidate rewrites for a container that is moved more than once.
+
+    A container carried A -> B and later B -> C can go A -> C in one move, either
+    at the time of the first move or of the second; when C is A the pair is an
+    oscillation and both moves go. Whatever the moves in between drop on the column
+    the container now waits on (C or A) they must lift off again, and they must
+    not dig below it, or containers would end up stacked in a different order.
+
+    Yields:
+        tuple: (shorter plan to validate, index of its first changed move)
+    """
+    last_move = {}
+    for j, idx in enumerate(carried):
+        i = last_move.get(idx)
+        last_move[idx] = j
+        if i is None:
+            continue
+
+        a, c = moves[i][0], moves[j][1]
+        between = moves[i + 1:j]
+        if a == c:
+            if undisturbed(a, between):
+                yield moves[:i] + between + moves[j + 1:], i
+            continue
+        if undisturbed(c, between):
+            yield moves[:i] + [(a, c)] + between + moves[j + 1:], i
+        if undisturbed(a, between):
+            yield moves[:i] + between + [(a, c)] + moves[j + 1:], i
+
+
+def pair_minutes(rows, heights, crane, first, second, after, cost_model):
+    """
+    Crane minutes for two moves in a row plus the empty trip to the move after them.
+
+    Returns:
+        int: Minutes, or None if either move is blocked.
+    """
+    heights = list(heights)
+    minutes = 0
+    for src, dst in (first, second):
+        move = cost_model.column_move(heights, crane, src, dst, rows)
+        if move is None:
+            return None
+        minutes += move.total
+        heights[src] -= 1
+        crane = (heights[dst], dst)
+        heights[dst] += 1
+    if after is not None:
+        minutes += cost_model.empty_travel(heights, crane, (heights[after[0]] - 1, after[0]))
+    return minutes
+
+
+def swap_neighbours(rows, floors, stacks, moves, cost_model):
+    """
+    One sweep of swapping neighbouring moves that touch four different columns.
+
+    Such a pair leaves the same heights behind in either order, so only the two
+    moves and the empty trip to the next one change; a swap is made when that
+    local cost drops and both moves stay legal.
+
+    Returns:
+        bool: True if any pair was swapped; moves is updated in place.
+    """
+    heights = [floors[c] + len(stacks[c]) for c in range(len(stacks))]
+    crane = cost_model.park(rows)
+    swapped = False
+
+    for i in range(len(moves) - 1):
+        first, second = moves[i], moves[i + 1]
+        if not set(first) & set(second):
+            after = moves[i + 2] if i + 2 < len(moves) else None
+            current = pair_minutes(rows, heights, crane, first, second, after, cost_model)
+            reverse = pair_minutes(rows, heights, crane, second, first, after, cost_model)
+            if current is not None and reverse is not None and reverse < current:
+                moves[i], moves[i + 1] = second, first
+                swapped = True
+
+        src, dst = moves[i]
+        heights[src] -= 1
+        crane = (heights[dst], dst)
+        heights[dst] += 1
+
+    return swapped
+
+
+def optimize_moves(rows, floors, stacks, moves, cost_model=None, max_rounds=MAX_ROUNDS):
+    """
+    Shortens and reorders a plan of column moves without changing where it ends.
+
+    Each round first merges containers that are moved more than once, then swaps
+    neighbouring moves that touch four different columns wherever that cuts empty
+    crane travel. Every merge is replayed from the first move it changes and kept
+    only if every move is still legal, every container ends in the same slot and
+    the plan got no dearer; the round ends with a full replay of the result.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        floors (list): NAN floor height of each column.
+        stacks (list): Container indices of each column, bottom up; not modified.
+        moves (list): (src, dst) column moves.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+        max_rounds (int): Cap on improvement rounds.
+
+    Returns:
+        tuple: (moves, before, after) with the CostBreakdown of the original and the
+        optimised plan, or (moves, None, None) unchanged if the plan is not legal.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    original, moves = list(moves), list(moves)
+    trace = []
+    result = simulate_moves(rows, floors, stacks, moves, cost_model, trace=trace)
+    if result is None:
+        return moves, None, None
+
+    goal, carried, before = result
+    best = before
+
+    for _ in range(max_rounds):
+        improved = False
+
+        merged = True
+        while merged:
+            merged = False
+            for candidate, first in chain_edits(moves, carried):
+                resume, crane, spent = trace[first]
+                result = simulate_moves(rows, floors, resume, candidate[first:], cost_model, crane, spent)
+                if result is not None and result[0] == goal and result[2].total <= best.total:
+                    moves, best = candidate, result[2]
+                    carried = carried[:first] + result[1]
+                    trace = trace[:first]
+                    simulate_moves(rows, floors, resume, candidate[first:], cost_model, crane, spent, trace)
+                    merged = improved = True
+                    break
+
+        if swap_neighbours(rows, floors, stacks, moves, cost_model):
+            improved = True
+
+        if not improved:
+            break
+
+        trace = []
+        result = simulate_moves(rows, floors, stacks, moves, cost_model, trace=trace)
+        if result is None or result[0] != goal:
+            # Cannot happen with the checks above; keep the original plan if it does
+            return original, before, before
+        _, carried, best = result
+
+    return moves, before, best
+
+
+def steps_to_moves(ship_grid, steps):
+    """
+    Reads a plan of Moves as column moves.
+
+    Returns:
+        list: (src, dst) column moves, or None if a move does not pick the top of a
+        column or drop onto the lowest free slot (a stalled greedy run, for example).
+    """
+    rows = len(ship_grid)
+    floors, stacks, _ = read_columns(ship_grid)
+    heights = [floors[c] + len(stacks[c]) for c in range(len(stacks))]
+    moves = []
+
+    for step in steps:
+        if not step:
+            return None
+        (r0, src), (r1, dst) = step[0].start, step[-1].end
+        if src == dst or not 0 <= src < len(heights) or not 0 <= dst < len(heights):
+            return None
+        if r0 != heights[src] - 1 or r1 != heights[dst] or r1 >= rows:
+            return None
+        heights[src] -= 1
+        heights[dst] += 1
+        moves.append((src, dst))
+
+    return moves
+
+
+def optimize_plan(ship_grid, steps, ship_grids, cost_model=None):
+    """
+    Post-pass for any plan in the step format balance() returns.
+
+    The plan is read as column moves, optimised with optimize_moves() and replayed
+    along the lowest clear crane paths, which also straightens detours the greedy
+    planner takes. Plans that cannot be read as column moves come back unchanged.
+
+    Args:
+        ship_grid (list): Grid before the first step; not modified.
+        steps (list): One list of Moves per container move.
+        ship_grids (list): Grid after each move.
+        cost_model (CraneCostModel): Prices the plans; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        tuple: (steps, ship_grids, saved) where saved is the crane minutes saved.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    moves = steps_to_moves(ship_grid, steps)
+    if not moves:
+        return steps, ship_grids, 0
+
+    floors, stacks, _ = read_columns(ship_grid)
+    moves, before, after = optimize_moves(len(ship_grid), floors, stacks, moves, cost_model)
+    if before is None:
+        return steps, ship_grids, 0
+
+    new_steps, new_grids = replay_moves(ship_grid, moves)
+    saved = cost_model.step_plan(ship_grid, steps, ship_grids).total - after.total
+    if saved <= 0:
+        return steps, ship_grids, 0
+    return new_steps, new_grids, saved
+
+
+def simulate_legs(rows, floors, stacks, legs, buffer, crane, trace=None):
+    """
+    Replays the loader's crane legs on plain column stacks.
+
+    A leg is a (src, dst) column move in which the buffer and the truck are fixed
+    endpoints: src may be BUFFER, which hands back the container staged last, and
+    dst BUFFER, or UNLOAD for a container carried off through the origin. Legs are
+    priced the way the loader prices them, with a CraneRun and the BufferGrid.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        floors (list): NAN floor height of each column.
+        stacks (list): Container indices of each column, bottom up; not modified.
+        legs (list): (src, dst) crane legs.
+        buffer (BufferGrid): Buffer before the first leg; not modified.
+        crane (CraneRun): Crane before the first leg; not modified.
+        trace (list): When given, receives (stacks, buffer, crane) before every leg.
+
+    Returns:
+        tuple: (final stacks, index of the container each leg carries, CraneRun), or
+        None if a leg picks from an empty column or buffer, drops on a full column or
+        buffer, or unloads while another container holds the origin.
+    """
+    stacks = [list(stack) for stack in stacks]
+    heights = [floors[c] + len(stacks[c]) for c in range(len(stacks))]
+    buffer, crane = buffer.copy(), crane.copy()
+    origin = (rows - 1, 0)
+    carried = []
+
+    for src, dst in legs:
+        if trace is not None:
+            trace.append(([list(stack) for stack in stacks], buffer.copy(), crane.copy()))
+        on_board = dst not in (BUFFER, UNLOAD)
+        if on_board and heights[dst] >= rows:
+            return None
+
+        if src == BUFFER:
+            taken = buffer.take() if on_board else None
+            if taken is None:
+                return None
+            idx, inside = taken
+            crane.from_buffer(heights, (heights[dst], dst), inside)
+        else:
+            if src == dst or not stacks[src]:
+                return None
+            start = (heights[src] - 1, src)
+            if dst == BUFFER:
+                inside = buffer.store(stacks[src][-1])
+                if inside is None:
+                    return None
+                crane.to_buffer(heights, start, inside)
+            elif dst == UNLOAD:
+                if heights[origin[1]] > origin[0] and start != origin:
+                    return None
+                crane.move(heights, start, origin)
+            else:
+                crane.move(heights, start, (heights[dst], dst))
+            idx = stacks[src].pop()
+            heights[src] -= 1
+
+        carried.append(idx)
+        if on_board:
+            stacks[dst].append(idx)
+            heights[dst] += 1
+
+    return stacks, carried, crane
+
+
+def optimize_legs(rows, floors, stacks, legs, cost_model=None, buffer_capacity=None, max_rounds=MAX_ROUNDS):
+    """
+    Merges containers an unload plan moves more than once, as optimize_moves() does.
+
+    chain_edits() reads the buffer like any other column, so a blocker staged on
+    the dock and brought back later can be set down where it ends up straight
+    away, and one relocated twice goes there in one move. Neighbouring legs are
+    not swapped, since that would reorder the buffer's last in, first out hand-back.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        floors (list): NAN floor height of each column.
+        stacks (list): Container indices of each column, bottom up; not modified.
+        legs (list): (src, dst) crane legs, as simulate_legs() reads them.
+        cost_model (CraneCostModel): Prices the legs; DEFAULT_COST_MODEL when omitted.
+        buffer_capacity (int): Containers that may be staged at once; the whole buffer when omitted.
+        max_rounds (int): Cap on merges.
+
+    Returns:
+        tuple: (legs, before, after) with the CostBreakdown of the original and the
+        optimised plan, or (legs, None, None) unchanged if the plan is not legal.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    buffer = BufferGrid(limit=buffer_capacity, cost_model=cost_model)
+    legs = list(legs)
+    trace = []
+    result = simulate_legs(rows, floors, stacks, legs, buffer, CraneRun(rows, cost_model), trace)
+    if result is None:
+        return legs, None, None
+
+    goal, carried, crane = result
+    before = best = crane.cost
+
+    for _ in range(max_rounds):
+        for candidate, first in chain_edits(legs, carried):
+            resume, resume_buffer, resume_crane = trace[first]
+            result = simulate_legs(rows, floors, resume, candidate[first:], resume_buffer, resume_crane)
+            if result is not None and result[0] == goal and result[2].cost.total <= best.total:
+                legs, best = candidate, result[2].cost
+                carried = carried[:first] + result[1]
+                trace = trace[:first]
+                simulate_legs(rows, floors, resume, candidate[first:], resume_buffer, resume_crane, trace)
+                break
+        else:
+            break
+
+    return legs, before, best
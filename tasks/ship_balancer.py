@@ -1,10 +1,17 @@
-import copy
+import random
 import re
 import numpy as np
 import time
 import plotly.graph_objects as go
 
-from collections.abc import Iterable
+from collections import deque
+
+from tasks.balance_oracle import balance_oracle_for_grid
+from tasks.balance_bounds import BalanceBounds
+from tasks.plan_cache import PLAN_CACHE, plan_key
+from tasks.balance_tracker import BalanceTracker
+from tasks.move_plan import Move, Plan
+from tasks.plan_history import PlanHistory
 
 
 class Container:
@@ -16,12 +23,391 @@ class Container:
 
 
 class Slot:
+    __slots__ = ("container", "hasContainer", "available")
+
     def __init__(self, container: Container, hasContainer, available):
         # unused, NaN (None), or name of container
         self.container = container
         self.hasContainer = hasContainer
         self.available = available
 
+    def __reduce__(self):
+        # Pickles as the bare fields, which keeps plans sent between processes small
+        return Slot, (self.container, self.hasContainer, self.available)
+
+
+class TranspositionTable:
+    """
+    Cache of sub-plan results shared by every copy of one ShipState.
+
+    Entries are keyed by the packed layout key plus the query, so a
+    nearest_available() call on a layout already seen in the same planning
+    session is answered without searching again. hits and misses are counted per
+    kind of query.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.hits = {}
+        self.misses = {}
+
+    def get(self, kind, key):
+        """Returns the cached value, or None on a miss."""
+        value = self.entries.get((kind, key))
+        if value is None:
+            self.misses[kind] = self.misses.get(kind, 0) + 1
+        else:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+        return value
+
+    def put(self, kind, key, value):
+        self.entries[(kind, key)] = value
+
+    def hit_rate(self, kind):
+        """Fraction of lookups of this kind answered from the cache."""
+        hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def stats(self):
+        """
+        Returns:
+            dict: kind -> (hits, misses, hit rate)
+        """
+        kinds = sorted(set(self.hits) | set(self.misses))
+        return {kind: (self.hits.get(kind, 0), self.misses.get(kind, 0), self.hit_rate(kind)) for kind in kinds}
+
+
+class ShipState:
+    """
+    Array-backed ship layout used by the planners.
+
+    occupied, available, weights and ids are rows x columns NumPy arrays, where ids
+    index into containers and are -1 on cells without one. The column index holds,
+    per column, heights (first free row above the NAN floor and containers),
+    counts (containers held) and floors (NAN cells at the bottom, fixed since NAN
+    cells never move); it is updated in O(1) on every change, so top-of-stack,
+    lowest-free-slot and capacity queries never rescan a column. tracker keeps the
+    port / starboard totals current as containers move. tie_break, when set to a
+    random.Random, shuffles equally good choices in the greedy planner. packed is
+    an integer with one occupied and one available bit per cell, updated on every
+    change, and keys the shared TranspositionTable.
+    bounds holds the BalanceBounds lower-bound tables; they are built the first
+    time a planner reads them and kept current from then on, so states that never
+    need them pay nothing. changed has one bit per cell written since the last
+    take_changes(), which is what a PlanHistory stores per step. stalled is set
+    when move_to() finds nowhere to take a container, which makes the plan built
+    on this state unusable.
+    copy() copies the arrays and the containers list, so containers place() adds to
+    one state never show up in another, and shares the Container objects and the
+    table, which replaces a deepcopy of every Slot and Container on each planning
+    step.
+    """
+
+    def __init__(self, occupied, available, weights, ids, containers, table=None):
+        self.occupied = occupied
+        self.available = available
+        self.weights = weights
+        self.ids = ids
+        self.containers = containers
+        self.table = table if table is not None else TranspositionTable()
+        self.tie_break = None
+        self.stalled = False
+        self.rows, self.columns = ids.shape
+        self.heights = np.array([self._column_height(c) for c in range(self.columns)], dtype=np.int64)
+        self.counts = occupied.sum(axis=0).astype(np.int64)
+        self.floors = np.array([self._column_floor(c) for c in range(self.columns)], dtype=np.int64)
+
+        cells = self.rows * self.columns
+        self.packed = sum(1 << i for i in np.flatnonzero(occupied).tolist())
+        self.packed |= sum(1 << (cells + i) for i in np.flatnonzero(available).tolist())
+        self.changed = 0
+
+        halfway_line = self.columns // 2
+        self.tracker = BalanceTracker(
+            weights[:, :halfway_line].sum().item(), weights[:, halfway_line:].sum().item(), halfway_line
+        )
+        self._bounds = None
+
+    @classmethod
+    def from_grid(cls, ship_grid, table=None):
+        """
+        Builds a ShipState from a grid of Slot objects.
+
+        Args:
+            ship_grid (list): 2D grid of Slot objects, row 0 at the bottom.
+            table (TranspositionTable): Cache to share; a new one when omitted.
+
+        Returns:
+            ShipState: State holding the same layout and Container objects.
+        """
+        rows, columns = len(ship_grid), len(ship_grid[0])
+        occupied = np.zeros((rows, columns), dtype=bool)
+        available = np.zeros((rows, columns), dtype=bool)
+        ids = np.full((rows, columns), -1, dtype=np.int64)
+        containers, weights = [], []
+
+        for r, row in enumerate(ship_grid):
+            for c, slot in enumerate(row):
+                occupied[r, c] = slot.hasContainer
+                available[r, c] = slot.available
+                if slot.container is not None:
+                    ids[r, c] = len(containers)
+                    containers.append(slot.container)
+                    weights.append(slot.container.weight)
+
+        # Keep integer weights integral so balance sums match calculate_balance
+        dtype = np.int64 if all(isinstance(weight, (int, np.integer)) for weight in weights) else np.float64
+        weight_grid = np.zeros((rows, columns), dtype=dtype)
+        weight_grid[ids >= 0] = weights
+
+        return cls(occupied, available, weight_grid, ids, containers, table)
+
+    def to_grid(self):
+        """
+        Converts the state back to a grid of Slot objects.
+
+        Returns:
+            list: A 2D grid (list of lists) containing Slot objects.
+        """
+        return [
+            [Slot(self.container_at(r, c), bool(self.occupied[r, c]), bool(self.available[r, c]))
+             for c in range(self.columns)]
+            for r in range(self.rows)
+        ]
+
+    def write_to(self, ship_grid):
+        """Overwrites ship_grid in place with the layout of this state."""
+        for r, row in enumerate(self.to_grid()):
+            ship_grid[r][:] = row
+
+    def copy(self):
+        """Returns an independent state sharing the Container objects."""
+        state = ShipState.__new__(ShipState)
+        state.occupied = self.occupied.copy()
+        state.available = self.available.copy()
+        state.weights = self.weights.copy()
+        state.ids = self.ids.copy()
+        state.containers = list(self.containers)
+        state.table = self.table
+        state.tie_break = self.tie_break
+        state.stalled = self.stalled
+        state.packed = self.packed
+        state.changed = self.changed
+        state.rows, state.columns = self.rows, self.columns
+        state.heights = self.heights.copy()
+        state.counts = self.counts.copy()
+        state.floors = self.floors
+        state.tracker = self.tracker.copy()
+        state._bounds = self._bounds.copy() if self._bounds is not None else None
+        return state
+
+    @property
+    def bounds(self):
+        """Lower-bound tables for balancing this layout, built on first use."""
+        if self._bounds is None:
+            self._bounds = BalanceBounds.from_state(self)
+        return self._bounds
+
+    def key(self):
+        """Hashable key identifying the layout."""
+        return self.ids.tobytes() + self.available.tobytes()
+
+    def __eq__(self, other):
+        return isinstance(other, ShipState) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def _pack_cell(self, r, c):
+        i = r * self.columns + c
+        j = i + self.rows * self.columns
+        self.packed &= ~((1 << i) | (1 << j))
+        self.packed |= (int(self.occupied[r, c]) << i) | (int(self.available[r, c]) << j)
+        self.changed |= 1 << i
+
+    def cell(self, r, c):
+        """The cell as a new Slot."""
+        return Slot(self.container_at(r, c), bool(self.occupied[r, c]), bool(self.available[r, c]))
+
+    def cells(self):
+        """Every cell(), row by row."""
+        return [self.cell(r, c) for r in range(self.rows) for c in range(self.columns)]
+
+    def take_changes(self):
+        """
+        Cells written since the last call, and starts recording afresh.
+
+        Returns:
+            list: (row * columns + column, cell()) pairs.
+        """
+        changes, changed = [], self.changed
+        while changed:
+            i = (changed & -changed).bit_length() - 1
+            changes.append((i, self.cell(*divmod(i, self.columns))))
+            changed &= changed - 1
+        self.changed = 0
+        return changes
+
+    def touch_all(self):
+        """Marks every cell changed, for a state swapped in for the one a PlanHistory followed."""
+        self.changed = (1 << (self.rows * self.columns)) - 1
+
+    def visit_key(self, container_id, loc):
+        """Packs a (container, cell) pair into one integer for visited sets."""
+        return (container_id * self.rows + loc[0]) * self.columns + loc[1]
+
+    def _column_height(self, c, start=None):
+        for r in range(self.rows - 1 if start is None else start, -1, -1):
+            if not self.available[r, c]:
+                return r + 1
+        return 0
+
+    def _column_floor(self, c):
+        r = 0
+        while r < self.rows and not self.available[r, c] and not self.occupied[r, c]:
+            r += 1
+        return r
+
+    def _update_height(self, r, c):
+        # Only the changed cell can move the top of its column
+        if not self.available[r, c]:
+            if r >= self.heights[c]:
+                self.heights[c] = r + 1
+        elif r + 1 == self.heights[c]:
+            self.heights[c] = self._column_height(c, r)
+
+    def lowest_free(self, c):
+        """Lowest supported free row of column c, or -1 if the column is full."""
+        r = self.heights[c]
+        return int(r) if r < self.rows else -1
+
+    def capacity(self, c):
+        """Containers column c can still take on top of its stack."""
+        return self.rows - int(self.heights[c])
+
+    def first_free(self, columns=None):
+        """
+        Lowest free slot, scanning columns in order.
+
+        Args:
+            columns (iterable): Columns to consider; all of them when None.
+
+        Returns:
+            tuple: (row, column), or (-1, -1) if every column is full.
+        """
+        for c in range(self.columns) if columns is None else columns:
+            if self.heights[c] < self.rows:
+                return int(self.heights[c]), c
+        return -1, -1
+
+    def container_at(self, r, c):
+        """Container in the cell, or None."""
+        idx = self.ids[r, c]
+        return self.containers[idx] if idx >= 0 else None
+
+    def container_id(self, r, c):
+        """Index of the container in the cell, or -1."""
+        return int(self.ids[r, c])
+
+    def top(self, c):
+        """Row of the top container of column c, or -1 if it holds none."""
+        r = self.heights[c] - 1
+        return int(r) if r >= 0 and self.occupied[r, c] else -1
+
+    def swap(self, a, b):
+        """Swaps the contents of two cells, like swapping their Slot objects."""
+        (ra, ca), (rb, cb) = a, b
+        self.tracker.apply_move(self.weights[ra, ca].item(), ca, cb)
+        self.tracker.apply_move(self.weights[rb, cb].item(), cb, ca)
+        if self._bounds is not None:
+            moved = [(self._bounds.remove(r, c), to) for (r, c), to in ((a, b), (b, a)) if self.occupied[r, c]]
+            for weight, (r, c) in moved:
+                self._bounds.add(weight, r, c)
+        for grid in (self.occupied, self.available, self.weights, self.ids):
+            grid[ra, ca], grid[rb, cb] = grid[rb, cb], grid[ra, ca]
+        self._pack_cell(ra, ca)
+        self._pack_cell(rb, cb)
+        if ca != cb:
+            self.counts[ca] += int(self.occupied[ra, ca]) - int(self.occupied[rb, cb])
+            self.counts[cb] += int(self.occupied[rb, cb]) - int(self.occupied[ra, ca])
+        # Update the higher cell first so a vacated top rescans from a settled column
+        for r, c in sorted((a, b), reverse=True):
+            self._update_height(r, c)
+
+    def place(self, r, c, container):
+        """Puts a container in the cell."""
+        if not isinstance(container.weight, (int, np.integer)) and self.weights.dtype != np.float64:
+            self.weights = self.weights.astype(np.float64)
+        if not self.occupied[r, c]:
+            self.counts[c] += 1
+        self.ids[r, c] = len(self.containers)
+        self.containers.append(container)
+        self.tracker.remove(self.weights[r, c].item(), c)
+        self.tracker.add(container.weight, c)
+        if self._bounds is not None:
+            if self.occupied[r, c]:
+                self._bounds.remove(r, c)
+            self._bounds.add(container.weight, r, c)
+        self.weights[r, c] = container.weight
+        self.occupied[r, c] = True
+        self.available[r, c] = False
+        self._pack_cell(r, c)
+        self._update_height(r, c)
+
+    def clear(self, r, c):
+        """Empties the cell."""
+        self.tracker.remove(self.weights[r, c].item(), c)
+        if self.occupied[r, c]:
+            self.counts[c] -= 1
+            if self._bounds is not None:
+                self._bounds.remove(r, c)
+        self.ids[r, c] = -1
+        self.weights[r, c] = 0
+        self.occupied[r, c] = False
+        self.available[r, c] = True
+        self._pack_cell(r, c)
+        self._update_height(r, c)
+
+    def move(self, from_pos, to_pos):
+        """Moves the container at from_pos into the empty cell to_pos."""
+        (from_row, from_col), (to_row, to_col) = from_pos, to_pos
+        self.tracker.apply_move(self.weights[from_row, from_col].item(), from_col, to_col)
+        if self._bounds is not None:
+            self._bounds.apply_move(from_pos, to_pos)
+        for grid, empty in ((self.ids, -1), (self.weights, 0)):
+            grid[to_row, to_col], grid[from_row, from_col] = grid[from_row, from_col], empty
+        self.occupied[to_row, to_col], self.available[to_row, to_col] = True, False
+        self.occupied[from_row, from_col], self.available[from_row, from_col] = False, True
+        self._pack_cell(to_row, to_col)
+        self._pack_cell(from_row, from_col)
+        self.counts[to_col] += 1
+        self.counts[from_col] -= 1
+        self._update_height(to_row, to_col)
+        self._update_height(from_row, from_col)
+
+    def floating(self):
+        """(row, column) of every container resting on an empty cell, in row-major order."""
+        unsupported = self.occupied[1:] & self.available[:-1]
+        return [(r + 1, c) for r, c in np.argwhere(unsupported).tolist()]
+
+    def container_locations(self, left=None):
+        """
+        [row, column] of every container, in row-major order.
+
+        Args:
+            left (bool): Only the port (True) or starboard (False) side; both when None.
+        """
+        if left is None:
+            return np.argwhere(self.occupied).tolist()
+        halfway_line = self.columns // 2
+        if left:
+            return np.argwhere(self.occupied[:, :halfway_line]).tolist()
+        return [[r, c + halfway_line] for r, c in np.argwhere(self.occupied[:, halfway_line:]).tolist()]
+
+    def balance(self):
+        """Same as calculate_balance() on the equivalent grid, read from the tracker."""
+        return self.tracker.totals()
+
 
 # Create a ship grid with size
 # def create_ship_grid(rows, columns):
@@ -239,50 +625,43 @@ def print_grid(ship_grid):
 
 def load(containers_and_locs, ship_grid):
 
-    ship_grids, store_goals  = [], []
+    changes, store_goals  = [], []
 
     steps, unloading_zone = [], [len(ship_grid) - 1, 0]
 
     containers_and_locs = sorted(containers_and_locs, key=lambda x: x[1][0])
 
+    state = ShipState.from_grid(ship_grid)
+    history = PlanHistory.from_state(state)
+
     for idx, (container, loc) in enumerate(containers_and_locs):
-        ship_grid[unloading_zone[0]][unloading_zone[1]].container = container
-        ship_grid[unloading_zone[0]][unloading_zone[1]].hasContainer = True
-        ship_grid[unloading_zone[0]][unloading_zone[1]].available = False
+        state.place(unloading_zone[0], unloading_zone[1], container)
 
-        orig_ship_grid = copy.deepcopy(ship_grid)
+        orig_state = state.copy()
 
-        extra_steps, extra_grids = move_to(unloading_zone, loc, ship_grid, store_goals)
+        extra_steps, extra_changes = move_to(unloading_zone, loc, state, store_goals)
 
         if not extra_steps:
             # If no possible steps, container is being blocked
-            ship_grid = orig_ship_grid
-            containers = []
-            for r, row in enumerate(ship_grid):
-                for c, slot in enumerate(row):
-                    if slot.hasContainer is True:
-                        if [r, c] != unloading_zone:
-                            containers.append([r, c])
+            state = orig_state
+            state.touch_all()
+            containers = [loc for loc in state.container_locations() if loc != unloading_zone]
 
             sorted_containers = sorted(containers, key=lambda x:x[0], reverse=True)
-            new_loc = nearest_available(sorted_containers[0], ship_grid)
-            extra_steps, extra_grids = move_to(sorted_containers[0], new_loc, ship_grid, store_goals)
-
-            new_steps, new_grids = move_to(unloading_zone, loc, ship_grid, store_goals)
-
-            extra_steps.append(new_steps)
-            extra_grids.append(new_grids)
+            new_loc = nearest_available(sorted_containers[0], state)
+            extra_steps, extra_changes = move_to(sorted_containers[0], new_loc, state, store_goals)
 
+            new_steps, new_changes = move_to(unloading_zone, loc, state, store_goals)
 
-        steps.append(extra_steps)
-        ship_grids.append(extra_grids)
+            extra_steps.extend(new_steps)
+            extra_changes.extend(new_changes)
 
-    r, c = np.array(ship_grid).shape
-    ship_grids = reformat_grid_list(ship_grids, r, c)
 
-    steps = reformat_step_list(steps, store_goals)
+        steps.extend(extra_steps)
+        changes.extend(extra_changes)
 
-    return steps, ship_grids
+    state.write_to(ship_grid)
+    return collect_plan(steps, changes, history)
 
 
 def unload(containers_to_unload, ship_grid):
@@ -290,54 +669,81 @@ def unload(containers_to_unload, ship_grid):
     # order containers by height, descending
     containers = sorted(containers_to_unload, key=lambda r: r[0], reverse=True)
 
-    ship_grids, store_goals  = [], []
+    changes, store_goals  = [], []
 
-    orig_ship_grid = copy.deepcopy(ship_grid)
+    state = ShipState.from_grid(ship_grid)
+    history = PlanHistory.from_state(state)
+    orig_state = state.copy()
 
     steps, unloading_zone = [], [len(ship_grid) - 1, 0]
     # move each container to unloading zone
     for container_loc in containers:
-        extra_steps, extra_grids = move_to(container_loc, unloading_zone, ship_grid, store_goals)
+        extra_steps, extra_changes = move_to(container_loc, unloading_zone, state, store_goals)
 
         if not extra_steps:
             # If no possible steps, container is being blocked
-            ship_grid = orig_ship_grid
-            containers = []
-            for r, row in enumerate(ship_grid):
-                for c, slot in enumerate(row):
-                    if slot.hasContainer is True:
-                        if [r, c] != container_loc:
-                            containers.append([r, c])
+            state = orig_state
+            state.touch_all()
+            containers = [loc for loc in state.container_locations() if loc != container_loc]
 
             sorted_containers = sorted(containers, key=lambda x:x[0], reverse=True)
-            new_loc = nearest_available(sorted_containers[0], ship_grid)
-            extra_steps, extra_grids = move_to(sorted_containers[0], new_loc, ship_grid, store_goals)
+            new_loc = nearest_available(sorted_containers[0], state)
+            extra_steps, extra_changes = move_to(sorted_containers[0], new_loc, state, store_goals)
 
-            new_steps, new_grids = move_to(container_loc, unloading_zone, ship_grid, store_goals)
+            new_steps, new_changes = move_to(container_loc, unloading_zone, state, store_goals)
 
-            extra_steps.append(new_steps)
-            extra_grids.append(new_grids)
+            extra_steps.extend(new_steps)
+            extra_changes.extend(new_changes)
 
-        steps.append(extra_steps)
-        ship_grids.append(extra_grids)
+        steps.extend(extra_steps)
+        changes.extend(extra_changes)
 
         # steps[-1].append(str(unloading_zone) + " to " + "[8, 0]")
 
         # Remove container from grid
-        ship_grid[unloading_zone[0]][unloading_zone[1]].container = None
-        ship_grid[unloading_zone[0]][unloading_zone[1]].hasContainer = False
-        ship_grid[unloading_zone[0]][unloading_zone[1]].available = True
+        state.clear(unloading_zone[0], unloading_zone[1])
 
-    r, c = np.array(ship_grid).shape
-    ship_grids = reformat_grid_list(ship_grids, r, c)
+    state.write_to(ship_grid)
+    return collect_plan(steps, changes, history)
 
-    steps = reformat_step_list(steps, store_goals)
 
-    return steps, ship_grids
+# Returns move steps and status code (success or failure)
+def balance(ship_grid, containers, table=None, seed=None):
+    """
+    Balances the ship with the greedy planner, answering repeats from the plan cache.
 
+    A grid and container list planned before (a re-uploaded manifest, a page
+    reload) gets the cached plan back, and ship_grid is left in its final layout
+    just as a fresh run would leave it.
 
-# Returns move steps and status code (success or failure)
-def balance(ship_grid, containers):
+    Args:
+        ship_grid (list): The current ship grid, updated in place.
+        containers (list): Locations of the containers on the ship.
+        table (TranspositionTable): Cache to share with an earlier planning pass.
+        seed (int): Tie-break seed for portfolio runs.
+
+    Returns:
+        tuple: (steps, ship_grids, status); status is None, with no moves and
+        ship_grid unchanged, if a container move stalled or the ship needs SIFT
+        and sift_balance() finds no plan.
+    """
+    key = plan_key("balance", ship_grid, [list(loc) for loc in containers], seed)
+    cached = PLAN_CACHE.get("balance", key)
+    if cached is not None:
+        steps, ship_grids, status = cached
+        if ship_grids:
+            for r, row in enumerate(ship_grids[-1]):
+                ship_grid[r][:] = [Slot(slot.container, slot.hasContainer, slot.available) for slot in row]
+        return steps, ship_grids, status
+
+    result = greedy_balance(ship_grid, containers, table, seed)
+    PLAN_CACHE.put("balance", key, result)
+    return result
+
+
+def greedy_balance(ship_grid, containers, table=None, seed=None):
+    # sift_planner imports this module, so its SIFT fallback is imported here
+    from tasks.sift_planner import sift_fallback
 
     store_goals = []
 
@@ -349,120 +755,141 @@ def balance(ship_grid, containers):
 
     # If balanced return, else continue
     if balanced:
-        return None, True
+        return [], [], True
 
-    steps, ship_grids = [], []
-    iter, max_iter = 0, 100
+    # Skip the search entirely when no split of the weights is balanced
+    oracle = balance_oracle_for_grid(ship_grid)
+    if not oracle.feasible:
+        print("Balance cannot be achieved (best ratio {:.3f}), beginning SIFT...".format(oracle.best_ratio))
+        return sift_fallback(ship_grid)
 
-    halfway_line = len(ship_grid[0]) / 2
+    steps, changes = [], []
+    iter, max_iter = 0, 100
 
     previous_balance_ratio = 0
 
-    orig_ship_grid = copy.deepcopy(ship_grid)
-    orig_container = copy.deepcopy(containers)
+    # Plan on an array-backed copy; ship_grid is only written once at the end.
+    # Its tracker keeps the side totals current, so nothing below rescans the grid.
+    state = ShipState.from_grid(ship_grid, table)
+    state.bounds.oracle = oracle
+    if seed is not None:
+        # Portfolio runs: break ties between equally good moves in a seeded order
+        state.tie_break = random.Random(seed)
+    history = PlanHistory.from_state(state)
 
     # On heavier side, cycle through each container
     while(balanced is False):
 
         # Continue until balanced, or return error
 
-        # Run until max iterations reached, then return failure
-        if iter >= max_iter:
+        # Run until max iterations reached, then return failure; the bound on the
+        # moves still needed gives up early when the rest of the budget cannot do it
+        if iter >= max_iter or state.bounds.moves_needed() > max_iter - iter:
             print("Balance could not be achieved, beginning SIFT...")
-            steps, ship_grids, store_goals = [], [], []
-            steps, ship_grids = sift(ship_grid, containers, store_goals)
-            r, c = np.array(ship_grid).shape
-            ship_grids = reformat_grid_list(ship_grids, r, c)
-            steps = reformat_step_list(steps, store_goals)
-            return steps, ship_grids, False
-
-        if left_balance > right_balance:
-            curr_containers = [loc for loc in containers if loc[1] < halfway_line and ship_grid[loc[0]][loc[1]].container is not None]
-        else:
-            curr_containers = [loc for loc in containers if loc[1] >= halfway_line and ship_grid[loc[0]][loc[1]].container is not None]
+            return sift_fallback(ship_grid)
+
+        curr_containers = state.container_locations(left=left_balance > right_balance)
 
         move_cost, balance_update = [], []
         # compute cost for each container to move to other side
         for container_loc in curr_containers:
             # compute closeness to balance if moved
-            balance_update.append((container_loc, close_to_balance(ship_grid, container_loc, left_balance, right_balance)))
+            weight = state.weights[container_loc[0], container_loc[1]].item()
+            balance_update.append((container_loc, state.tracker.closeness_after_crossing(weight)))
 
             # # compute cost to move to nearest open slot
             # costs.append(compute_cost_to_balance(container_loc, ship_grid))
 
         # select container with lowest cost that achieves balance or is closest (location of container)
+        if state.tie_break is not None:
+            state.tie_break.shuffle(balance_update)
         sorted_balance_update = sorted(balance_update, key=lambda x: x[1])
         container_to_move, balance_ratio = sorted_balance_update[0][0], sorted_balance_update[0][1]
 
         # If there has been no update in balance
         if (abs(previous_balance_ratio - balance_ratio) < 0.000001):
             print("Balance could not be achieved, beginning SIFT...")
-            ship_grid, containers = orig_ship_grid, orig_container
-            steps, ship_grids, store_goals = [], [], []
-            steps, ship_grids = sift(ship_grid, containers, store_goals)
-            r, c = np.array(ship_grid).shape
-            ship_grids = reformat_grid_list(ship_grids, r, c)
-            steps = reformat_step_list(steps, store_goals)
-            return steps, ship_grids, False
+            return sift_fallback(ship_grid)
 
         # move container
-        goal_loc = list(nearest_available_balance(left_balance, right_balance, ship_grid))
-        new_steps, new_grids = move_to(container_to_move, goal_loc, ship_grid, store_goals)
-        steps.append(new_steps)
-        ship_grids.append(new_grids)
+        goal_loc = list(nearest_available_balance(left_balance, right_balance, state))
+        new_steps, new_changes = move_to(container_to_move, goal_loc, state, store_goals)
+        if state.stalled:
+            print("Balancing stalled, no plan")
+            return [], [], None
+        steps.extend(new_steps)
+        changes.extend(new_changes)
         # print_grid(ship_grid)
 
-        # Update containers with new changes
-        containers = []
-        for x, row in enumerate(ship_grid):
-            for y, col in enumerate(row):
-                if ship_grid[x][y].hasContainer is True:
-                    containers.append([x, y])
-
-        left_balance, right_balance, balanced = calculate_balance(ship_grid)
+        left_balance, right_balance, balanced = state.balance()
         previous_balance_ratio = balance_ratio
         iter += 1
 
     # return updated ship grid and success
-    r, c = np.array(ship_grid).shape
-    ship_grids = reformat_grid_list(ship_grids, r, c)
-
-    steps = reformat_step_list(steps, store_goals)
+    state.write_to(ship_grid)
+    steps, ship_grids = collect_plan(steps, changes, history)
 
     return steps, ship_grids, True
 
 
-def sift(ship_grid, containers, store_goals):
-    steps, ship_grids = [], []
+def run_sift(ship_grid, containers=None, table=None):
+    """
+    Runs the greedy sift() on the grid and formats the result like balance() does.
+
+    The planners go to sift_balance() instead, since sift() raises on crowded
+    ships; this is kept for the benchmarks that compare the two.
+
+    Args:
+        ship_grid (list): The current ship grid, updated in place.
+        containers (list): Container locations, read from the grid when omitted.
+        table (TranspositionTable): Cache to share with an earlier planning pass.
+
+    Returns:
+        tuple: (steps, ship_grids), or (None, None) with ship_grid unchanged if a
+        container move stalled.
+    """
+    if containers is None:
+        containers = [[r, c] for r, row in enumerate(ship_grid) for c, slot in enumerate(row) if slot.hasContainer]
+
+    store_goals = []
+    state = ShipState.from_grid(ship_grid, table)
+    history = PlanHistory.from_state(state)
+    steps, changes = sift(state, containers, store_goals)
+    if state.stalled:
+        print("SIFT stalled, no plan")
+        return None, None
+    state.write_to(ship_grid)
+
+    return collect_plan(steps, changes, history)
+
+
+def sift(state, containers, store_goals):
+    steps, changes = [], []
 
     # containers sorted by weights (ascending)
-    container_weights = sorted([(container, ship_grid[container[0]][container[1]].container) for container in containers], key=lambda container: container[1].weight, reverse=True)
+    container_weights = sorted([(container, state.weights[container[0], container[1]]) for container in containers], key=lambda container: container[1], reverse=True)
     sorted_container_weights = [tup[0] for tup in container_weights]
 
-    all_sift_slots = calculate_all_sift_slots(ship_grid)
+    all_sift_slots = calculate_all_sift_slots(state)
     new_loc = None
 
     for idx, container in enumerate(sorted_container_weights):
 
         # check if container was moved already without updating
-        if ship_grid[container[0]][container[1]].hasContainer is False:
+        if not state.occupied[container[0], container[1]]:
             # find container
-            for moves in store_goals:
-                try:
-                    if list(moves).index(str(container)) == 0:
-                        # update container location
-                        new_loc = moves[1]
-                        sorted_container_weights[idx] = [int(l) for l in new_loc.strip('][').split(', ')]
-                        container = sorted_container_weights[idx]
-                        break
-                except ValueError:
-                    pass
+            for start, goal in store_goals:
+                if start == tuple(container):
+                    # update container location
+                    sorted_container_weights[idx] = list(goal)
+                    container = sorted_container_weights[idx]
+                    break
 
         next_move = all_sift_slots[0]
         del all_sift_slots[0]
         # while current slot is NaN, cycle through available slots
-        while ship_grid[next_move[0]][next_move[1]].hasContainer is False and \
-                    ship_grid[next_move[0]][next_move[1]].available is False:
+        while not state.occupied[next_move[0], next_move[1]] and \
+                    not state.available[next_move[0], next_move[1]]:
 
                     del all_sift_slots[0]
                     # get next available slot
@@ -473,33 +900,33 @@ def sift(ship_grid, containers, store_goals):
             continue
 
         # if there is a container, proceed to move it
-        if ship_grid[next_move[0]][next_move[1]].hasContainer is True:
-            nearest_avail = nearest_available(next_move, ship_grid)
+        if state.occupied[next_move[0], next_move[1]]:
+            nearest_avail = nearest_available(next_move, state)
             # move container to nearest available
-            extra_steps, extra_grids = move_to(next_move, nearest_avail, ship_grid, store_goals)
-            steps.append(extra_steps)
-            ship_grids.append(extra_grids)
+            extra_steps, extra_changes = move_to(next_move, nearest_avail, state, store_goals)
+            steps.extend(extra_steps)
+            changes.extend(extra_changes)
 
             sorted_container_weights[sorted_container_weights.index(next_move)] = nearest_avail
         # move container to original next move
-        extra_steps, extra_grids = move_to(container, next_move, ship_grid, store_goals)
-        steps.append(extra_steps)
-        ship_grids.append(extra_grids)
+        extra_steps, extra_changes = move_to(container, next_move, state, store_goals)
+        steps.extend(extra_steps)
+        changes.extend(extra_changes)
 
         sorted_container_weights[idx] = next_move
 
-    return steps, ship_grids
+    return steps, changes
 
 
-def calculate_all_sift_slots(ship_grid):
-    halfway_line = len(ship_grid[0]) / 2
+def calculate_all_sift_slots(state):
+    halfway_line = state.columns / 2
 
     all_slots = []
 
-    for r in range(len(ship_grid)):
+    for r in range(state.rows):
         p = -1
         curr_slot = [r, halfway_line - 1]
-        for c in range(len(ship_grid[0])):
+        for c in range(state.columns):
             slot = [r, int((curr_slot[1] + (c * pow(-1, p)))) % 12]
             p += 1
             all_slots.append(slot)
@@ -508,32 +935,47 @@ def calculate_all_sift_slots(ship_grid):
     return all_slots
 
 
-def move_to(container_loc, goal_loc, ship_grid, store_goals):
-    steps, ship_grids = [], []
-    curr_container_loc = copy.deepcopy(container_loc)
+def move_to(container_loc, goal_loc, state, store_goals):
+    """
+    Moves a container cell by cell to goal_loc, clearing containers stacked on it first.
+
+    Returns:
+        tuple: (steps, changes) with one list of Moves and the cells it changed
+        (ShipState.take_changes()) per container moved, the cleared containers
+        first and this one last.
+    """
+    steps, changes, moves = [], [], []
+    curr_container_loc = list(container_loc)
+    container = state.container_at(curr_container_loc[0], curr_container_loc[1])
+    name = container.name if container is not None else None
 
-    visited = []
+    visited = set()
 
     while (curr_container_loc != goal_loc):
 
         # print("cuur-goal:", curr_container_loc, goal_loc)
 
-        curr_container = ship_grid[curr_container_loc[0]][curr_container_loc[1]].container
+        curr_container = state.container_id(curr_container_loc[0], curr_container_loc[1])
 
         # if (curr_container is not None):
-        visited.append((curr_container, curr_container_loc))
+        visited.add(state.visit_key(curr_container, curr_container_loc))
 
         # return valid neighbors
-        valid_moves = return_valid_moves(curr_container_loc, ship_grid)
+        valid_moves = return_valid_moves(curr_container_loc, state)
 
         if not valid_moves:
-            if curr_container_loc[0] < len(ship_grid) - 1:
-                if ship_grid[curr_container_loc[0] + 1][curr_container_loc[1]].hasContainer:
+            if curr_container_loc[0] < state.rows - 1:
+                if state.occupied[curr_container_loc[0] + 1, curr_container_loc[1]]:
                     # print("No valid moves for current container {}... Moving container above".format(str(curr_container_loc)S))
-                    extra_steps, extra_grids = move_container_above(curr_container_loc, ship_grid, store_goals)
-                    steps.append(extra_steps)
-                    ship_grids.append(extra_grids)
-                    valid_moves = return_valid_moves(curr_container_loc, ship_grid)
+                    extra_steps, extra_changes = move_container_above(curr_container_loc, state, store_goals)
+                    if state.stalled:
+                        return [], []
+                    steps.extend(extra_steps)
+                    changes.extend(extra_changes)
+                    valid_moves = return_valid_moves(curr_container_loc, state)
+
+        if state.tie_break is not None:
+            state.tie_break.shuffle(valid_moves)
 
         distances = []
         for neighbor in valid_moves:
@@ -548,14 +990,16 @@ def move_to(container_loc, goal_loc, ship_grid, store_goals):
             num_moves = [(loc, abs(loc[1] - goal_loc[1]), d) for loc, d in same_distances]
             if not num_moves:
                 print("No moves possible!")
+                state.stalled = True
                 return [], []
             possible_move, _, d = min(num_moves, key = lambda x: x[1])
             # cycle through possible moves until a new move is reached
-            while (curr_container, possible_move) in visited:
+            while state.visit_key(curr_container, possible_move) in visited:
                 same_distances.remove((possible_move, d))
                 num_moves = [(loc, abs(loc[1] - goal_loc[1]), d) for loc, d in same_distances]
                 if not num_moves:
                     print("No moves possible!")
+                    state.stalled = True
                     return [], []
                 possible_move, _, d = min(num_moves, key = lambda x: x[1])
             # If there is still an available new move
@@ -564,129 +1008,134 @@ def move_to(container_loc, goal_loc, ship_grid, store_goals):
         else:
             # no equivalent moves, choose best move
             for next_loc, distance in distances:
-                if (curr_container, next_loc) not in visited:
+                if state.visit_key(curr_container, next_loc) not in visited:
                     next_move = next_loc
                     break
 
-        steps.append(str(curr_container_loc) + " to " + str(next_move))
-
         # No valid moves
         if next_move == [-1, -1]:
-            return_valid_moves(curr_container_loc, ship_grid)
             print("No valid moves!")
+            state.stalled = True
             break
 
-        ship_grid[curr_container_loc[0]][curr_container_loc[1]], ship_grid[next_move[0]][next_move[1]] = \
-            ship_grid[next_move[0]][next_move[1]], ship_grid[curr_container_loc[0]][curr_container_loc[1]]
+        moves.append(Move.between(curr_container_loc, next_move, name))
+        state.swap(curr_container_loc, next_move)
 
-        curr_container_loc = copy.deepcopy(next_move)
+        curr_container_loc = list(next_move)
 
     # print_grid(ship_grid)
-    ship_grids.append(copy.deepcopy(ship_grid))
-
-    store_goals.append((str(container_loc), str(goal_loc)))
+    steps.append(moves)
+    changes.append(state.take_changes())
 
-    return steps, ship_grids
+    store_goals.append((tuple(container_loc), tuple(goal_loc)))
 
+    return steps, changes
 
-def compute_cost(container_loc, goal_loc, ship_grid):
-    steps = []
-    curr_container_loc = copy.deepcopy(container_loc)
 
-    visited = []
-
-    while (curr_container_loc != goal_loc):
-
-        curr_container = ship_grid[curr_container_loc[0]][curr_container_loc[1]].container
-
-        # if (curr_container is not None):
-        visited.append((curr_container, curr_container_loc))
-
-        # return valid neighbors
-        valid_moves = return_valid_moves(curr_container_loc, ship_grid)
-
-        if not valid_moves:
-            if curr_container_loc[0] < len(ship_grid) - 1:
-                if ship_grid[curr_container_loc[0] + 1][curr_container_loc[1]].hasContainer:
-                    print("No valid moves for current container... Moving container above")
-                    extra_steps,  _ = move_container_above(curr_container_loc, ship_grid, [])
-                    steps.append(extra_steps)
-
-        distances = []
-        for neighbor in valid_moves:
-            distances.append((neighbor, manhattan_distance(neighbor, goal_loc)))
-
-        distances = sorted(distances, key = lambda x: x[1])
-
-        next_move = [-1, -1]
-        for next_loc, distance in distances:
-            if (curr_container, next_loc) not in visited:
-                next_move = next_loc
-                break
-
-        steps.append(str(curr_container_loc) + " to " + str(next_move))
-
-        # No valid moves
-        if next_move == [-1, -1]:
-            break
-
-        ship_grid[curr_container_loc[0]][curr_container_loc[1]], ship_grid[next_move[0]][next_move[1]] = \
-            ship_grid[next_move[0]][next_move[1]], ship_grid[curr_container_loc[0]][curr_container_loc[1]]
-
-        curr_container_loc = copy.deepcopy(next_move)
-
-    # print_grid(ship_grid)
-
-    return steps
-
-def move_container_above(container_loc, ship_grid, store_goals):
-    steps, ship_grids = [], []
+def move_container_above(container_loc, state, store_goals):
+    steps, changes = [], []
     container_above = [container_loc[0] + 1, container_loc[1]]
 
-    if(container_above[0] < len(ship_grid ) - 1):
-        if (ship_grid[container_above[0] + 1][container_above[1]].hasContainer):
-            extra_steps, extra_grids = move_container_above(container_above, ship_grid, store_goals)
-            steps.append(extra_steps)
-            ship_grids.append(extra_grids)
+    if(container_above[0] < state.rows - 1):
+        if (state.occupied[container_above[0] + 1, container_above[1]]):
+            extra_steps, extra_changes = move_container_above(container_above, state, store_goals)
+            steps.extend(extra_steps)
+            changes.extend(extra_changes)
+            if state.stalled:
+                return steps, changes
 
-    nearest_avail = nearest_available(container_above, ship_grid)
+    nearest_avail = nearest_available(container_above, state)
 
-    extra_steps, extra_grids = move_to(container_above, nearest_avail, ship_grid, store_goals)
-    steps.append(extra_steps)
-    ship_grids.append(extra_grids)
+    extra_steps, extra_changes = move_to(container_above, nearest_avail, state, store_goals)
+    steps.extend(extra_steps)
+    changes.extend(extra_changes)
 
-    return steps, ship_grids
+    return steps, changes
 
 
 # Finds nearest available slot to the side of container_loc column
-def nearest_available(container_loc, ship_grid):
+def nearest_available(container_loc, state):
+
+    key = (state.packed, tuple(container_loc))
+    cached = state.table.get("nearest_available", key)
+    if cached is not None:
+        return list(cached)
 
     line_at_container = container_loc[1]
+    available = state.available.tolist()
 
     open_slots = []
 
-    for r, row in enumerate(ship_grid):
-        for c, slot in enumerate(row):
+    for r in range(state.rows):
+        for c in range(state.columns):
             # Check if slot is available and is not hovering in the air
-            if slot.available is True:
+            if available[r][c]:
                 # If slot is on the ground or If slot is not hovering in the air
-                if (r == 0 or ship_grid[r - 1][c].available is False) and c != line_at_container:
+                if (r == 0 or not available[r - 1][c]) and c != line_at_container:
                     open_slots.append([r, c])
 
+    # One distance field ranks every slot; slots the container cannot reach go last
+    field = crane_distances(container_loc, state)
+    unreachable = state.rows * state.columns
     distances = []
     for slot in open_slots:
-        distances.append((slot, len(compute_cost(container_loc, slot, copy.deepcopy(ship_grid)))))
+        distance = field[slot[0]][slot[1]]
+        distances.append((slot, distance if distance >= 0 else unreachable + manhattan_distance(container_loc, slot)))
 
     distances = sorted(distances, key = lambda x: x[1])
 
-    return distances[0][0]
+    state.table.put("nearest_available", key, distances[0][0])
+    return list(distances[0][0])
+
+
+def crane_distances(container_loc, state):
+    """
+    Crane-path distance from container_loc to every cell, by one BFS over free cells.
+
+    The container moves one cell at a time through available cells, as in move_to().
+    Containers stacked on top of it are cleared first (move_container_above), so
+    their cells count as free and each one adds a move to every distance.
+
+    Args:
+        container_loc (list): [row, column] of the container to move.
+        state (ShipState): Current layout.
+
+    Returns:
+        list: rows x columns nested list of moves, -1 where the container cannot go.
+    """
+    rows, columns = state.rows, state.columns
+    start_row, start_col = container_loc
+
+    passable = state.available.tolist()
+    occupied = state.occupied.tolist()
+    passable[start_row][start_col] = True
+    blockers = 0
+    for r in range(start_row + 1, rows):
+        if not occupied[r][start_col]:
+            break
+        passable[r][start_col] = True
+        blockers += 1
+
+    field = [[-1] * columns for _ in range(rows)]
+    field[start_row][start_col] = blockers
+    queue = deque([(start_row, start_col)])
+
+    while queue:
+        r, c = queue.popleft()
+        distance = field[r][c] + 1
+        for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+            if 0 <= nr < rows and 0 <= nc < columns and passable[nr][nc] and field[nr][nc] < 0:
+                field[nr][nc] = distance
+                queue.append((nr, nc))
+
+    return field
 
 
 # returns list of valid moves for container loc
-def return_valid_moves(container_loc, ship_grid):
+def return_valid_moves(container_loc, state):
 
-    if container_loc[0] < len(ship_grid) - 1:
-        if ship_grid[container_loc[0] + 1][container_loc[1]].hasContainer is True:
+    if container_loc[0] < state.rows - 1:
+        if state.occupied[container_loc[0] + 1, container_loc[1]]:
             return []
 
     neighbors = []
@@ -697,14 +1146,13 @@ def return_valid_moves(container_loc, ship_grid):
     neighbors.append([container_loc[0], container_loc[1] + 1])
 
     # only neighbors inside the grid, (x, y) >= 0
-    neighbors = [neighbor for neighbor in neighbors if neighbor[0] >= 0  and neighbor[0] <= 7 and \
-        neighbor[1] >= 0 and neighbor[1] <= 11]
+    neighbors = [neighbor for neighbor in neighbors if neighbor[0] >= 0  and neighbor[0] < state.rows and \
+        neighbor[1] >= 0 and neighbor[1] < state.columns]
 
     valid_moves = []
 
     for neighbor in neighbors:
-        if ship_grid[neighbor[0]][neighbor[1]].available is True and \
-            ship_grid[neighbor[0]][neighbor[1]]:
+        if state.available[neighbor[0], neighbor[1]]:
             valid_moves.append(neighbor)
 
     return valid_moves
@@ -715,49 +1163,32 @@ def manhattan_distance(container_loc, goal_loc):
     return abs(container_loc[0] - goal_loc[0]) + abs(container_loc[1] - goal_loc[1])
 
 
-def nearest_available_balance(left_balance, right_balance, ship_grid):
+def nearest_available_balance(left_balance, right_balance, state):
 
-    halfway_line = int(len(ship_grid[0]) / 2)
+    halfway_line = int(state.columns / 2)
 
     # Check side with lower weight for available slots
     if left_balance > right_balance:
-        ship_grid_adjusted = [row[halfway_line:] for row in ship_grid]
+        columns = range(halfway_line, state.columns)
     else:
-        ship_grid_adjusted = [row[:halfway_line] for row in ship_grid]
+        columns = range(halfway_line)
 
-    for x, row in enumerate(ship_grid_adjusted):
-        for y, slot in enumerate(row):
-            # Check if slot is available and is not hovering in the air
-            if slot.available is True:
-                # If slot is on the ground
-                if y == 0:
-                    # If dealing with right half
-                    if (left_balance > right_balance):
-                        return x, y + 6
-                    else:
-                        return x, y
-                # If slot is not hovering in the air
-                if ship_grid[x][y - 1].available is False:
-                    # If dealing with right half
-                    if (left_balance > right_balance):
-                        return x, y + 6
-                    else:
-                        return x, y
-
-    return -1, -1
+    # Lowest free slot on that side, leftmost first on ties
+    heights = state.heights.tolist()
+    open_columns = [c for c in columns if heights[c] < state.rows]
+    if not open_columns:
+        return -1, -1
 
+    c = min(open_columns, key=lambda c: heights[c])
+    return heights[c], c
 
-# Returns closeness to perfect balance (1.0)
-def close_to_balance(ship_grid, container_loc, left_balance, right_balance):
 
-    container_weight = ship_grid[container_loc[0]][container_loc[1]].container.weight
+# Returns closeness to perfect balance (1.0)
+def close_to_balance(state, container_loc, left_balance, right_balance):
 
-    if left_balance > right_balance:
-        closeness = (left_balance - container_weight) / (right_balance + container_weight)
-    else:
-        closeness = (right_balance - container_weight) / (left_balance + container_weight)
+    container_weight = state.weights[container_loc[0], container_loc[1]].item()
 
-    return abs(1.0 - closeness)
+    return BalanceTracker(left_balance, right_balance, state.columns // 2).closeness_after_crossing(container_weight)
 
 
 def calculate_balance(ship_grid):
@@ -802,61 +1233,31 @@ def update_manifest(ship_grid):
     return manifest_info
 
 
-def flatten(l):
-    for el in l:
-        if isinstance(el, Iterable) and not isinstance(el, (str, bytes)):
-            yield from flatten(el)
-        else:
-            yield el
-
-
-def divide_list(l, n):
-
-    # looping till length l
-    for i in range(0, len(l), n):
-        yield l[i:i + n]
-
-
-def reshape_to_grids(l, r, c):
-    grids = []
-    for el in l:
-        grids.append(np.array(el).reshape(r, c).tolist())
-
-    return grids
-
-
-def reformat_grid_list(ship_grids, r, c):
-    formatted = list(flatten(copy.deepcopy(ship_grids)))
-    formatted = list(divide_list(formatted, r * c))
-    formatted = reshape_to_grids(formatted, r, c)
-
-    return formatted
-
-
-def reformat_step_list(steps, store_goals):
-    str_steps = str(list(flatten(steps)))
-    store = []
-    for start, goal in store_goals:
-        s_idx = str_steps.find(start)
-        e_idx = str_steps.find(goal)
-        step = str_steps[s_idx-1:e_idx+(len(goal)+1)]
-        str_steps = str_steps[e_idx+(len(goal)+1):]
-        store.append(step)
+def collect_plan(steps, changes, history):
+    """
+    Records the container moves move_to() returned in the plan's history.
 
-    step_list = []
-    for move_list in store:
-        move_list = move_list.replace('\'', '')
-        step_list.append([ s + ']' for s in move_list.split("], ")])
+    Container moves without a single Move (a container already at its goal) are
+    not steps of the plan; the cells they changed go in with the next step, so
+    steps and grids stay aligned.
 
-    for move_list in step_list:
-        move_list[-1] = move_list[-1][:len(move_list[-1])-1]
+    Args:
+        steps (list): One list of Moves per container move.
+        changes (list): The cells each container move changed.
+        history (PlanHistory): History started on the state before the plan.
 
-    # remove empty move_lists:
-    for idx, move_list in enumerate(step_list):
-        if len(move_list) == 1 and len(move_list[0]) <= 1:
-            step_list.remove(move_list)
+    Returns:
+        tuple: (Plan, history)
+    """
+    plan, pending = Plan(), {}
+    for step, changed in zip(steps, changes):
+        pending.update(changed)
+        if step:
+            plan.append(step)
+            history.append(sorted(pending.items()))
+            pending = {}
+    return plan, history
 
-    return step_list
 
 if __name__=="__main__":
 
@@ -937,8 +1338,8 @@ if __name__=="__main__":
             steps, ship_grids = load([(Container("Bat", 5432), [0, 4]), (Container("Rat", 5397), [0, 5])], ship_grid)
 
             new_steps, new_ship_grids = unload([[0, 1]], ship_grids[-1])
-            steps.append(new_steps)
-            ship_grids.append(new_ship_grids)
+            steps.extend(new_steps)
+            ship_grids = list(ship_grids) + list(new_ship_grids)
 
 
         # Case 4 Load/Unload
@@ -950,8 +1351,8 @@ if __name__=="__main__":
             print()
 
             new_steps, new_ship_grids = unload([[6, 4]], ship_grids[-1])
-            steps.append(new_steps)
-            ship_grids.append(new_ship_grids)
+            steps.extend(new_steps)
+            ship_grids = list(ship_grids) + list(new_ship_grids)
 
         # Case 5 Load/Unload
         if case == 5:
@@ -960,12 +1361,9 @@ if __name__=="__main__":
             print(steps)
 
             new_steps, new_ship_grids = unload([[0, 4], [0, 3]], ship_grids[-1])
-            for step in new_steps:
-                steps.append(step)
-            ship_grids.append(new_ship_grids)
+            steps.extend(new_steps)
+            ship_grids = list(ship_grids) + list(new_ship_grids)
 
-        r, c = np.array(ship_grids[0]).shape
-        ship_grids = reformat_grid_list(ship_grids, r, c)
         print_grid(ship_grids[-1])
 
         print(steps)    
\ No newline at end of file
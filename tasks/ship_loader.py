@@ -1,56 +1,61 @@
-from copy import deepcopy
 import random
 import os
-from tasks.ship_balancer import Container, Slot, manhattan_distance
+from collections import Counter
+from tasks.ship_balancer import Container, ShipState
+from tasks.plan_history import PlanHistory
+from tasks.crane_cost import DEFAULT_COST_MODEL, CraneRun
+from tasks.plan_cache import PLAN_CACHE, plan_key
+from tasks.buffer_grid import BufferGrid
+from tasks.load_placement import choose_load_slot
+from tasks.move_plan import UNLOAD
+from tasks.balance_search import read_columns
+from tasks.plan_optimizer import optimize_legs
+from tasks.unload_search import BUFFER, relocation_slots, search_unload_plan, staging_minutes
 
 
-def find_next_available_position(ship_grid):
-    """Find next available bottom-most position."""
-    cols = len(ship_grid[0])
-    rows = len(ship_grid)
+# The loader reports crane time in seconds; the cost model prices it in minutes
+SECONDS_PER_MINUTE = 60
+
+# Rounds select_unload_targets() reprices duplicate names with the instances already picked as free
+SELECTION_ROUNDS = 4
+
 
-    for col_idx in range(cols):
-        for row_idx in range(rows):
-            if ship_grid[row_idx][col_idx].available:
-                if row_idx == 0 or not ship_grid[row_idx - 1][col_idx].available:
-                    return row_idx, col_idx
-    return -1, -1
+def find_next_available_position(state):
+    """Find next available bottom-most position."""
+    return state.first_free()
 
-def find_blocking_containers(ship_grid, target_row, target_col):
+def find_blocking_containers(state, target_row, target_col):
     """Find containers stacked above target in top-to-bottom order."""
     blocking = []
-    max_row = len(ship_grid)
     
-    # Scan top-down starting from highest possible position
-    for row in range(max_row - 1, target_row, -1):
-        if ship_grid[row][target_col].hasContainer:
+    # Scan top-down starting from the top of the column's stack
+    for row in range(state.heights[target_col] - 1, target_row, -1):
+        if state.occupied[row, target_col]:
             blocking.append((row, target_col))
             
     return blocking  # Already in top-to-bottom order
 
-def find_lowest_available_position(ship_grid, col):
+def find_lowest_available_position(state, col):
     """Find lowest available position in column."""
-    for row in range(len(ship_grid)):
-        if ship_grid[row][col].available:
-            if row == 0 or not ship_grid[row-1][col].available:
-                return row
-    return -1
+    return state.lowest_free(col)
 
 
-def find_least_occupied_column(ship_grid, current_col, containers_to_unload):
+def find_least_occupied_column(state, current_col, containers_to_unload):
     """Find column with fewest containers not in unload list."""
     min_containers = float('inf')
     best_col = -1
     
-    for col in range(len(ship_grid[0])):
+    for col in range(state.columns):
         if col == current_col:
             continue
             
-        container_count = sum(
-            1 for row in range(len(ship_grid)) 
-            if ship_grid[row][col].hasContainer 
-            and ship_grid[row][col].container.name not in containers_to_unload
-        )
+        container_count = int(state.counts[col])
+        if containers_to_unload:
+            container_count -= sum(
+                1 for row in range(state.floors[col], state.heights[col])
+                if state.occupied[row, col]
+                and state.container_at(row, col).name in containers_to_unload
+            )
         
         if container_count < min_containers:
             min_containers = container_count
@@ -58,21 +63,39 @@ def find_least_occupied_column(ship_grid, current_col, containers_to_unload):
             
     return best_col
 
-def calculate_move_cost(start_pos, end_pos, is_first_move=False):
-    """Calculate movement cost including first move penalty."""
-    base_cost = manhattan_distance(start_pos, end_pos) * 60
-    return base_cost + (60 if is_first_move else 0)
+def calculate_move_cost(state, crane, start_pos, end_pos):
+    """Charge the crane for fetching the container at start_pos and carrying it to end_pos, in seconds."""
+    return crane.move(state.heights.tolist(), start_pos, end_pos) * SECONDS_PER_MINUTE
+
+def calculate_buffer_cost(state, crane, start_pos, buffer):
+    """
+    Stage the container at start_pos in the buffer and charge the crane for it, in seconds.
+
+    The buffer keeps the container with the column it came from, for the restore.
+    """
+    inside = buffer.store((state.container_at(*start_pos), start_pos[1]))
+    cost = crane.to_buffer(state.heights.tolist(), start_pos, inside) * SECONDS_PER_MINUTE
+    state.clear(*start_pos)
+    return cost
+
+def describe_crane_time(crane):
+    """Summarize where the crane time went, in seconds."""
+    cost = crane.cost
+    return (
+        f"Crane time: {cost.loaded * SECONDS_PER_MINUTE} seconds loaded travel, "
+        f"{cost.empty * SECONDS_PER_MINUTE} seconds empty travel, "
+        f"{cost.transfer * SECONDS_PER_MINUTE} seconds buffer transfer"
+    )
 
-def move_container(ship_grid, from_pos, to_pos, messages, is_first_move=False):
+def move_container(state, from_pos, to_pos, messages, crane):
     """Move container and update grid."""
     from_row, from_col = from_pos
     to_row, to_col = to_pos
 
-    move_cost = calculate_move_cost(from_pos, to_pos, is_first_move)
-    container = ship_grid[from_row][from_col].container
+    move_cost = calculate_move_cost(state, crane, from_pos, to_pos)
+    container = state.container_at(from_row, from_col)
     
-    ship_grid[to_row][to_col] = Slot(container=container, hasContainer=True, available=False)
-    ship_grid[from_row][from_col] = Slot(container=None, hasContainer=False, available=True)
+    state.move(from_pos, to_pos)
 
     messages.append(
         f"Moved container '{container.name}' from [{from_row + 1}, {from_col + 1}] "
@@ -81,17 +104,17 @@ def move_container(ship_grid, from_pos, to_pos, messages, is_first_move=False):
 
     return move_cost
 
-def calculate_grid_capacity(ship_grid):
+def calculate_grid_capacity(state):
     """Calculate current capacity percentage."""
-    total_slots = len(ship_grid) * len(ship_grid[0])
-    occupied_slots = sum(1 for row in ship_grid for slot in row if slot.hasContainer)
+    total_slots = state.rows * state.columns
+    occupied_slots = int(state.counts.sum())
     return (occupied_slots / total_slots) * 100
 
 
-def find_nearest_available_column(ship_grid, current_col):
+def find_nearest_available_column(state, current_col):
     """Find nearest available column, falling back to least occupied if needed."""
-    cols = len(ship_grid[0])
-    rows = len(ship_grid)
+    cols = state.columns
+    rows = state.rows
     
     # First try to find columns with direct available space
     column_scores = []
@@ -101,8 +124,8 @@ def find_nearest_available_column(ship_grid, current_col):
             continue
             
         distance = abs(col - current_col)
-        occupied_count = sum(1 for row in range(rows) if ship_grid[row][col].hasContainer)
-        has_space = any(ship_grid[row][col].available for row in range(rows))
+        occupied_count = int(state.counts[col])
+        has_space = state.capacity(col) > 0
         
         if has_space:
             # Score based on distance and occupancy (lower is better)
@@ -113,72 +136,104 @@ def find_nearest_available_column(ship_grid, current_col):
         return min(column_scores, key=lambda x: x[0])[1]
         
     # If no columns with direct space, fall back to least occupied
-    fallback_col = find_least_occupied_column(ship_grid, current_col, set())
+    fallback_col = find_least_occupied_column(state, current_col, set())
     if fallback_col != -1:
         # Make space in this column by shifting containers up
         for row in range(rows-1, 0, -1):
-            if ship_grid[row][fallback_col].hasContainer:
+            if state.occupied[row, fallback_col]:
                 # Move container up one position if possible
-                if ship_grid[row-1][fallback_col].available:
-                    container = ship_grid[row][fallback_col].container
-                    ship_grid[row-1][fallback_col] = Slot(container=container, hasContainer=True, available=False)
-                    ship_grid[row][fallback_col] = Slot(container=None, hasContainer=False, available=True)
+                if state.available[row-1, fallback_col]:
+                    state.move((row, fallback_col), (row-1, fallback_col))
         
         return fallback_col
       
     return -1
 
-def move_blocking_container_low_capacity(ship_grid, block_row, block_col, container_names, messages, first_move):
+def move_blocking_container_low_capacity(state, block_row, block_col, container_names, messages, crane):
     """Handle blocking container movement for low capacity."""
-    target_col = find_nearest_available_column(ship_grid, block_col)
+    target_col = find_nearest_available_column(state, block_col)
     
     if target_col == -1:
         return -1, None
     
-    target_row = find_lowest_available_position(ship_grid, target_col)
+    target_row = find_lowest_available_position(state, target_col)
     
     if target_row == -1:
         return -1, None
         
-    cost = move_container(ship_grid, (block_row, block_col), (target_row, target_col), messages, first_move)
+    cost = move_container(state, (block_row, block_col), (target_row, target_col), messages, crane)
     return cost, (target_row, target_col)
 
-def load_containers(ship_grid, container_names, container_weights):
-    """Load containers with step-by-step tracking."""
+def report_floating(state, messages):
+    """
+    Checks the layout a plan ends on for containers left above an empty cell.
+
+    Returns:
+        bool: True if every container is supported.
+    """
+    floating = state.floating()
+    for r, c in floating:
+        messages.append(
+            f"Error: Container '{state.container_at(r, c).name}' left floating at [{r + 1}, {c + 1}]"
+        )
+    return not floating
+
+def load_containers(ship_grid, container_names, container_weights, cost_model=None, unload_names=()):
+    """Load containers with step-by-step tracking, answering repeats from the plan cache."""
+    weights = [(name, container_weights.get(name, 0.0)) for name in container_names]
+    key = plan_key("load", ship_grid, weights, sorted(unload_names), cost_model or DEFAULT_COST_MODEL)
+    cached = PLAN_CACHE.get("load", key)
+    if cached is not None:
+        return cached
+
+    result = plan_load(ship_grid, container_names, container_weights, cost_model, unload_names)
+    PLAN_CACHE.put("load", key, result)
+    return result
+
+def plan_load(ship_grid, container_names, container_weights, cost_model=None, unload_names=(),
+              balance_aware=True):
+    """
+    Plans loading the containers in order; ship_grid is not modified.
+
+    Each container goes where choose_load_slot() puts it, so the ship ends the
+    load cycle within balance tolerance when the weights allow it, the crane
+    stays near the origin otherwise, and containers named in unload_names are
+    not buried. With balance_aware off, every container takes the lowest slot
+    of the leftmost column with room, as the loader used to.
+    """
     messages = []
     total_cost = 0
     steps = []
-    current_grid = deepcopy(ship_grid)
+    current_state = ShipState.from_grid(ship_grid)
+    crane = CraneRun(current_state.rows, cost_model)
+    history = PlanHistory.from_state(current_state)
 
     # Initial state
-    steps.append({
-        'name': 'Initial State',
-        'grid': deepcopy(current_grid),
-        'messages': [],
-        'cost': 0
-    })
+    steps.append(history.step(current_state, 'Initial State', [], 0))
 
     origin = (len(ship_grid) - 1, 0)
-    first_move = True
+    load_weights = [container_weights.get(name, 0.0) for name in container_names]
+    pending = {pos for positions in find_container_positions(current_state, set(unload_names)).values()
+               for pos in positions}
 
-    for container_name in container_names:
+    for i, container_name in enumerate(container_names):
         step_messages = []
-        target_pos = find_next_available_position(current_grid)
-        
+        if balance_aware:
+            target_pos = choose_load_slot(current_state, load_weights[i], load_weights[i + 1:], origin,
+                                          crane.model, pending) or (-1, -1)
+        else:
+            target_pos = find_next_available_position(current_state)
+
         if target_pos == (-1, -1):
             step_messages.append(f"Error: No available positions for container '{container_name}'")
             messages.extend(step_messages)
-            return current_grid, messages, total_cost, steps
+            return current_state.to_grid(), messages, total_cost, steps
 
         # Calculate move cost and load container
         row, col = target_pos
-        move_cost = calculate_move_cost(origin, target_pos, first_move)
+        move_cost = calculate_move_cost(current_state, crane, origin, target_pos)
         weight = container_weights.get(container_name, 0.0)
-        current_grid[row][col] = Slot(
-            container=Container(name=container_name, weight=weight),
-            hasContainer=True,
-            available=False
-        )
+        current_state.place(row, col, Container(name=container_name, weight=weight))
 
         step_messages.append(
             f"Container '{container_name}' loaded at position [{row + 1}, {col + 1}] "
@@ -186,171 +241,210 @@ def load_containers(ship_grid, container_names, container_weights):
         )
 
         # Add step for this container load
-        steps.append({
-            'name': f'Load Container {container_name}',
-            'grid': deepcopy(current_grid),
-            'messages': step_messages.copy(),
-            'cost': move_cost
-        })
+        steps.append(history.step(
+            current_state, f'Load Container {container_name}', step_messages.copy(), move_cost
+        ))
 
         total_cost += move_cost
         messages.extend(step_messages)
-        first_move = False
 
+    report_floating(current_state, messages)
     messages.append(f"Total loading cost: {total_cost} seconds")
-    return current_grid, messages, total_cost, steps
+    messages.append(describe_crane_time(crane))
+    left_balance, right_balance, balanced = current_state.balance()
+    messages.append(
+        f"Port / starboard after loading: {left_balance}kg / {right_balance}kg "
+        f"({'within' if balanced else 'outside'} balance tolerance)"
+    )
+    return current_state.to_grid(), messages, total_cost, steps
+
+def handle_origin_container(state, origin, targets, buffer, messages, crane):
+    """
+    Clear the origin for the unloads, staging its container in the buffer or
+    relocating it on board, whichever costs the crane less.
 
-def handle_origin_container(ship_grid, origin, container_names, current_capacity, messages, first_move):
-    """Handle container at origin position based on grid capacity."""
+    Args:
+        targets (list): (name, (row, column)) of the containers to unload.
+    """
     total_cost = 0
-    buffer = []
     temp_position = None
-    
-    if not ship_grid[origin[0]][origin[1]].hasContainer:
-        return total_cost, buffer, first_move, True, None
-        
-    origin_container = ship_grid[origin[0]][origin[1]].container
-    if origin_container.name in container_names:
-        return total_cost, buffer, first_move, True, None
-
-    # Handle based on capacity
-    if current_capacity > 50.0:
-        # Use buffer for high capacity
-        buffer.append((origin_container, origin[1], None))
-        cost = calculate_move_cost(origin, (-1, len(buffer) - 1), first_move)
+
+    if not state.occupied[origin[0], origin[1]]:
+        return total_cost, True, None
+
+    origin_container = state.container_at(origin[0], origin[1])
+    if any(pos == origin for _, pos in targets):
+        return total_cost, True, None
+
+    pending = {col for _, (_, col) in targets}
+    relocation = relocation_slots(state, crane.model, origin, pending, 1, origin)
+    staging = staging_minutes(state, crane.model, origin, buffer)
+    staging_score = sum(staging) + crane.model.empty_travel(
+        state.heights.tolist(), crane.model.park(state.rows), origin) if staging is not None else None
+
+    if staging is not None and (not relocation or staging_score < relocation[0][0]):
+        cost = clear_origin(state, origin, None, buffer, messages, crane)
+    elif relocation:
+        # Leave the container where it is moved to, it is not restored
+        temp_position = relocation[0][1]
+        cost = clear_origin(state, origin, temp_position, buffer, messages, crane)
+    else:
+        messages.append(f"Error: No available position for origin container '{origin_container.name}'")
+        return total_cost, False, None
+
+    total_cost += cost
+
+    return total_cost, True, temp_position
+
+def clear_origin(state, origin, temp_position, buffer, messages, crane):
+    """Stage the origin container in the buffer, or move it to temp_position when given. Returns the seconds charged."""
+    origin_container = state.container_at(origin[0], origin[1])
+    if temp_position is None:
+        cost = calculate_buffer_cost(state, crane, origin, buffer)
         messages.append(
             f"Moved container '{origin_container.name}' from origin to buffer. Move cost: {cost} seconds."
         )
-        ship_grid[origin[0]][origin[1]] = Slot(container=None, hasContainer=False, available=True)
-    else:
-        # Use nearest available column for low capacity - leave container there
-        target_col = find_nearest_available_column(ship_grid, origin[1])
-        if target_col != -1:
-            target_row = find_lowest_available_position(ship_grid, target_col)
-            if target_row != -1:
-                temp_position = (target_row, target_col)
-                # Move container to new position permanently
-                ship_grid[target_row][target_col] = Slot(container=origin_container, hasContainer=True, available=False)
-                ship_grid[origin[0]][origin[1]] = Slot(container=None, hasContainer=False, available=True)
-                cost = calculate_move_cost(origin, temp_position, first_move)
-                messages.append(
-                    f"Moved container '{origin_container.name}' from [{origin[0] + 1}, {origin[1] + 1}] to [{target_row + 1}, {target_col + 1}]. Move cost: {cost} seconds."
-                )
-                # Don't add to buffer since we're not restoring it
-            else:
-                messages.append(f"Error: No available position for origin container '{origin_container.name}'")
-                return total_cost, buffer, first_move, False, None
-        else:
-            messages.append(f"Error: No available column for origin container '{origin_container.name}'")
-            return total_cost, buffer, first_move, False, None
-            
-    total_cost += cost
-    first_move = False
-    
-    return total_cost, buffer, first_move, True, temp_position
+        return cost
 
-def unload_containers(ship_grid, container_names, buffer_capacity=5):
-    """Unload containers efficiently with step tracking."""
+    cost = calculate_move_cost(state, crane, origin, temp_position)
+    state.move(origin, temp_position)
+    messages.append(
+        f"Moved container '{origin_container.name}' from [{origin[0] + 1}, {origin[1] + 1}] to "
+        f"[{temp_position[0] + 1}, {temp_position[1] + 1}]. Move cost: {cost} seconds."
+    )
+    return cost
+
+def stage_blocker(state, pos, buffer, messages, crane):
+    """Stage the blocking container at pos in the buffer. Returns the seconds charged."""
+    blocking_container = state.container_at(pos[0], pos[1])
+    cost = calculate_buffer_cost(state, crane, pos, buffer)
+    messages.append(f"Moved blocking container '{blocking_container.name}' to buffer. Cost: {cost} seconds")
+    return cost
+
+def unload_container(state, pos, origin, messages, crane):
+    """Carry the container at pos to the origin and off the ship. Returns the seconds charged."""
+    container = state.container_at(pos[0], pos[1])
+    cost = move_container(state, pos, origin, messages, crane)
+    state.clear(origin[0], origin[1])
+    messages.append(f"Container '{container.name}' unloaded successfully")
+    return cost
+
+def unload_containers(ship_grid, container_names, buffer_capacity=None, cost_model=None):
+    """Unload containers efficiently with step tracking, answering repeats from the plan cache."""
+    key = plan_key("unload", ship_grid, sorted(container_names), buffer_capacity,
+                   cost_model or DEFAULT_COST_MODEL)
+    cached = PLAN_CACHE.get("unload", key)
+    if cached is not None:
+        return cached
+
+    result = plan_unload(ship_grid, container_names, buffer_capacity, cost_model)
+    PLAN_CACHE.put("unload", key, result)
+    return result
+
+def plan_unload(ship_grid, container_names, buffer_capacity=None, cost_model=None, width=None):
+    """
+    Plans unloading the named containers; ship_grid is not modified.
+
+    The order of the unloads and where each blocker goes, another column or the
+    BufferGrid on the dock, come from search_unload_plan(), so blockers are not
+    set down on containers still to be unloaded and are only staged where that
+    is cheaper than relocating them, the trip back included. Staged containers
+    are brought back at the end, last in first out, and priced like any other
+    move. A width of 0 keeps the old fixed order, top row first, with blockers
+    going to the buffer on ships over half full and to the nearest column with
+    room otherwise. A name listed n times unloads n containers of that name,
+    picked by select_unload_targets(). Finally, optimize_unload() merges the
+    moves of any container the plan moves more than once, when that saves
+    crane time.
+
+    Args:
+        buffer_capacity (int): Containers that may be staged at once; the whole buffer when omitted.
+    """
     messages = []
     total_cost = 0
     steps = []  # Track steps
-    current_grid = deepcopy(ship_grid)
+    current_state = ShipState.from_grid(ship_grid)
+    crane = CraneRun(current_state.rows, cost_model)
+    history = PlanHistory.from_state(current_state)
 
     # Initial state
-    steps.append({
-        'name': 'Initial State',
-        'grid': deepcopy(current_grid),
-        'messages': [],
-        'cost': 0
-    })
+    steps.append(history.step(current_state, 'Initial State', [], 0))
+
+    origin = (current_state.rows - 1, 0)
+    buffer = BufferGrid(limit=buffer_capacity, cost_model=crane.model)
 
-    origin = (len(current_grid) - 1, 0)
-    container_names = set(container_names)
-    first_move = True
-    buffer = []
-    unloaded_containers = set()
+    current_capacity = calculate_grid_capacity(current_state)
+    legs = []
 
-    current_capacity = calculate_grid_capacity(current_grid)
+    targets = select_unload_targets(current_state, container_names, origin, crane.model)
+    picked = {pos for _, pos in targets}
+    found = Counter(name for name, _ in targets)
+    for name, count in Counter(container_names).items():
+        if found[name] < count:
+            messages.append(f"Error: Only {found[name]} of {count} containers named '{name}' are on the ship")
 
     # Handle origin container
-    origin_cost, origin_buffer, first_move, success, temp_position = handle_origin_container(
-        current_grid, origin, container_names, current_capacity, messages, first_move
+    origin_cost, success, temp_position = handle_origin_container(
+        current_state, origin, targets, buffer, messages, crane
     )
     if not success:
-        return current_grid, messages, total_cost, steps
+        return current_state.to_grid(), messages, total_cost, steps
         
     if origin_cost > 0:
-        steps.append({
-            'name': 'Handle Origin Container',
-            'grid': deepcopy(current_grid),
-            'messages': messages.copy(),
-            'cost': origin_cost
-        })
+        steps.append(history.step(current_state, 'Handle Origin Container', messages.copy(), origin_cost))
+        legs.append((origin[1], BUFFER if temp_position is None else temp_position[1]))
     
     total_cost += origin_cost
-    buffer.extend(origin_buffer)
 
-    # Find container positions and get optimal positions
-    container_positions = find_container_positions(current_grid, container_names)
-    optimal_positions = get_optimal_container_positions(current_grid, container_positions, origin)
-    containers_to_unload = [(name, pos) for name, pos in optimal_positions.items()]
+    containers_to_unload = [(name, pos, None) for name, pos in targets]
     containers_to_unload.sort(key=lambda x: (-x[1][0], x[1][1]))
+    if width != 0:
+        plan, _ = search_unload_plan(current_state, targets, origin, crane.model, crane.position, buffer, width)
+        if plan is not None:
+            containers_to_unload = plan
 
-    for container_name, current_pos in containers_to_unload:
+    for container_name, current_pos, destinations in containers_to_unload:
         step_messages = []
         step_cost = 0
-        
-        if container_name in unloaded_containers:
-            continue
 
         # Handle blocking containers
-        blocking = find_blocking_containers(current_grid, current_pos[0], current_pos[1])
-        for block_row, block_col in blocking:
-            blocking_container = current_grid[block_row][block_col].container
-            if blocking_container.name in container_names:
+        blocking = find_blocking_containers(current_state, current_pos[0], current_pos[1])
+        for i, (block_row, block_col) in enumerate(blocking):
+            blocking_container = current_state.container_at(block_row, block_col)
+            # A target still waiting in this cell is unloaded on its own turn; anything
+            # moved into a cell a target has left is an ordinary blocker
+            if destinations is None and (block_row, block_col) in picked:
                 continue
 
-            if current_capacity > 50.0 and len(buffer) < buffer_capacity:
-                buffer.append((blocking_container, block_col, None))
-                cost = calculate_move_cost((block_row, block_col), (-1, len(buffer) - 1), first_move)
-                step_messages.append(
-                    f"Moved blocking container '{blocking_container.name}' to buffer. Cost: {cost} seconds"
-                )
-                current_grid[block_row][block_col] = Slot(container=None, hasContainer=False, available=True)
+            if destinations is not None and destinations[i] != BUFFER:
+                cost = move_container(current_state, (block_row, block_col), destinations[i], step_messages, crane)
+                legs.append((block_col, destinations[i][1]))
+            elif destinations is not None or (current_capacity > 50.0 and buffer.has_room()):
+                cost = stage_blocker(current_state, (block_row, block_col), buffer, step_messages, crane)
+                legs.append((block_col, BUFFER))
             else:
                 cost, new_pos = move_blocking_container_low_capacity(
-                    current_grid, block_row, block_col, container_names, step_messages, first_move
+                    current_state, block_row, block_col, picked, step_messages, crane
                 )
                 if cost == -1:
                     messages.extend(step_messages)
-                    return current_grid, messages, total_cost, steps
+                    return current_state.to_grid(), messages, total_cost, steps
+                legs.append((block_col, new_pos[1]))
             
             step_cost += cost
-            first_move = False
 
-            steps.append({
-                'name': f'Move Blocking Container {blocking_container.name}',
-                'grid': deepcopy(current_grid),
-                'messages': step_messages.copy(),
-                'cost': cost
-            })
+            steps.append(history.step(
+                current_state, f'Move Blocking Container {blocking_container.name}', step_messages.copy(), cost
+            ))
 
         # Unload target container
-        container = current_grid[current_pos[0]][current_pos[1]].container
-        cost = move_container(current_grid, current_pos, origin, step_messages, first_move)
-        step_cost += cost
-        first_move = False
-        
-        unloaded_containers.add(container_name)
-        current_grid[origin[0]][origin[1]] = Slot(container=None, hasContainer=False, available=True)
-        step_messages.append(f"Container '{container_name}' unloaded successfully")
-
-        steps.append({
-            'name': f'Unload Container {container_name}',
-            'grid': deepcopy(current_grid),
-            'messages': step_messages.copy(),
-            'cost': step_cost
-        })
+        step_cost += unload_container(current_state, current_pos, origin, step_messages, crane)
+        picked.discard(current_pos)
+        legs.append((current_pos[1], UNLOAD))
+
+        steps.append(history.step(
+            current_state, f'Unload Container {container_name}', step_messages.copy(), step_cost
+        ))
         
         total_cost += step_cost
         messages.extend(step_messages)
@@ -358,36 +452,166 @@ def unload_containers(ship_grid, container_names, buffer_capacity=5):
     # Restore buffer containers
     if buffer:
         step_messages = []
-        step_cost = 0
-        while buffer:
-            container, original_col, _ = buffer.pop(0)
-            if container.name in container_names:
-                continue
+        step_cost, _ = restore_buffer(current_state, buffer, crane, step_messages, legs)
+
+        steps.append(history.step(
+            current_state, 'Restore Buffer Containers', step_messages.copy(), step_cost
+        ))
+        total_cost += step_cost
+        messages.extend(step_messages)
+
+    # Merge containers the plan moves more than once, if every container still ends where it did
+    if not any(message.startswith("Error") for message in messages):
+        optimized = optimize_unload(ship_grid, legs, buffer_capacity, crane.model)
+        if optimized is not None and optimized[2] < total_cost:
+            final_layout = convert_grid_to_manuscript(current_state.to_grid())
+            if convert_grid_to_manuscript(optimized[0].to_grid()) == final_layout:
+                current_state, messages, total_cost, steps, crane = optimized
+
+    report_floating(current_state, messages)
+    messages.append(f"Total unloading cost: {total_cost} seconds")
+    messages.append(describe_crane_time(crane))
+    return current_state.to_grid(), messages, total_cost, steps
+
+
+def optimize_unload(ship_grid, legs, buffer_capacity=None, cost_model=None):
+    """
+    Runs an unload plan's crane legs through optimize_legs() and replays the result.
+
+    Returns:
+        tuple: What replay_unload() returns for the optimised legs, or None if
+        optimize_legs() saved nothing.
+    """
+    floors, stacks, _ = read_columns(ship_grid)
+    legs, before, after = optimize_legs(len(ship_grid), floors, stacks, legs, cost_model, buffer_capacity)
+    if before is None or after.total >= before.total:
+        return None
+    return replay_unload(ship_grid, legs, buffer_capacity, cost_model)
+
+
+def replay_unload(ship_grid, legs, buffer_capacity=None, cost_model=None):
+    """
+    Replays an unload plan given as crane legs, in the step format plan_unload() returns.
+
+    A first leg that lifts the container at the origin is the 'Handle Origin
+    Container' step and the legs after the last unload make up 'Restore Buffer
+    Containers'; every other leg is a blocker step of the unload it leads up to.
+    Steps are named, described and priced as plan_unload() does it.
 
-            target_row = find_lowest_available_position(current_grid, original_col)
-            if target_row == -1:
-                target_pos = find_next_available_position(current_grid)
-                if target_pos == (-1, -1):
-                    step_messages.append(f"Error: No position to restore container '{container.name}' from buffer.")
-                    continue
-                row, col = target_pos
+    Args:
+        legs (list): (src, dst) crane legs as plan_unload() records them, see simulate_legs().
+
+    Returns:
+        tuple: (ShipState, messages, total_cost, steps, CraneRun) after the last leg.
+    """
+    messages = []
+    total_cost = 0
+    steps = []
+    current_state = ShipState.from_grid(ship_grid)
+    crane = CraneRun(current_state.rows, cost_model)
+    history = PlanHistory.from_state(current_state)
+    steps.append(history.step(current_state, 'Initial State', [], 0))
+
+    origin = (current_state.rows - 1, 0)
+    buffer = BufferGrid(limit=buffer_capacity, cost_model=crane.model)
+    last_unload = max((i for i, (_, dst) in enumerate(legs) if dst == UNLOAD), default=-1)
+    step_messages = []
+    step_cost = 0
+
+    for i, (src, dst) in enumerate(legs):
+        if src == BUFFER:
+            (container, _), inside = buffer.take()
+            name = container.name
+            end = (current_state.lowest_free(dst), dst)
+            cost = restore_container(current_state, container, end, inside, step_messages, crane)
+        else:
+            pos = (current_state.top(src), src)
+            name = current_state.container_at(pos[0], pos[1]).name
+            if i == 0 and pos == origin and dst != UNLOAD:
+                temp_position = None if dst == BUFFER else (current_state.lowest_free(dst), dst)
+                cost = clear_origin(current_state, origin, temp_position, buffer, messages, crane)
+                steps.append(history.step(current_state, 'Handle Origin Container', messages.copy(), cost))
+                total_cost += cost
+                continue
+            if dst == UNLOAD:
+                cost = unload_container(current_state, pos, origin, step_messages, crane)
+            elif dst == BUFFER:
+                cost = stage_blocker(current_state, pos, buffer, step_messages, crane)
             else:
-                row, col = target_row, original_col
+                end = (current_state.lowest_free(dst), dst)
+                cost = move_container(current_state, pos, end, step_messages, crane)
+        step_cost += cost
 
-            current_grid[row][col] = Slot(container=container, hasContainer=True, available=False)
-            step_messages.append(f"Restored container '{container.name}' from buffer to [{row + 1}, {col + 1}].")
+        if i > last_unload:
+            continue
+        if dst != UNLOAD:
+            steps.append(history.step(
+                current_state, f'Move Blocking Container {name}', step_messages.copy(), cost
+            ))
+            continue
+
+        steps.append(history.step(current_state, f'Unload Container {name}', step_messages.copy(), step_cost))
+        total_cost += step_cost
+        messages.extend(step_messages)
+        step_messages = []
+        step_cost = 0
 
-        steps.append({
-            'name': 'Restore Buffer Containers',
-            'grid': deepcopy(current_grid),
-            'messages': step_messages.copy(),
-            'cost': step_cost
-        })
+    if step_messages:
+        steps.append(history.step(
+            current_state, 'Restore Buffer Containers', step_messages.copy(), step_cost
+        ))
+        total_cost += step_cost
         messages.extend(step_messages)
 
-    messages.append(f"Total unloading cost: {total_cost} seconds")
-    return current_grid, messages, total_cost, steps
+    return current_state, messages, total_cost, steps, crane
+
 
+def restore_buffer(state, buffer, crane, messages, legs=None):
+    """
+    Brings every container staged in the buffer back aboard, last in first out,
+    to its own column when that has room and to the first free slot otherwise.
+
+    Args:
+        legs (list): When given, receives a (BUFFER, column) leg per container restored.
+
+    Returns:
+        tuple: (seconds, restored) where restored is False if some container found no slot.
+    """
+    total_cost = 0
+    restored = True
+    while buffer:
+        (container, original_col), inside = buffer.take()
+
+        target_row = find_lowest_available_position(state, original_col)
+        if target_row == -1:
+            target_pos = find_next_available_position(state)
+            if target_pos == (-1, -1):
+                messages.append(f"Error: No position to restore container '{container.name}' from buffer.")
+                restored = False
+                continue
+            row, col = target_pos
+        else:
+            row, col = target_row, original_col
+
+        total_cost += restore_container(state, container, (row, col), inside, messages, crane)
+        if legs is not None:
+            legs.append((BUFFER, col))
+    return total_cost, restored
+
+def restore_container(state, container, pos, inside, messages, crane):
+    """
+    Bring a container taken from the buffer back aboard at pos. Returns the seconds charged.
+
+    Args:
+        inside (CostBreakdown): Travel inside the buffer, as BufferGrid.take() prices it.
+    """
+    row, col = pos
+    cost = crane.from_buffer(state.heights.tolist(), pos, inside) * SECONDS_PER_MINUTE
+    state.place(row, col, container)
+    messages.append(
+        f"Restored container '{container.name}' from buffer to [{row + 1}, {col + 1}]. Move cost: {cost} seconds"
+    )
+    return cost
 
 def convert_grid_to_manuscript(ship_grid):
     """Convert grid to manuscript format."""
@@ -403,14 +627,14 @@ def append_outbound_to_filename(filename):
     name, ext = os.path.splitext(filename)
     return f"{name}_OUTBOUND{ext}"
 
-def find_container_positions(ship_grid, container_names):
+def find_container_positions(state, container_names):
     """Find all positions of containers, including duplicates."""
     container_positions = {}
     
-    for row in range(len(ship_grid)-1, -1, -1):
-        for col in range(len(ship_grid[0])):
-            if ship_grid[row][col].hasContainer:
-                name = ship_grid[row][col].container.name
+    for row in range(state.rows-1, -1, -1):
+        for col in range(state.columns):
+            if state.occupied[row, col]:
+                name = state.container_at(row, col).name
                 if name in container_names:
                     if name not in container_positions:
                         container_positions[name] = []
@@ -418,37 +642,70 @@ def find_container_positions(ship_grid, container_names):
                     
     return container_positions
 
-def estimate_unload_cost(ship_grid, container_pos, origin):
-    """Estimate total cost to unload container including moving blocking containers."""
+def estimate_unload_cost(state, container_pos, origin, cost_model=None, picked=()):
+    """
+    Estimate total cost to unload container including moving blocking containers.
+
+    Blockers are charged their cheapest relocation slot, or staging in an empty
+    buffer when no other column has room; blockers in picked are unloads
+    themselves and cost nothing extra.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    heights = state.heights.tolist()
     row, col = container_pos
-    total_cost = calculate_move_cost(container_pos, origin, True)
-    
+    total_cost = cost_model.loaded_travel(heights, container_pos, origin) * SECONDS_PER_MINUTE
+
     # Add cost of moving blocking containers
-    blocking = find_blocking_containers(ship_grid, row, col)
-    for block_pos in blocking:
-        # Estimate cost to nearest available column
-        target_col = find_nearest_available_column(ship_grid, block_pos[1])
-        if target_col != -1:
-            target_row = find_lowest_available_position(ship_grid, target_col)
-            if target_row != -1:
-                total_cost += calculate_move_cost(block_pos, (target_row, target_col), False)
-                
+    for block_pos in find_blocking_containers(state, row, col):
+        if block_pos in picked:
+            continue
+        slots = relocation_slots(state, cost_model, block_pos, {col}, 1, origin)
+        if slots:
+            total_cost += slots[0][0] * SECONDS_PER_MINUTE
+        else:
+            staging = staging_minutes(state, cost_model, block_pos, BufferGrid(cost_model=cost_model))
+            total_cost += sum(staging) * SECONDS_PER_MINUTE
+
     return total_cost
 
-def get_optimal_container_positions(ship_grid, container_positions, origin):
-    """For containers with duplicates, select position with lowest unload cost."""
-    optimal_positions = {}
-    
-    for name, positions in container_positions.items():
-        if len(positions) > 1:
-            # Find position with lowest total unload cost
-            costs = [(pos, estimate_unload_cost(ship_grid, pos, origin)) for pos in positions]
-            optimal_pos = min(costs, key=lambda x: x[1])[0]
-            optimal_positions[name] = optimal_pos
-        else:
-            optimal_positions[name] = positions[0]
-            
-    return optimal_positions
+def select_unload_targets(state, container_names, origin, cost_model=None):
+    """
+    Choose which containers to unload when names repeat on the ship.
+
+    A name listed n times takes the n instances cheapest to unload. Instances of
+    one name are interchangeable, so this is the cheapest assignment of requests
+    to containers. Picking an instance can make another cheaper (one sitting on
+    the other comes off anyway instead of being relocated), so the choice is
+    repriced with the picked instances free for up to SELECTION_ROUNDS rounds
+    and the cheapest choice overall is kept. Names listed more often than they
+    are on board take every instance there is.
+
+    Returns:
+        list: (name, (row, col)) of each container to unload, top rows first.
+    """
+    requested = Counter(container_names)
+    container_positions = find_container_positions(state, set(requested))
+
+    best, best_cost = None, None
+    picked = set()
+    for _ in range(SELECTION_ROUNDS):
+        selection = []
+        for name, count in requested.items():
+            positions = container_positions.get(name, [])
+            costs = sorted(
+                (estimate_unload_cost(state, pos, origin, cost_model, picked), pos) for pos in positions
+            )
+            selection.extend((name, pos) for _, pos in costs[:count])
+
+        chosen = {pos for _, pos in selection}
+        cost = sum(estimate_unload_cost(state, pos, origin, cost_model, chosen) for pos in chosen)
+        if best_cost is None or cost < best_cost:
+            best, best_cost = selection, cost
+        if chosen == picked:
+            break
+        picked = chosen
+
+    return sorted(best, key=lambda target: (-target[1][0], target[1][1]))
 
 
 # def unload_containers(ship_grid, container_names, buffer_capacity=5): 
@@ -0,0 +1,302 @@
+from tasks.ship_balancer import Slot
+from tasks.balance_search import check_plan, read_columns, replay_moves
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.plan_optimizer import optimize_moves
+
+
+# The planner gives up (and SIFT reports no plan) after this many moves per container
+MAX_MOVES_PER_CONTAINER = 6
+
+
+def sift_column_order(columns):
+    """
+    Order in which SIFT fills the slots of a row: centre-left first, then alternating
+    outwards (5, 6, 4, 7, ... for 12 columns), as calculate_all_sift_slots() does.
+    """
+    centre = columns // 2 - 1
+    order = [centre]
+    for offset in range(1, columns):
+        for c in (centre + offset, centre - offset):
+            if 0 <= c < columns and len(order) < columns:
+                order.append(c)
+    return order
+
+
+def sift_targets(rows, floors, weights):
+    """
+    Computes the SIFT arrangement: heaviest container in the first SIFT slot, and so on.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        floors (list): NAN floor height of each column.
+        weights (list): Weight of every container on the ship.
+
+    Returns:
+        list: Goal weights of each column, bottom up. Containers of equal weight are
+        interchangeable, so the goal is expressed in weights rather than containers.
+    """
+    columns = len(floors)
+    slots = [c for r in range(rows) for c in sift_column_order(columns) if r >= floors[c]]
+
+    goal = [[] for _ in range(columns)]
+    for c, weight in zip(slots, sorted(weights, reverse=True)):
+        goal[c].append(weight)
+    return goal
+
+
+def settled_heights(stacks, goal, weights):
+    """Number of containers at the bottom of each column already in their SIFT slot."""
+    settled = []
+    for stack, target in zip(stacks, goal):
+        k = 0
+        while k < len(stack) and k < len(target) and weights[stack[k]] == target[k]:
+            k += 1
+        settled.append(k)
+    return settled
+
+
+def sift_lower_bound(stacks, goal, weights):
+    """
+    Admissible bound on the crane minutes SIFT still needs.
+
+    Every container above the settled bottom of its column has to move at least
+    once, and it can only come to rest in a column whose goal holds its weight, so
+    it is charged its distance to the nearest such column, and never less than one
+    minute.
+
+    Args:
+        stacks (list): Container indices of each column, bottom up.
+        goal (list): Goal weights of each column, as sift_targets() returns them.
+        weights (list): Weight of each container index.
+
+    Returns:
+        int: Minutes no SIFT plan from this layout can undercut.
+    """
+    settled = settled_heights(stacks, goal, weights)
+    columns = {}
+    for d, target in enumerate(goal):
+        for weight in target:
+            columns.setdefault(weight, set()).add(d)
+
+    minutes = 0
+    for c, stack in enumerate(stacks):
+        for idx in stack[settled[c]:]:
+            minutes += max(1, min(abs(c - d) for d in columns[weights[idx]]))
+    return minutes
+
+
+def locate_loose(stacks, settled):
+    """Maps every container not yet in its SIFT slot to (column, containers above it)."""
+    located = {}
+    for c, stack in enumerate(stacks):
+        for depth, idx in enumerate(reversed(stack[settled[c]:])):
+            located[idx] = (c, depth)
+    return located
+
+
+def parking_columns(rows, heights, stacks, settled, goal, src, keep_clear, crane, cost_model):
+    """
+    Columns the top container of src can be parked on, best first when sorted.
+
+    Args:
+        keep_clear (tuple): (slot column, source column, dig column) to leave alone.
+        crane (tuple): (row, column) the crane is at.
+        cost_model (CraneCostModel): Prices the moves.
+
+    Returns:
+        list: (buries_ready, minutes, column) for every reachable column.
+    """
+    d, s, _ = keep_clear
+    parking = []
+    for dst in range(len(stacks)):
+        if dst == src or dst in keep_clear:
+            continue
+        if min(s, d) < dst < max(s, d) and heights[dst] + 1 >= rows:
+            # Filling a column between the container and its slot would wall it off
+            continue
+        cost = cost_model.column_move(heights, crane, src, dst, rows)
+        if cost is None:
+            continue
+        buries_ready = len(stacks[dst]) == settled[dst] < len(goal[dst])
+        parking.append((buries_ready, cost.total, dst))
+    return parking
+
+
+def plan_sift_moves(rows, floors, stacks, weights, max_moves=None, cost_model=None):
+    """
+    Plans crane moves that turn the current layout into the SIFT arrangement.
+
+    Containers at the bottom of a column that already match their goal never move.
+    Everything else is loose. Each goal slot depends on the slot below it, so at each
+    point only the lowest unfilled slot of a column can be filled. The planner makes
+    the cheapest move, empty crane travel included, that puts a loose top container straight into such a slot.
+    When no such move exists, it commits to the slot and container that are cheapest
+    to dig out: the fewest loose containers on top of the slot plus on top of the
+    container. It then parks those one at a time, preferring columns where they bury
+    nothing still needed.
+
+    Args:
+        rows (int): Number of rows in the grid.
+        floors (list): NAN floor height of each column.
+        stacks (list): Container indices of each column, bottom up; not modified.
+        weights (list): Weight of each container index.
+        max_moves (int): Move limit; MAX_MOVES_PER_CONTAINER per container when omitted.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+
+    Returns:
+        list: (src, dst) column moves, or None if the planner got stuck.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    crane = cost_model.park(rows)
+    columns = len(stacks)
+    stacks = [list(stack) for stack in stacks]
+    goal = sift_targets(rows, floors, weights)
+    if max_moves is None:
+        max_moves = MAX_MOVES_PER_CONTAINER * max(1, len(weights))
+
+    # Dependency order of the goal slots: lower rows first, then SIFT column order
+    rank = {c: i for i, c in enumerate(sift_column_order(columns))}
+    moves, target = [], None
+
+    while len(moves) <= max_moves:
+        settled = settled_heights(stacks, goal, weights)
+        if all(settled[c] == len(stacks[c]) == len(goal[c]) for c in range(columns)):
+            return moves
+
+        heights = [floors[c] + len(stacks[c]) for c in range(columns)]
+        ready = {c: goal[c][settled[c]] for c in range(columns) if len(stacks[c]) == settled[c] < len(goal[c])}
+
+        # Fill a ready slot straight from the top of another column
+        direct = []
+        for src in range(columns):
+            if len(stacks[src]) <= settled[src]:
+                continue
+            weight = weights[stacks[src][-1]]
+            for dst, needed in ready.items():
+                if needed == weight and dst != src:
+                    cost = cost_model.column_move(heights, crane, src, dst, rows)
+                    if cost is not None:
+                        direct.append((cost.total, floors[dst] + settled[dst], rank[dst], src, dst))
+        if direct:
+            _, _, _, src, dst = min(direct)
+            stacks[dst].append(stacks[src].pop())
+            moves.append((src, dst))
+            crane = (heights[dst], dst)
+            continue
+
+        # Otherwise keep digging for the committed slot and container, or commit to the
+        # pair that is cheapest to dig out. Sticking with one pair until it is placed
+        # means every parking move removes a blocker, so the plan always progresses.
+        located = locate_loose(stacks, settled)
+        if target is not None:
+            d, idx = target
+            if settled[d] >= len(goal[d]) or weights[idx] != goal[d][settled[d]] or located.get(idx, d) == d:
+                target = None
+        if target is None:
+            digs = []
+            for d in range(columns):
+                if settled[d] >= len(goal[d]):
+                    continue
+                needed = goal[d][settled[d]]
+                blockers = len(stacks[d]) - settled[d]
+                for idx, (s, depth) in located.items():
+                    if weights[idx] == needed and s != d:
+                        digs.append((blockers + depth, floors[d] + settled[d], rank[d], d, idx))
+            if not digs:
+                return None
+            _, _, _, d, idx = min(digs)
+            target = (d, idx)
+
+        d, idx = target
+        s, depth = located[idx]
+        src = d if len(stacks[d]) > settled[d] else s
+        if src == s and depth == 0:
+            # The container is free and its slot is open, so a full column in between
+            # blocks the crane: lower the first one that has a loose top
+            lo, hi = min(s, d), max(s, d)
+            walls = [c for c in range(lo + 1, hi) if heights[c] >= rows and len(stacks[c]) > settled[c]]
+            if not walls:
+                return None
+            src = walls[0]
+
+        # Park on a column whose top is loose anyway, away from the slot and the container.
+        # If full columns box the crane in, lower the nearest of them first.
+        walls = sorted((abs(c - src), c) for c in range(columns)
+                       if c != src and heights[c] >= rows and len(stacks[c]) > settled[c])
+        for lift in [src] + [c for _, c in walls]:
+            parking = parking_columns(rows, heights, stacks, settled, goal, lift, (d, s, src), crane, cost_model)
+            if parking:
+                break
+        if not parking:
+            return None
+
+        _, _, dst = min(parking)
+        stacks[dst].append(stacks[lift].pop())
+        moves.append((lift, dst))
+        crane = (heights[dst], dst)
+
+    return None
+
+
+def plan_sift(ship_grid, cost_model=None):
+    """
+    Plans SIFT on the column view of a grid, tidied up by optimize_moves().
+
+    Returns:
+        tuple: (moves, cost) where moves is a list of (src, dst) column moves and
+        cost their CostBreakdown, or (None, None) if no plan was found.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    rows = len(ship_grid)
+    floors, stacks, containers = read_columns(ship_grid)
+    weights = [container.weight for container in containers]
+
+    moves = plan_sift_moves(rows, floors, stacks, weights, cost_model=cost_model)
+    if moves is None:
+        return None, None
+    moves, _, cost = optimize_moves(rows, floors, stacks, moves, cost_model)
+    return moves, cost
+
+
+def sift_balance(ship_grid, cost_model=None):
+    """
+    SIFT with planned moves, leaving ship_grid in the SIFT layout.
+
+    The plan is replayed with check_plan() before ship_grid is touched. When the
+    planner finds no plan (near-full ships can wall the crane in) or the replay
+    rejects it, ship_grid is left as it was and no plan is returned; the greedy
+    sift() is not tried, since it fails or makes illegal moves on the same ships.
+
+    Returns:
+        tuple: (steps, ship_grids), or (None, None) without a plan.
+    """
+    moves, _ = plan_sift(ship_grid, cost_model)
+    if moves is None:
+        print("No SIFT plan found")
+        return None, None
+
+    steps, ship_grids = replay_moves(ship_grid, moves)
+    try:
+        check_plan(ship_grid, steps)
+    except ValueError as error:
+        print(f"SIFT plan rejected: {error}")
+        return None, None
+
+    if ship_grids:
+        for r, row in enumerate(ship_grids[-1]):
+            ship_grid[r][:] = [Slot(slot.container, slot.hasContainer, slot.available) for slot in row]
+    return steps, ship_grids
+
+
+def sift_fallback(ship_grid, cost_model=None):
+    """
+    sift_balance() for a balancing planner that found the ship cannot be balanced.
+
+    Returns:
+        tuple: (steps, ship_grids, status) like balance(): status False with the
+        SIFT plan, or [], [], None with ship_grid unchanged when there is none.
+    """
+    steps, ship_grids = sift_balance(ship_grid, cost_model)
+    if steps is None:
+        return [], [], None
+    return steps, ship_grids, False
@@ -0,0 +1,293 @@
+from collections import Counter, deque
+
+from tasks.ship_balancer import Container, ShipState
+from tasks.buffer_grid import BufferGrid
+from tasks.crane_cost import DEFAULT_COST_MODEL, CraneRun
+from tasks.plan_history import PlanHistory
+from tasks.load_placement import choose_load_slot
+from tasks.plan_cache import PLAN_CACHE, plan_key
+from tasks.ship_loader import (
+    SECONDS_PER_MINUTE,
+    calculate_buffer_cost,
+    describe_crane_time,
+    find_blocking_containers,
+    move_container,
+    plan_load,
+    plan_unload,
+    report_floating,
+    restore_buffer,
+    select_unload_targets,
+)
+
+
+class TransferPlan:
+    """
+    One plan for a transfer list of unloads and loads, interleaved.
+
+    grid, messages and steps are what load_containers() returns, so the loading
+    page can show either; every step carries its own cost in seconds. cost is the
+    crane's CostBreakdown in minutes and seconds its total as the loader reports
+    it. baseline is what the same transfer costs when plan_unload() runs first and
+    plan_load() after it, in seconds, or None when it was not measured. complete
+    is False when the plan stopped on an error, listed in messages; such a plan
+    must not be applied, and it reports no saving.
+    """
+
+    def __init__(self, grid, messages, steps, cost, baseline=None, complete=True):
+        self.grid = grid
+        self.messages = messages
+        self.steps = steps
+        self.cost = cost
+        self.seconds = cost.total * SECONDS_PER_MINUTE
+        self.baseline = baseline
+        self.complete = complete
+
+    @property
+    def saved(self):
+        """Seconds saved against the back-to-back plans, or None without a baseline or a complete plan."""
+        if self.baseline is None or not self.complete:
+            return None
+        return self.baseline - self.seconds
+
+
+def pending_columns(targets):
+    """Columns holding a container still to be unloaded."""
+    return {col for _, col in targets}
+
+
+def drop_slots(state, exclude=(), pending=()):
+    """
+    Lowest free slot of every column that has one, keeping clear of pending unloads.
+
+    Columns holding a pending unload are only offered when no other column has room,
+    since a container dropped there has to be moved again before the unload.
+
+    Args:
+        exclude (iterable): Columns not to offer at all.
+        pending (set): Columns holding a container still to be unloaded.
+
+    Returns:
+        list: (row, column) slots.
+    """
+    slots = [(state.lowest_free(c), c) for c in range(state.columns) if c not in exclude]
+    slots = [slot for slot in slots if slot[0] != -1]
+    clear = [slot for slot in slots if slot[1] not in pending]
+    return clear or slots
+
+
+def next_pick(state, targets):
+    """
+    Pending unload to dig out next: the one with the fewest containers on top of it.
+
+    A pending unload that sits on another always has fewer on top, so stacked
+    unloads come off from the top down.
+
+    Returns:
+        tuple: (name, (row, column)), or None when nothing is left to unload.
+    """
+    if not targets:
+        return None
+    pos = min(targets, key=lambda cell: (len(find_blocking_containers(state, *cell)), -cell[0], cell[1]))
+    return targets[pos], pos
+
+
+def pick_cell(state, targets):
+    """Cell the crane goes to for the next unload: the top of the next pick's column."""
+    pick = next_pick(state, targets)
+    if pick is None:
+        return None
+    _, (_, col) = pick
+    return state.top(col), col
+
+
+def transfer_load_slot(state, model, origin, targets, weight, rest):
+    """
+    Slot for the next container to load while unloads may still be pending.
+
+    choose_load_slot() weighs the balance, the crane time and burying a pending
+    unload. While unloads are pending, the hook goes on to the next one after the
+    load, so the empty trip there is charged instead of the trip back to the
+    origin; a load lands near it (often in a slot an unload or a relocated
+    blocker just freed) instead of sending the hook back across the ship.
+
+    Args:
+        weight (float): Weight of the container to load.
+        rest (list): Weights of the containers to load after it.
+
+    Returns:
+        tuple: (row, column), or None if no slot is free.
+    """
+    # The origin column's top slot is where unloaded containers are handed over
+    exclude = {origin[1]} if targets and state.lowest_free(origin[1]) == origin[0] else set()
+    return choose_load_slot(state, weight, rest, origin, model, set(targets), pick_cell(state, targets), exclude)
+
+
+def choose_blocker_slot(state, model, pos, targets):
+    """
+    Slot to relocate a blocker at pos to, keeping clear of pending unloads.
+
+    Slots are charged the loaded trip there and the empty trip back to pos, where
+    the hook picks up the next blocker or the unload itself.
+
+    Returns:
+        tuple: (row, column), or None if no other column has room.
+    """
+    slots = drop_slots(state, {pos[1]}, pending_columns(targets))
+    if not slots:
+        return None
+
+    heights = state.heights.tolist()
+    return min(slots, key=lambda slot: (
+        model.loaded_travel(heights, pos, slot) + model.empty_travel(heights, slot, pos), slot[1]
+    ))
+
+
+def plan_transfer(ship_grid, unload_names, load_names, container_weights, cost_model=None, compare=True,
+                  buffer_capacity=None):
+    """
+    Plans a transfer list of unloads and loads as one interleaved crane run.
+
+    Unloads are dug out fewest-blockers-first. Every unload ends with the hook at
+    the origin, which is where the next load starts, so a load follows each unload
+    straight away and goes where transfer_load_slot() puts it, which keeps the
+    ship's final balance within reach and is cheap to reach from the origin and
+    to leave for the next unload. Relocated blockers keep off columns with
+    pending unloads while any other column has room, and loads are charged for
+    burying one, so little is buried that still has to come off. A blocker no
+    other column has room for is staged in the BufferGrid, and staged containers
+    come back aboard once the last unload is done, before any load still
+    waiting. Loads the ship has no room for wait until unloads free some. The
+    plan is complete only if every container listed was found, every step could
+    be made and no container ends up floating. ship_grid is not modified.
+
+    Args:
+        ship_grid (list): The current ship grid.
+        unload_names (list): Names of the containers to unload; a name listed n times unloads n of them.
+        load_names (list): Names of the containers to load, in order.
+        container_weights (dict): Weight of each container to load.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+        compare (bool): Also price plan_unload() followed by plan_load() as the baseline.
+        buffer_capacity (int): Containers that may be staged at once; the whole buffer when omitted.
+
+    Returns:
+        TransferPlan: The plan, its per-step costs and the saving over the baseline.
+    """
+    state = ShipState.from_grid(ship_grid)
+    crane = CraneRun(state.rows, cost_model)
+    model = crane.model
+    origin = (state.rows - 1, 0)
+    buffer = BufferGrid(limit=buffer_capacity, cost_model=model)
+    messages = []
+    history = PlanHistory.from_state(state)
+    steps = [history.step(state, 'Initial State', [], 0)]
+
+    # Containers to unload stay put until they come off, so their cells name them
+    targets = {pos: name for name, pos in select_unload_targets(state, unload_names, origin, model)}
+    loads = deque(load_names)
+
+    found = Counter(targets.values())
+    missing = [
+        f"Error: Only {found[name]} of {count} containers named '{name}' are on the ship"
+        for name, count in Counter(unload_names).items() if found[name] < count
+    ]
+    messages.extend(missing)
+
+    def finish(complete):
+        complete = report_floating(state, messages) and complete and not missing
+        baseline = transfer_baseline(ship_grid, unload_names, load_names, container_weights, cost_model) \
+            if compare else None
+        messages.append(f"Total transfer cost: {crane.cost.total * SECONDS_PER_MINUTE} seconds")
+        messages.append(describe_crane_time(crane))
+        if baseline is not None:
+            messages.append(f"Unloading and then loading separately: {baseline} seconds")
+        return TransferPlan(state.to_grid(), messages, steps, crane.cost, baseline, complete)
+
+    def fail(message):
+        messages.append(message)
+        return finish(False)
+
+    while targets or loads:
+        pick = next_pick(state, targets)
+        if pick is not None:
+            name, pos = pick
+            step_messages = []
+            step_cost = 0
+            for block_pos in find_blocking_containers(state, *pos):
+                slot = choose_blocker_slot(state, model, block_pos, targets)
+                blocker = state.container_at(*block_pos)
+                if slot is not None:
+                    cost = move_container(state, block_pos, slot, step_messages, crane)
+                elif buffer.has_room():
+                    cost = calculate_buffer_cost(state, crane, block_pos, buffer)
+                    step_messages.append(
+                        f"Moved blocking container '{blocker.name}' to buffer. Cost: {cost} seconds"
+                    )
+                else:
+                    messages.extend(step_messages)
+                    return fail(f"Error: No position to relocate the container above '{name}'")
+                step_cost += cost
+                steps.append(history.step(
+                    state, f'Move Blocking Container {blocker.name}', step_messages[-1:], cost
+                ))
+
+            # The origin is only passed through, so a container parked there can stay
+            cost = crane.move(state.heights.tolist(), pos, origin) * SECONDS_PER_MINUTE
+            state.clear(*pos)
+            del targets[pos]
+            step_messages.append(
+                f"Container '{name}' unloaded from [{pos[0] + 1}, {pos[1] + 1}]. Move cost: {cost} seconds"
+            )
+            steps.append(history.step(state, f'Unload Container {name}', step_messages[-1:], cost))
+            messages.extend(step_messages)
+
+        if not targets and buffer:
+            step_messages = []
+            cost, restored = restore_buffer(state, buffer, crane, step_messages)
+            steps.append(history.step(state, 'Restore Buffer Containers', step_messages.copy(), cost))
+            messages.extend(step_messages)
+            if not restored:
+                return finish(False)
+
+        if not loads:
+            continue
+
+        weights = [container_weights.get(name, 0.0) for name in loads]
+        slot = transfer_load_slot(state, model, origin, targets, weights[0], weights[1:])
+        if slot is None:
+            if targets:
+                # Wait for the next unload to free a slot
+                continue
+            return fail(f"Error: No available positions for container '{loads[0]}'")
+
+        name = loads.popleft()
+        weight = container_weights.get(name, 0.0)
+        cost = crane.move(state.heights.tolist(), origin, slot) * SECONDS_PER_MINUTE
+        state.place(*slot, Container(name=name, weight=weight))
+        message = (
+            f"Container '{name}' loaded at position [{slot[0] + 1}, {slot[1] + 1}] "
+            f"with weight {weight}kg. Move cost: {cost} seconds"
+        )
+        steps.append(history.step(state, f'Load Container {name}', [message], cost))
+        messages.append(message)
+
+    return finish(True)
+
+
+def transfer_baseline(ship_grid, unload_names, load_names, container_weights, cost_model=None):
+    """Seconds for the same transfer with plan_unload() followed by plan_load(), as the pages ran it."""
+    grid, _, unload_cost, _ = plan_unload(ship_grid, unload_names, cost_model=cost_model)
+    _, _, load_cost, _ = plan_load(grid, load_names, container_weights, cost_model)
+    return unload_cost + load_cost
+
+
+def transfer_containers(ship_grid, unload_names, load_names, container_weights, cost_model=None):
+    """plan_transfer(), answering repeats from the plan cache."""
+    weights = [(name, container_weights.get(name, 0.0)) for name in load_names]
+    key = plan_key("transfer", ship_grid, sorted(unload_names), weights, cost_model or DEFAULT_COST_MODEL)
+    cached = PLAN_CACHE.get("transfer", key)
+    if cached is not None:
+        return cached
+
+    plan = plan_transfer(ship_grid, unload_names, load_names, container_weights, cost_model)
+    PLAN_CACHE.put("transfer", key, plan)
+    return plan
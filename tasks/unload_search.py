@@ -0,0 +1,224 @@
+import os
+
+from tasks.crane_cost import DEFAULT_COST_MODEL
+
+
+# Partial unload plans kept per unload; set UNLOAD_BEAM_WIDTH to trade plan quality for latency
+UNLOAD_BEAM_WIDTH = int(os.getenv("UNLOAD_BEAM_WIDTH", "8"))
+
+# Pending unloads tried next from each partial plan, cheapest to dig out first
+TARGET_CHOICES = 4
+
+# Drop slots tried for each of the first BRANCHED_BLOCKERS blockers of an unload; the rest take the cheapest
+RELOCATION_CHOICES = 2
+BRANCHED_BLOCKERS = 2
+
+# Destination of a blocker that goes to the buffer instead of another column
+BUFFER = "buffer"
+
+
+def blockers_of(state, pos):
+    """Cells of the containers stacked on pos, top first."""
+    row, col = pos
+    return [(r, col) for r in range(int(state.heights[col]) - 1, row, -1) if state.occupied[r, col]]
+
+
+def relocation_slots(state, cost_model, pos, pending, limit, keep_free=None):
+    """
+    Cheapest slots to set the container at pos down on, clear of pending unloads.
+
+    A slot is charged the loaded trip there plus the empty trip back to pos, where
+    the hook picks up the next blocker or the unload. Columns holding a pending
+    unload are only offered when no other column has room, since a container set
+    down there would have to be moved again.
+
+    Args:
+        pending (set): Columns holding a container still to be unloaded.
+        limit (int): Slots to return.
+        keep_free (tuple): Cell never to offer, the origin unloads pass through.
+
+    Returns:
+        list: (minutes, (row, column)) pairs, cheapest first.
+    """
+    heights = state.heights.tolist()
+    slots = [(heights[c], c) for c in range(state.columns)
+             if c != pos[1] and heights[c] < state.rows and (heights[c], c) != keep_free]
+    clear = [slot for slot in slots if slot[1] not in pending]
+
+    scored = []
+    for slot in clear or slots:
+        after = list(heights)
+        after[slot[1]] += 1
+        after[pos[1]] -= 1
+        minutes = cost_model.loaded_travel(heights, pos, slot) + cost_model.empty_travel(after, slot, pos)
+        scored.append((minutes, slot))
+    scored.sort()
+    return scored[:limit]
+
+
+def unload_estimate(state, cost_model, remaining, origin):
+    """
+    Estimated crane minutes for the unloads left, for ranking partial plans.
+
+    Every pending unload is charged its loaded trip to the origin, and every other
+    container on top of it two cells, the least a relocation costs.
+    """
+    heights = state.heights.tolist()
+    minutes = 0
+    for pos in remaining:
+        minutes += cost_model.loaded_travel(heights, pos, origin)
+        minutes += 2 * cost_model.loaded_minutes * sum(1 for cell in blockers_of(state, pos) if cell not in remaining)
+    return minutes
+
+
+def staging_minutes(state, cost_model, pos, buffer):
+    """
+    Crane minutes for staging the container at pos in the buffer.
+
+    Now: the carry to the park position, the hand-over and the travel inside the
+    buffer. Later: bringing it back, estimated as the same travel inside, the
+    hand-over and the carry to where it came from.
+
+    Args:
+        buffer (BufferGrid): The buffer as it stands; None when there is none.
+
+    Returns:
+        tuple: (minutes now, minutes later), or None if the buffer has no room.
+    """
+    inside = buffer.store_cost() if buffer is not None else None
+    if inside is None:
+        return None
+    heights = state.heights.tolist()
+    park = cost_model.park(state.rows)
+    now = cost_model.loaded_travel(heights, pos, park) + cost_model.buffer_transfer_minutes + inside.total
+    later = inside.total + cost_model.buffer_transfer_minutes + cost_model.loaded_travel(heights, park, pos)
+    return now, later
+
+
+def dig_out(state, cost_model, crane, pos, origin, pending, buffer):
+    """
+    Ways of clearing and unloading the container at pos.
+
+    Each blocker can go to a drop slot on the ship, or to the buffer, priced with
+    staging_minutes() including the trip back; the RELOCATION_CHOICES cheapest of
+    these are branched on for the first BRANCHED_BLOCKERS blockers, and the rest
+    take the cheapest. The buffer wins where the ship has no clear column near
+    the blocker, on nearly full ships mostly.
+
+    Args:
+        state (ShipState): Layout before the unload; not modified.
+        crane (tuple): Cell the hook starts from.
+        pending (set): Columns holding other containers still to be unloaded.
+        buffer (BufferGrid): The buffer before the unload, not modified; None when there is none.
+
+    Returns:
+        list: (state, buffer, minutes, destinations) per way, where destinations
+        holds a (row, column) slot or BUFFER per blocker, top first. None if some
+        blocker has nowhere to go.
+    """
+    park = cost_model.park(state.rows)
+    ways = [(state.copy(), buffer.copy() if buffer is not None else None, crane, 0, [])]
+
+    for i, block in enumerate(blockers_of(state, pos)):
+        branched = []
+        for way_state, way_buffer, way_crane, minutes, destinations in ways:
+            heights = way_state.heights.tolist()
+            fetch = cost_model.empty_travel(heights, way_crane, block)
+
+            limit = RELOCATION_CHOICES if i < BRANCHED_BLOCKERS else 1
+            options = relocation_slots(way_state, cost_model, block, pending, limit, origin)
+            staging = staging_minutes(way_state, cost_model, block, way_buffer)
+            if staging is not None:
+                options.append((sum(staging) + cost_model.empty_travel(heights, park, block), BUFFER))
+            options = sorted(options, key=lambda option: option[0])[:limit]
+
+            for j, (_, destination) in enumerate(options):
+                last = j == len(options) - 1
+                child = way_state if last else way_state.copy()
+                child_buffer = way_buffer if last or way_buffer is None else way_buffer.copy()
+                if destination == BUFFER:
+                    child.clear(*block)
+                    child_buffer.store(None)
+                    spent, child_crane = sum(staging), park
+                else:
+                    child.move(block, destination)
+                    spent, child_crane = cost_model.loaded_travel(heights, block, destination), destination
+                branched.append((child, child_buffer, child_crane, minutes + fetch + spent,
+                                 destinations + [destination]))
+        if not branched:
+            return None
+        ways = branched
+
+    dug = []
+    for way_state, way_buffer, way_crane, minutes, destinations in ways:
+        heights = way_state.heights.tolist()
+        minutes += cost_model.empty_travel(heights, way_crane, pos) + cost_model.loaded_travel(heights, pos, origin)
+        way_state.clear(*pos)
+        dug.append((way_state, way_buffer, minutes, destinations))
+    return dug
+
+
+def search_unload_plan(state, targets, origin, cost_model=None, crane=None, buffer=None, width=None):
+    """
+    Beam search over the order of the unloads and where their blockers go.
+
+    A partial plan is the layout after some unloads, the hook's position and the
+    crane minutes spent. Each is extended by digging out one of the
+    TARGET_CHOICES pending unloads that are cheapest to reach (never one with
+    another pending unload on top of it), with the blockers' drop slots branched
+    as dig_out() does; blockers are never set down on a column that still holds a
+    pending unload while another column has room. The width extended plans with
+    the fewest minutes spent plus unload_estimate() survive each round.
+
+    Args:
+        state (ShipState): Layout to unload from; not modified.
+        targets (list): (name, (row, column)) of each container to unload; a name
+            may come more than once.
+        origin (tuple): Cell containers leave the ship through.
+        cost_model (CraneCostModel): Prices the moves; DEFAULT_COST_MODEL when omitted.
+        crane (tuple): Cell the hook starts from; the park position when omitted.
+        buffer (BufferGrid): The buffer blockers may be staged in, not modified; None for none.
+        width (int): Beam width; UNLOAD_BEAM_WIDTH when omitted.
+
+    Returns:
+        tuple: (plan, minutes) where plan lists (name, (row, column), destinations)
+        per unload in order, destinations as dig_out() returns them; (None, None)
+        if some blocker has nowhere to go.
+    """
+    cost_model = cost_model or DEFAULT_COST_MODEL
+    width = max(1, width or UNLOAD_BEAM_WIDTH)
+    crane = crane or cost_model.park(state.rows)
+
+    # (score, minutes, state, crane, remaining, buffer, plan)
+    # Containers to unload are never moved until they come off, so their cells name them
+    beam = [(0, 0, state, crane, {pos: name for name, pos in targets}, buffer, [])]
+    for _ in range(len(targets)):
+        children = {}
+        for _, minutes, node, node_crane, remaining, node_buffer, plan in beam:
+            heights = node.heights.tolist()
+            ready = [
+                (len(blockers_of(node, pos)), cost_model.empty_travel(heights, node_crane, pos), pos, name)
+                for pos, name in remaining.items()
+                if not any(cell in remaining for cell in blockers_of(node, pos))
+            ]
+            if origin in remaining:
+                # Nothing passes through the origin while a pending unload sits on it
+                ready = [entry for entry in ready if entry[2] == origin]
+            for _, _, pos, name in sorted(ready)[:TARGET_CHOICES]:
+                rest = {cell: other for cell, other in remaining.items() if cell != pos}
+                columns = {col for _, col in rest}
+                for child, child_buffer, spent, destinations in dig_out(
+                        node, cost_model, node_crane, pos, origin, columns, node_buffer) or []:
+                    child_minutes = minutes + spent
+                    key = (child.key(), len(child_buffer) if child_buffer is not None else 0)
+                    if key in children and children[key][1] <= child_minutes:
+                        continue
+                    score = child_minutes + unload_estimate(child, cost_model, rest, origin)
+                    children[key] = (score, child_minutes, child, origin, rest, child_buffer,
+                                     plan + [(name, pos, destinations)])
+        if not children:
+            return None, None
+        beam = sorted(children.values(), key=lambda entry: entry[:2])[:width]
+
+    _, minutes, _, _, _, _, plan = beam[0]
+    return plan, minutes
@@ -0,0 +1,147 @@
+import os
+import random
+from collections import Counter
+
+import pytest
+
+from tasks.balance_search import check_plan
+from tasks.plan_cache import PLAN_CACHE, grid_signature
+from tasks.ship_balancer import ShipState, calculate_balance, create_ship_grid, update_ship_grid
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+# Manifests bundled in data/, all 8 x 12 ships
+MANIFESTS = ["ShipCase1", "ShipCase2", "ShipCase3", "ShipCase4", "ShipCase5", "SilverQueen"]
+
+
+def load_manifest(name, rows=8, columns=12):
+    """
+    Loads one of the bundled manifests.
+
+    Returns:
+        tuple: (ship_grid, containers) as produced by update_ship_grid.
+    """
+    ship_grid, containers = create_ship_grid(rows, columns), []
+    with open(os.path.join(DATA_DIR, name + ".txt"), "r") as file:
+        update_ship_grid(file.read().splitlines(), ship_grid, containers)
+    return ship_grid, containers
+
+
+def synthetic_manifest(seed, count, rows=8, columns=12):
+    """
+    Builds a reproducible random manifest with count containers.
+
+    The outer columns get a NAN floor like the bundled manifests, and port-side
+    containers are drawn heavier so the ship starts out of balance.
+
+    Returns:
+        list: Manifest lines in the "[rr,cc], {wwwww}, name" format.
+    """
+    rng = random.Random(seed)
+    floors = [1 if c in (0, columns - 1) else 0 for c in range(columns)]
+    heights = list(floors)
+
+    for _ in range(count):
+        open_columns = [c for c in range(columns) if heights[c] < rows]
+        heights[rng.choice(open_columns)] += 1
+
+    lines = []
+    for r in range(rows):
+        for c in range(columns):
+            if r < floors[c]:
+                weight, name = 0, "NAN"
+            elif r < heights[c]:
+                weight = rng.randint(500, 9999) if c < columns // 2 else rng.randint(100, 5000)
+                name = f"Box{r:02}{c:02}"
+            else:
+                weight, name = 0, "UNUSED"
+            lines.append(f"[{r + 1:02},{c + 1:02}], {{{weight:05}}}, {name}")
+
+    return lines
+
+
+def manifest_lines(cells, rows=8, columns=12):
+    """Manifest lines for an empty ship holding {(row, column): (weight, name)}."""
+    lines = []
+    for r in range(rows):
+        for c in range(columns):
+            weight, name = cells.get((r, c), (0, "UNUSED"))
+            lines.append(f"[{r + 1:02},{c + 1:02}], {{{weight:05}}}, {name}")
+    return lines
+
+
+def synthetic_ship(seed, count):
+    """The ship of synthetic_manifest(seed, count), as (ship_grid, containers)."""
+    ship_grid, containers = create_ship_grid(8, 12), []
+    update_ship_grid(synthetic_manifest(seed, count), ship_grid, containers)
+    return ship_grid, containers
+
+
+def load_ship(ship):
+    """
+    Loads a test ship: a bundled manifest by name, or a (seed, containers) synthetic ship.
+
+    Returns:
+        tuple: (ship_grid, containers) as produced by update_ship_grid.
+    """
+    return load_manifest(ship) if isinstance(ship, str) else synthetic_ship(*ship)
+
+
+def ships(*counts, seeds=range(3)):
+    """The bundled manifests plus a synthetic ship per seed and container count, to parametrize over."""
+    return MANIFESTS + [(seed, count) for count in counts for seed in seeds]
+
+
+def random_walk(state, count, seed=0):
+    """Moves count random top containers onto other columns, yielding the state after each move."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        sources = [c for c in range(state.columns) if state.top(c) >= 0]
+        src = rng.choice(sources)
+        targets = [c for c in range(state.columns) if c != src and state.lowest_free(c) >= 0]
+        dst = rng.choice(targets)
+        state.move((state.top(src), src), (state.lowest_free(dst), dst))
+        yield state
+
+
+def names_on(ship_grid):
+    """Counter of the container names on a grid."""
+    return Counter(slot.container.name for row in ship_grid for slot in row if slot.hasContainer)
+
+
+def pick_targets(ship_grid, count, seed=0):
+    """A reproducible sample of count container names on the grid, duplicates included."""
+    names = sorted(names_on(ship_grid).elements())
+    return random.Random(seed).sample(names, min(count, len(names)))
+
+
+def assert_supported(grids):
+    """Checks that no container on any of the grids floats over an empty cell."""
+    for grid in grids:
+        assert ShipState.from_grid(grid).floating() == []
+
+
+def assert_legal_balance(initial, ship_grid, steps, status):
+    """
+    Checks the result of a planner with balance()'s signature on a copy of initial.
+
+    Without a plan ship_grid is left as it was; with one, the plan replays legally
+    from initial onto the layout the planner left in ship_grid, which is balanced
+    when the status says so.
+    """
+    if status is None or steps is None:
+        assert grid_signature(ship_grid) == grid_signature(initial)
+        return
+    state = check_plan(initial, steps)
+    assert grid_signature(ship_grid) == grid_signature(state.to_grid())
+    assert state.floating() == []
+    if status is True:
+        assert calculate_balance(ship_grid)[2]
+
+
+@pytest.fixture(autouse=True)
+def no_plan_cache():
+    """Keeps the planners off the app's plan cache, so tests neither read nor write data/."""
+    with PLAN_CACHE.disabled():
+        yield
@@ -0,0 +1,42 @@
+import copy
+
+import pytest
+
+from conftest import load_ship, ships
+from tasks.balance_anytime import improve_plan, plan_balance
+from tasks.balance_search import check_plan
+from tasks.plan_cache import grid_signature
+from tasks.ship_balancer import calculate_balance
+
+
+def assert_legal_plan(ship_grid, plan):
+    state = check_plan(ship_grid, plan.steps)
+    if plan.ship_grids:
+        assert grid_signature(state.to_grid()) == grid_signature(plan.ship_grids[-1])
+    if plan.status is True:
+        assert calculate_balance(state.to_grid())[2]
+    if plan.lower_bound is not None:
+        assert plan.lower_bound <= plan.minutes
+
+
+@pytest.mark.parametrize("ship", ships(20, 40), ids=str)
+def test_plan_balance_is_legal(ship):
+    ship_grid, containers = load_ship(ship)
+    initial = copy.deepcopy(ship_grid)
+
+    plan = plan_balance(ship_grid, containers=containers)
+
+    assert plan.status is not None
+    assert grid_signature(ship_grid) == grid_signature(initial)
+    assert_legal_plan(ship_grid, plan)
+
+
+@pytest.mark.parametrize("ship", ["ShipCase4", (1, 20)], ids=str)
+def test_improvement_is_never_worse(ship):
+    ship_grid, containers = load_ship(ship)
+    plan = plan_balance(ship_grid, budget_ms=20, containers=containers)
+
+    improved = improve_plan(ship_grid, plan, budget_ms=500).result()
+
+    assert improved.minutes <= plan.minutes
+    assert_legal_plan(ship_grid, improved)
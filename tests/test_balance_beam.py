@@ -0,0 +1,36 @@
+import copy
+
+import pytest
+
+from conftest import assert_legal_balance, load_ship, ships
+from tasks.balance_beam import beam_balance, search_beam_plan
+from tasks.balance_search import read_columns, replay_moves
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.ship_balancer import calculate_balance
+
+
+@pytest.mark.parametrize("width", [1, None])
+@pytest.mark.parametrize("ship", ships(20, 40), ids=str)
+def test_beam_plans_are_legal(ship, width):
+    ship_grid, containers = load_ship(ship)
+    initial = copy.deepcopy(ship_grid)
+
+    steps, _, status = beam_balance(ship_grid, containers, width)
+
+    assert_legal_balance(initial, ship_grid, steps, status)
+
+
+@pytest.mark.parametrize("width", [4, 16])
+@pytest.mark.parametrize("ship", ["ShipCase2", "ShipCase4", (1, 20)], ids=str)
+def test_beam_plan_is_priced_and_balanced(ship, width):
+    ship_grid, _ = load_ship(ship)
+    rows = len(ship_grid)
+    floors, stacks, containers = read_columns(ship_grid)
+    weights = [container.weight for container in containers]
+
+    moves, minutes = search_beam_plan(rows, floors, stacks, weights, width)
+
+    assert moves is not None
+    assert DEFAULT_COST_MODEL.column_plan(rows, floors, stacks, moves).total == minutes
+    _, ship_grids = replay_moves(ship_grid, moves)
+    assert calculate_balance(ship_grids[-1])[2]
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from conftest import load_ship, random_walk, ships
+from tasks.balance_bounds import BalanceBounds
+from tasks.balance_oracle import BalanceOracle, side_capacities
+from tasks.balance_search import balance_lower_bound, read_columns, search_balance_plan
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.ship_balancer import ShipState, calculate_balance
+from tasks.sift_planner import plan_sift, sift_lower_bound, sift_targets
+
+SEARCH_SECONDS = 2
+
+
+@pytest.mark.parametrize("ship", ships(20, 40), ids=str)
+def test_bound_never_exceeds_the_optimal_plan(ship):
+    ship_grid, _ = load_ship(ship)
+    rows = len(ship_grid)
+    floors, stacks, containers = read_columns(ship_grid)
+    weights = [container.weight for container in containers]
+    oracle = BalanceOracle(weights, *side_capacities(ship_grid))
+    left_balance, right_balance, _ = calculate_balance(ship_grid)
+
+    _, minutes, status = search_balance_plan(rows, floors, stacks, weights, oracle=oracle,
+                                             deadline=time.perf_counter() + SEARCH_SECONDS)
+
+    bound = balance_lower_bound(stacks, weights, left_balance, right_balance, len(stacks) // 2, oracle,
+                                floors, rows, DEFAULT_COST_MODEL.park(rows))
+    if status is True:
+        assert bound <= minutes
+
+
+@pytest.mark.parametrize("ship", ships(20, 60), ids=str)
+def test_kept_tables_match_rebuilt_ones(ship):
+    state = ShipState.from_grid(load_ship(ship)[0])
+    bounds = state.bounds
+
+    for state in random_walk(state, 25, seed=5):
+        rebuilt = BalanceBounds.from_state(state)
+        assert bounds.deficit() == rebuilt.deficit()
+        assert bounds.moves_needed() == rebuilt.moves_needed()
+        assert bounds.minutes_needed() == rebuilt.minutes_needed()
+
+
+@pytest.mark.parametrize("ship", ships(20, 40), ids=str)
+def test_sift_bound_never_exceeds_the_sift_plan(ship):
+    ship_grid, _ = load_ship(ship)
+    floors, stacks, containers = read_columns(ship_grid)
+    weights = [container.weight for container in containers]
+
+    moves, cost = plan_sift(ship_grid)
+
+    if moves is not None:
+        goal = sift_targets(len(ship_grid), floors, weights)
+        assert sift_lower_bound(stacks, goal, weights) <= cost.total
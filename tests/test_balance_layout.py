@@ -0,0 +1,16 @@
+import copy
+
+import pytest
+
+from conftest import assert_legal_balance, load_ship, ships
+from tasks.balance_layout import layout_balance
+
+
+@pytest.mark.parametrize("ship", ships(20, 40), ids=str)
+def test_layout_plans_are_legal(ship):
+    ship_grid, containers = load_ship(ship)
+    initial = copy.deepcopy(ship_grid)
+
+    steps, _, status = layout_balance(ship_grid, containers)
+
+    assert_legal_balance(initial, ship_grid, steps, status)
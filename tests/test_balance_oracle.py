@@ -0,0 +1,76 @@
+import copy
+import itertools
+import random
+import time
+
+import pytest
+
+from conftest import load_ship, manifest_lines, ships
+from tasks.balance_oracle import BalanceOracle, side_capacities
+from tasks.balance_search import read_columns, search_balance_plan
+from tasks.plan_cache import grid_signature
+from tasks.ship_balancer import balance, create_ship_grid, update_ship_grid
+from tasks.sift_planner import sift_balance
+
+SEARCH_SECONDS = 2
+
+
+def brute_force_feasible(weights, left_capacity, right_capacity):
+    """True if some split within the slot capacities is balanced, by trying every subset."""
+    total = sum(weights)
+    for count in range(len(weights) + 1):
+        if count > left_capacity or len(weights) - count > right_capacity:
+            continue
+        for left in itertools.combinations(weights, count):
+            left_balance = sum(left)
+            if total == 0 or 0.9 < left_balance / max(total - left_balance, 1e-9) < 1.1:
+                return True
+    return False
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_oracle_matches_brute_force(seed):
+    rng = random.Random(seed)
+    weights = [rng.choice([rng.randint(1, 20), rng.randint(100, 9999)]) for _ in range(rng.randint(1, 8))]
+    left_capacity, right_capacity = rng.randint(0, 8), rng.randint(0, 8)
+
+    oracle = BalanceOracle(weights, left_capacity, right_capacity)
+
+    assert oracle.exact
+    assert oracle.feasible == brute_force_feasible(weights, left_capacity, right_capacity)
+    if oracle.feasible:
+        assert 0.9 < oracle.ratio(oracle.best_left) < 1.1 or oracle.total == 0
+        assert oracle.transfer_needed(oracle.best_left) == 0
+    else:
+        assert oracle.transfer_needed(0) == -1
+
+
+@pytest.mark.parametrize("ship", ships(20, 40), ids=str)
+def test_search_agrees_with_oracle(ship):
+    ship_grid, _ = load_ship(ship)
+    floors, stacks, containers = read_columns(ship_grid)
+    weights = [container.weight for container in containers]
+    oracle = BalanceOracle(weights, *side_capacities(ship_grid))
+
+    _, _, status = search_balance_plan(len(ship_grid), floors, stacks, weights, oracle=oracle,
+                                       deadline=time.perf_counter() + SEARCH_SECONDS)
+
+    if not oracle.feasible:
+        assert status is False
+    elif status is False:
+        # Only an inexact oracle may call an unbalanceable ship feasible
+        assert not oracle.exact
+
+
+def test_unbalanceable_ship_goes_to_sift():
+    ship_grid = create_ship_grid(8, 12)
+    update_ship_grid(manifest_lines({(0, 1): (9000, "Heavy"), (0, 2): (100, "Light")}), ship_grid, [])
+    initial = copy.deepcopy(ship_grid)
+    expected, _ = sift_balance(copy.deepcopy(ship_grid))
+
+    steps, _, status = balance(ship_grid, [[0, 1], [0, 2]])
+
+    assert status is False
+    assert [[move.as_tuple() for move in step] for step in steps] == \
+        [[move.as_tuple() for move in step] for step in expected]
+    assert steps and grid_signature(ship_grid) != grid_signature(initial)
@@ -0,0 +1,25 @@
+import copy
+
+import pytest
+
+from conftest import assert_legal_balance, load_ship
+from tasks.balance_portfolio import plan_minutes, portfolio_balance, run_variant
+
+VARIANTS = [("layout", None), ("greedy", None), ("greedy", 1), ("beam", None)]
+
+
+@pytest.mark.parametrize("ship", ["ShipCase2", "ShipCase4", "SilverQueen", (0, 20), (1, 40)], ids=str)
+def test_portfolio_keeps_the_cheapest_legal_plan(ship):
+    ship_grid, containers = load_ship(ship)
+    initial = copy.deepcopy(ship_grid)
+
+    steps, ship_grids, status = portfolio_balance(ship_grid, containers, VARIANTS, max_workers=2, timeout=None)
+
+    assert_legal_balance(initial, ship_grid, steps, status)
+    if status is not True:
+        return
+    minutes = plan_minutes(initial, steps, ship_grids, status)
+    for variant in VARIANTS:
+        _, *result, _ = run_variant(copy.deepcopy(initial), copy.deepcopy(containers), variant)
+        variant_minutes = plan_minutes(initial, *result)
+        assert variant_minutes is None or minutes <= variant_minutes
@@ -0,0 +1,70 @@
+import copy
+import time
+
+import pytest
+
+from conftest import MANIFESTS, assert_legal_balance, load_ship, manifest_lines, ships
+from tasks.balance_search import (astar_balance, check_plan, read_columns, replay_moves, search_balance_plan,
+                                  weight_classes)
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.ship_balancer import balance, calculate_balance, create_ship_grid, update_ship_grid
+
+# A* is cut short on the larger ships; it falls back to balance() then
+ASTAR_EXPANSIONS = 300
+SEARCH_SECONDS = 2
+
+
+@pytest.mark.parametrize("ship", ships(20, 40), ids=str)
+def test_astar_plans_are_legal(ship):
+    ship_grid, containers = load_ship(ship)
+    initial = copy.deepcopy(ship_grid)
+
+    steps, _, status = astar_balance(ship_grid, containers, ASTAR_EXPANSIONS)
+
+    assert_legal_balance(initial, ship_grid, steps, status)
+
+
+@pytest.mark.parametrize("ship", MANIFESTS)
+def test_astar_is_no_dearer_than_greedy(ship):
+    ship_grid, containers = load_ship(ship)
+    rows = len(ship_grid)
+    floors, stacks, grid_containers = read_columns(ship_grid)
+    weights = [container.weight for container in grid_containers]
+
+    moves, minutes, status = search_balance_plan(rows, floors, stacks, weights,
+                                                 deadline=time.perf_counter() + SEARCH_SECONDS)
+    greedy_grid = copy.deepcopy(ship_grid)
+    greedy_steps, greedy_grids, greedy_status = balance(greedy_grid, copy.deepcopy(containers))
+
+    if status is not True:
+        return
+    assert DEFAULT_COST_MODEL.column_plan(rows, floors, stacks, moves).total == minutes
+    steps, ship_grids = replay_moves(ship_grid, moves)
+    assert calculate_balance(ship_grids[-1] if moves else ship_grid)[2]
+    if greedy_status is True:
+        assert minutes <= DEFAULT_COST_MODEL.step_plan(ship_grid, greedy_steps, greedy_grids).total
+
+
+def test_weight_classes_share_labels():
+    stacks, weights = weight_classes([[0, 1], [2], [3]], [500, 120, 500, 9000])
+
+    assert stacks == [[1, 0], [1], [2]]
+    assert weights == [120, 500, 9000]
+
+
+def test_equal_weights_plan_replays_on_named_containers():
+    ship_grid = create_ship_grid(8, 12)
+    cells = {(0, c): (1000, f"Same{c}") for c in range(4)}
+    cells.update({(1, c): (1000, f"Top{c}") for c in range(2)})
+    cells.update({(0, c): (1000, f"Right{c}") for c in (7, 8)})
+    update_ship_grid(manifest_lines(cells), ship_grid, [])
+    rows = len(ship_grid)
+    floors, stacks, containers = read_columns(ship_grid)
+    weights = [container.weight for container in containers]
+
+    moves, minutes, status = search_balance_plan(rows, floors, stacks, weights)
+
+    assert status is True
+    steps, ship_grids = replay_moves(ship_grid, moves)
+    assert calculate_balance(check_plan(ship_grid, steps).to_grid())[2]
+    assert DEFAULT_COST_MODEL.column_plan(rows, floors, stacks, moves).total == minutes
@@ -0,0 +1,33 @@
+import copy
+
+import pytest
+
+from conftest import load_ship, random_walk, ships
+from tasks.balance_tracker import BalanceTracker
+from tasks.ship_balancer import ShipState, balance, calculate_balance
+
+
+@pytest.mark.parametrize("ship", ships(20, 60), ids=str)
+def test_tracker_follows_moves(ship):
+    ship_grid, _ = load_ship(ship)
+    state = ShipState.from_grid(ship_grid)
+
+    assert BalanceTracker.from_grid(ship_grid).totals() == calculate_balance(ship_grid)
+    for state in random_walk(state, 30):
+        assert state.balance() == calculate_balance(state.to_grid())
+    col = next(c for c in range(state.columns) if state.top(c) >= 0)
+    state.clear(state.top(col), col)
+    assert state.balance() == calculate_balance(state.to_grid())
+
+
+@pytest.mark.parametrize("ship", ["ShipCase2", "ShipCase4"])
+def test_tracker_follows_a_plan(ship):
+    ship_grid, containers = load_ship(ship)
+    tracker = BalanceTracker.from_grid(ship_grid)
+
+    steps, ship_grids, _ = balance(copy.deepcopy(ship_grid), containers)
+    for step, grid in zip(steps, ship_grids):
+        tracker.apply_step(step, grid)
+
+    assert steps
+    assert tracker.totals() == calculate_balance(ship_grids[-1])
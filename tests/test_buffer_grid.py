@@ -0,0 +1,52 @@
+from tasks.buffer_grid import BufferGrid
+
+
+def test_buffer_hands_containers_back_last_in_first_out():
+    buffer = BufferGrid(rows=2, columns=3)
+
+    slots = []
+    for item in range(6):
+        slots.append(buffer.free_slot())
+        assert buffer.store(item) is not None
+
+    # Filled from the door outwards, each column bottom up
+    assert slots == [(0, 2), (1, 2), (0, 1), (1, 1), (0, 0), (1, 0)]
+    assert buffer.store(6) is None
+    assert [buffer.take()[0] for _ in range(6)] == [5, 4, 3, 2, 1, 0]
+    assert buffer.take() is None and len(buffer) == 0
+
+
+def test_limit_caps_the_staged_containers():
+    buffer = BufferGrid(limit=2)
+    buffer.store("first")
+    buffer.store("second")
+
+    assert not buffer.has_room()
+    assert buffer.free_slot() is None and buffer.store_cost() is None
+    assert buffer.store("third") is None
+    assert len(buffer) == 2
+
+
+def test_travel_inside_the_buffer_is_priced():
+    buffer = BufferGrid(rows=2, columns=3)
+
+    costs = [buffer.store(item).total for item in range(4)]
+
+    # Next to the door, on top of the door column, then over the full door column
+    assert costs == [4, 2, 6, 4]
+    assert buffer.take_cost().total == 4
+    item, cost = buffer.take()
+    assert item == 3 and cost.transfer == 0
+
+
+def test_copy_is_independent():
+    buffer = BufferGrid(limit=3)
+    buffer.store("kept")
+
+    copied = buffer.copy()
+    copied.store("added")
+    copied.take()
+    copied.take()
+
+    assert len(buffer) == 1 and len(copied) == 0
+    assert buffer.take()[0] == "kept"
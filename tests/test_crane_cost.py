@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from conftest import load_ship, ships
+from tasks.balance_search import read_columns, replay_moves
+from tasks.crane_cost import CostBreakdown, CraneCostModel, CraneRun, crane_clearance, crane_path, move_minutes
+
+
+def random_moves(rows, floors, stacks, count, seed=0):
+    """count legal (src, dst) column moves from the given stacks."""
+    rng = random.Random(seed)
+    heights = [floors[c] + len(stacks[c]) for c in range(len(stacks))]
+    counts = [len(stack) for stack in stacks]
+    moves = []
+    while len(moves) < count:
+        src = rng.choice([c for c in range(len(heights)) if counts[c]])
+        dst = rng.choice([c for c in range(len(heights)) if c != src])
+        if crane_clearance(heights, src, dst, rows) == -1:
+            continue
+        moves.append((src, dst))
+        heights[src] -= 1
+        counts[src] -= 1
+        heights[dst] += 1
+        counts[dst] += 1
+    return moves
+
+
+def test_clearance_rises_over_the_stacks_between():
+    heights = [2, 5, 1, 3]
+
+    assert crane_clearance(heights, 0, 2, 6) == 5
+    assert crane_clearance(heights, 2, 3, 6) == 3
+    assert crane_clearance(heights, 0, 2, 5) == -1
+    assert crane_clearance([6, 0], 1, 0, 6) == -1
+    # Up from row 1 to row 5, across two columns, down to row 1
+    assert move_minutes(heights, 0, 2, 6) == 4 + 2 + 4
+    assert len(crane_path(heights, 0, 2, 6)) == move_minutes(heights, 0, 2, 6) + 1
+
+
+@pytest.mark.parametrize("ship", ships(20, 60), ids=str)
+def test_column_plan_prices_the_replayed_steps(ship):
+    ship_grid, _ = load_ship(ship)
+    rows = len(ship_grid)
+    floors, stacks, _ = read_columns(ship_grid)
+    moves = random_moves(rows, floors, stacks, 15)
+    model = CraneCostModel(loaded_minutes=2, empty_minutes=1)
+
+    steps, ship_grids = replay_moves(ship_grid, moves)
+
+    assert model.column_plan(rows, floors, stacks, moves).as_dict() == \
+        model.step_plan(ship_grid, steps, ship_grids).as_dict()
+
+
+def test_crane_run_charges_buffer_transfers():
+    model = CraneCostModel(buffer_transfer_minutes=4)
+    run = CraneRun(4, model)
+    heights = [1, 0, 0]
+
+    to_buffer = run.to_buffer(heights, (0, 0), CostBreakdown(2, 1))
+    copied = run.copy()
+    back = run.from_buffer([0, 0, 0], (0, 2))
+
+    # Down from the park position one row above the top-left slot and back up,
+    # the travel inside the buffer and the hand-over
+    assert to_buffer == 4 + 4 + 3 + 4
+    assert back == 4 + (2 + 4)
+    assert run.cost.transfer == 8 and run.position == (0, 2)
+    assert copied.cost.total == to_buffer and copied.position == model.park(4)
@@ -0,0 +1,38 @@
+import pickle
+
+from tasks.move_plan import BUFFER, Move, Plan
+
+
+def test_move_cells_and_label():
+    move = Move.between((0, 3), (1, 3), "Box", cost=2, kind=BUFFER)
+
+    assert move.start == (0, 3) and move.end == (1, 3)
+    assert move.label() == "[1,4] to [2,4]"
+    assert str(move) == "[0, 3] to [1, 3]"
+    assert not move.stalled
+    assert Move(0, 3, -1, -1).stalled
+
+
+def test_move_round_trips():
+    move = Move(0, 3, 1, 3, "Box", 2, BUFFER)
+
+    assert pickle.loads(pickle.dumps(move)) == move
+    assert Move(*move.as_tuple()) == move
+    assert hash(Move(*move.as_tuple())) == hash(move)
+    assert move != Move(0, 3, 1, 3, "Box", 2)
+
+
+def test_plan_from_paths():
+    plan = Plan.from_paths([[(0, 0), (1, 0), (1, 1)], [(0, 5), (0, 4)]], ["A", "B"])
+
+    assert [len(step) for step in plan] == [2, 1]
+    assert plan.endpoints(0) == ((0, 0), (1, 1))
+    assert [move.container for move in plan.moves()] == ["A", "A", "B"]
+    assert not plan.stalled
+    assert Plan.from_tuples(plan.as_tuples()) == plan
+
+
+def test_stalled_plan():
+    plan = Plan([[Move(0, 0, 1, 0)], [Move(1, 0, -1, -1)]])
+
+    assert plan.stalled
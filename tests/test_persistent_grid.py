@@ -0,0 +1,34 @@
+from conftest import load_manifest
+from tasks.persistent_grid import PersistentGrid
+from tasks.plan_cache import grid_signature
+from tasks.ship_balancer import Slot
+
+
+def test_persistent_grid_copy_on_write():
+    ship_grid, _ = load_manifest("ShipCase2")
+    grid = PersistentGrid.from_grid(ship_grid)
+    copied = grid.copy()
+    assert copied.rows is grid.rows
+
+    slot = Slot(None, False, True)
+    copied[2][3] = slot
+
+    assert copied[2][3] is slot
+    assert grid[2][3] is ship_grid[2][3]
+    assert copied.rows[0] is grid.rows[0]
+    assert grid_signature(grid) == grid_signature(ship_grid)
+    assert grid_signature(grid.to_lists()) == grid_signature(ship_grid)
+
+
+def test_persistent_grid_with_cells():
+    ship_grid, _ = load_manifest("ShipCase2")
+    grid = PersistentGrid.from_grid(ship_grid)
+    columns = len(ship_grid[0])
+    slot = Slot(None, False, True)
+
+    changed = grid.with_cells([(1 * columns + 4, slot)])
+
+    assert changed[1][4] is slot
+    assert grid[1][4] is ship_grid[1][4]
+    assert all(changed.rows[r] is grid.rows[r] for r in range(len(grid)) if r != 1)
+    assert grid.with_cells([]).rows is grid.rows
@@ -0,0 +1,145 @@
+import copy
+import sqlite3
+import zlib
+
+import pytest
+
+from conftest import load_manifest
+from tasks.plan_cache import PlanCache, decode_plan, encode_plan, grid_signature, plan_key
+from tasks.ship_balancer import balance
+from tasks.ship_loader import plan_unload
+from tasks.transfer_planner import plan_transfer
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "plan_cache.sqlite")
+
+
+@pytest.fixture
+def balanced():
+    ship_grid, containers = load_manifest("ShipCase2")
+    initial = copy.deepcopy(ship_grid)
+    result = balance(ship_grid, containers)
+    return initial, containers, result
+
+
+def plan_signature(result):
+    steps, ship_grids, status = result
+    return [[move.as_tuple() for move in step] for step in steps], [grid_signature(g) for g in ship_grids], status
+
+
+def test_encode_round_trip(balanced):
+    ship_grid, containers, result = balanced
+    name = ship_grid[containers[0][0]][containers[0][1]].container.name
+    unload = plan_unload(ship_grid, [name])
+    transfer = plan_transfer(ship_grid, [name], ["Fresh"], {"Fresh": 1200})
+
+    assert plan_signature(decode_plan(encode_plan(result))) == plan_signature(result)
+
+    grid, messages, cost, steps = decode_plan(encode_plan(unload))
+    assert grid_signature(grid) == grid_signature(unload[0])
+    assert (messages, cost) == (unload[1], unload[2])
+    assert [step["name"] for step in steps] == [step["name"] for step in unload[3]]
+    assert [grid_signature(step["grid"]) for step in steps] == [grid_signature(step["grid"]) for step in unload[3]]
+    assert all(step.history is steps[0].history for step in steps)
+
+    decoded = decode_plan(encode_plan(transfer))
+    assert (decoded.seconds, decoded.complete, decoded.messages) == (transfer.seconds, transfer.complete,
+                                                                     transfer.messages)
+    assert decoded.cost.as_dict() == transfer.cost.as_dict()
+
+
+def test_encode_rejects_other_objects():
+    with pytest.raises(TypeError):
+        encode_plan([object()])
+
+
+def test_hits_and_misses(path, balanced):
+    ship_grid, containers, result = balanced
+    key = plan_key("balance", ship_grid, containers)
+    cache = PlanCache(path, version="v1")
+
+    assert cache.get("balance", key) is None
+    cache.put("balance", key, result)
+    first, second = cache.get("balance", key), cache.get("balance", key)
+
+    assert plan_signature(first) == plan_signature(result)
+    assert first is not second and first[0] is not second[0]
+    assert cache.stats()["balance"] == (2, 2, 1, 2 / 3)
+
+    reopened = PlanCache(path, version="v1")
+    assert plan_signature(reopened.get("balance", key)) == plan_signature(result)
+    assert reopened.stats()["balance"] == (1, 0, 0, 1.0)
+
+
+def test_keys_follow_the_request(balanced):
+    ship_grid, containers, _ = balanced
+    key = plan_key("balance", ship_grid, containers)
+
+    assert plan_key("balance", copy.deepcopy(ship_grid), containers) == key
+    assert plan_key("unload", ship_grid, containers) != key
+    assert plan_key("balance", ship_grid, containers[1:]) != key
+    moved = copy.deepcopy(ship_grid)
+    moved[containers[0][0]][containers[0][1]].container.weight += 1
+    assert plan_key("balance", moved, containers) != key
+
+
+def test_new_version_invalidates(path, balanced):
+    ship_grid, containers, result = balanced
+    key = plan_key("balance", ship_grid, containers)
+    PlanCache(path, version="v1").put("balance", key, result)
+
+    assert PlanCache(path, version="v2").get("balance", key) is None
+    assert PlanCache(path, version="v1").get("balance", key) is None
+
+
+def test_clear_and_disabled(path, balanced):
+    ship_grid, containers, result = balanced
+    key = plan_key("balance", ship_grid, containers)
+    cache = PlanCache(path, version="v1")
+    cache.put("balance", key, result)
+
+    with cache.disabled():
+        assert cache.get("balance", key) is None
+        cache.put("balance", "other", result)
+    assert cache.get("balance", "other") is None
+
+    cache.clear()
+    assert cache.get("balance", key) is None
+    assert PlanCache(path, version="v1").get("balance", key) is None
+
+
+def test_evicts_least_recently_used(path, balanced):
+    _, _, result = balanced
+    size = len(encode_plan(result))
+    cache = PlanCache(path, entries=2, max_bytes=3 * size, version="v1")
+    cache.put("balance", "a", result)
+    cache.put("balance", "b", result)
+    # A read from disk counts as a use there
+    assert PlanCache(path, version="v1").get("balance", "a") is not None
+    cache.put("balance", "c", result)
+    cache.put("balance", "d", result)
+
+    assert list(cache.memory) == ["c", "d"]
+    reopened = PlanCache(path, version="v1")
+    assert [key for key in "abcd" if reopened.get("balance", key) is not None] == ["a", "c", "d"]
+
+
+@pytest.mark.parametrize("blob", [
+    zlib.compress(b'{"objects":[["os.system",{},null]],"plan":{"ref":0}}'),
+    zlib.compress(b"\x80\x04K\x01."),
+    b"not a plan",
+])
+def test_tampered_rows_are_dropped(path, balanced, blob):
+    ship_grid, containers, result = balanced
+    key = plan_key("balance", ship_grid, containers)
+    PlanCache(path, version="v1").put("balance", key, result)
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE plans SET plan = ?", (blob,))
+
+    cache = PlanCache(path, version="v1")
+    assert cache.get("balance", key) is None
+    assert cache.misses == {"balance": 1}
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM plans").fetchone() == (0,)
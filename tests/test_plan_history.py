@@ -0,0 +1,60 @@
+import pytest
+
+from conftest import load_manifest, random_walk
+from tasks.plan_cache import grid_signature
+from tasks.plan_history import HistoryStep, PlanHistory
+from tasks.ship_balancer import ShipState, Slot
+
+
+@pytest.mark.parametrize("interval", [1, 3, 16])
+def test_history_matches_replay(interval):
+    ship_grid, _ = load_manifest("ShipCase4")
+    state = ShipState.from_grid(ship_grid)
+    history = PlanHistory.from_state(state, interval)
+    snapshots = []
+    for state in random_walk(state, 40):
+        history.record(state)
+        snapshots.append(grid_signature(state.to_grid()))
+
+    assert len(history) == len(snapshots)
+    assert grid_signature(history.initial_grid()) == grid_signature(ship_grid)
+    assert [grid_signature(history[i]) for i in range(len(history))] == snapshots
+    assert [grid_signature(grid) for grid in history] == snapshots
+    assert grid_signature(history[-1]) == snapshots[-1]
+    assert [grid_signature(grid) for grid in history[5:25:4]] == snapshots[5:25:4]
+    with pytest.raises(IndexError):
+        history[len(history)]
+
+
+def test_history_grids_are_independent():
+    ship_grid, _ = load_manifest("ShipCase4")
+    state = ShipState.from_grid(ship_grid)
+    history = PlanHistory.from_state(state, 4)
+    for state in random_walk(state, 10):
+        history.record(state)
+    expected = grid_signature(history[6])
+
+    grid = history[6]
+    grid[0][0] = Slot(None, False, False)
+    grid[1][:] = [Slot(None, False, False)] * len(grid[1])
+
+    assert grid_signature(history[6]) == expected
+    assert grid_signature(history.initial_grid()) == grid_signature(ship_grid)
+
+
+def test_history_step_rebuilds_grid():
+    ship_grid, _ = load_manifest("ShipCase4")
+    state = ShipState.from_grid(ship_grid)
+    history = PlanHistory.from_state(state)
+    steps = []
+    for state in random_walk(state, 3):
+        steps.append(history.step(state, "Move", ["moved"], 2))
+
+    step = steps[1]
+    assert isinstance(step, HistoryStep)
+    assert step["name"] == "Move" and step["messages"] == ["moved"] and step["cost"] == 2
+    assert grid_signature(step["grid"]) == grid_signature(history[1])
+    assert grid_signature(step.get("grid")) == grid_signature(history[1])
+    assert "grid" not in step
+    with pytest.raises(KeyError):
+        step["missing"]
@@ -0,0 +1,76 @@
+import copy
+
+import pytest
+
+from conftest import load_ship, ships, synthetic_ship
+from tasks import ship_loader
+from tasks.balance_search import check_plan
+from tasks.crane_cost import DEFAULT_COST_MODEL
+from tasks.move_plan import BUFFER, UNLOAD
+from tasks.plan_cache import grid_signature
+from tasks.plan_optimizer import optimize_legs, optimize_moves, optimize_plan
+from tasks.ship_balancer import balance
+from tasks.ship_loader import plan_unload
+
+
+def test_container_moved_twice_goes_there_in_one_move():
+    optimized, before, after = optimize_moves(4, [0, 0, 0], [[0], [], [1]], [(0, 1), (1, 2)])
+
+    assert optimized == [(0, 2)]
+    assert after.total <= before.total
+
+
+def test_oscillation_is_dropped():
+    optimized, _, after = optimize_moves(4, [0, 0, 0], [[0], [1], []], [(0, 2), (1, 2), (2, 1), (2, 0)])
+
+    assert optimized == []
+    assert after.total == 0
+
+
+@pytest.mark.parametrize("ship", ships(20, 40), ids=str)
+def test_optimized_balance_plan_ends_the_same(ship):
+    ship_grid, containers = load_ship(ship)
+    initial = copy.deepcopy(ship_grid)
+    steps, ship_grids, status = balance(ship_grid, containers)
+    if not steps:
+        return
+
+    new_steps, new_grids, saved = optimize_plan(initial, steps, ship_grids)
+
+    assert saved >= 0
+    assert grid_signature(check_plan(initial, new_steps).to_grid()) == grid_signature(ship_grid)
+    assert DEFAULT_COST_MODEL.step_plan(initial, new_steps, new_grids).total == \
+        DEFAULT_COST_MODEL.step_plan(initial, steps, ship_grids).total - saved
+
+
+def test_staged_blocker_goes_straight_to_its_column():
+    # The blocker on container 0 is staged and brought back to column 2, which the unload never touches
+    legs = [(0, BUFFER), (0, UNLOAD), (BUFFER, 2)]
+
+    optimized, before, after = optimize_legs(4, [0, 0, 0], [[0, 1], [2], []], legs)
+
+    assert optimized == [(0, 2), (0, UNLOAD)]
+    assert after.total < before.total
+    assert after.transfer == 0
+
+
+def test_illegal_legs_are_left_alone():
+    legs = [(2, UNLOAD)]
+
+    assert optimize_legs(4, [0, 0, 0], [[0], [1], []], legs) == (legs, None, None)
+
+
+def test_optimized_unload_keeps_the_final_grid(monkeypatch):
+    ship_grid, _ = synthetic_ship(5, 90)
+    targets = ["Box0107", "Box0603", "Box0009", "Box0210", "Box0105"]
+
+    grid, messages, cost, steps = plan_unload(ship_grid, targets, width=1)
+    monkeypatch.setattr(ship_loader, "optimize_unload", lambda *args: None)
+    plain_grid, _, plain_cost, _ = plan_unload(ship_grid, targets, width=1)
+
+    assert cost < plain_cost
+    assert grid_signature(grid) == grid_signature(plain_grid)
+    assert grid_signature(steps[-1]["grid"]) == grid_signature(grid)
+    assert f"Total unloading cost: {cost} seconds" in messages
+    # Blocker steps are priced again in the step of their unload
+    assert sum(step["cost"] for step in steps if not step["name"].startswith("Move Blocking")) == cost
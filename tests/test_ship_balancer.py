@@ -0,0 +1,85 @@
+import copy
+
+import pytest
+
+from conftest import assert_legal_balance, load_ship, ships
+from tasks.plan_cache import grid_signature
+from tasks.ship_balancer import (Container, ShipState, Slot, TranspositionTable, balance, crane_distances,
+                                 nearest_available)
+
+
+def plan_signature(steps, ship_grids):
+    return [[move.as_tuple() for move in step] for step in steps], [grid_signature(grid) for grid in ship_grids]
+
+
+def test_table_counts_hits_and_misses():
+    table = TranspositionTable()
+
+    assert table.get("nearest_available", (1, (0, 0))) is None
+    table.put("nearest_available", (1, (0, 0)), (2, 3))
+
+    assert table.get("nearest_available", (1, (0, 0))) == (2, 3)
+    assert table.stats() == {"nearest_available": (1, 1, 0.5)}
+
+
+@pytest.mark.parametrize("ship", ["ShipCase4", (0, 10), (2, 30)], ids=str)
+def test_shared_table_gives_the_same_plan(ship):
+    ship_grid, containers = load_ship(ship)
+    table = TranspositionTable()
+
+    fresh = balance(copy.deepcopy(ship_grid), copy.deepcopy(containers))
+    first = balance(copy.deepcopy(ship_grid), copy.deepcopy(containers), table=table)
+    lookups = sum(table.hits.values()) + sum(table.misses.values())
+    second = balance(copy.deepcopy(ship_grid), copy.deepcopy(containers), table=table)
+
+    assert plan_signature(*first[:2]) == plan_signature(*fresh[:2])
+    assert plan_signature(*second[:2]) == plan_signature(*fresh[:2])
+    assert first[2] == second[2] == fresh[2]
+    # The second run asks exactly what the first did, so every lookup hits
+    assert sum(table.hits.values()) >= lookups
+
+
+def test_visit_keys_are_unique():
+    state = ShipState.from_grid(load_ship("ShipCase1")[0])
+
+    keys = {state.visit_key(container, (r, c)) for container in range(5)
+            for r in range(state.rows) for c in range(state.columns)}
+
+    assert len(keys) == 5 * state.rows * state.columns
+
+
+def small_state():
+    """3 x 3 hold: the container at (0, 0) has one on top of it and one beside it."""
+    state = ShipState.from_grid([[Slot(None, False, True) for _ in range(3)] for _ in range(3)])
+    for r, c in ((0, 0), (1, 0), (0, 1)):
+        state.place(r, c, Container(name=f"Box{r}{c}", weight=100))
+    return state
+
+
+def test_crane_distances_clear_the_stack_first():
+    field = crane_distances([0, 0], small_state())
+
+    assert field == [
+        [1, -1, 5],
+        [2, 3, 4],
+        [3, 4, 5],
+    ]
+
+
+def test_nearest_available_ranks_by_crane_distance():
+    state = small_state()
+
+    assert nearest_available([0, 0], state) == [1, 1]
+    assert state.table.stats()["nearest_available"][:2] == (0, 1)
+    assert nearest_available([0, 0], state) == [1, 1]
+    assert state.table.stats()["nearest_available"][:2] == (1, 1)
+
+
+@pytest.mark.parametrize("ship", ships(20, 40) + [(0, 10), (6, 50)], ids=str)
+def test_greedy_plans_are_legal(ship):
+    ship_grid, containers = load_ship(ship)
+    initial = copy.deepcopy(ship_grid)
+
+    steps, _, status = balance(ship_grid, containers)
+
+    assert_legal_balance(initial, ship_grid, steps, status)
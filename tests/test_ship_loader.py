@@ -0,0 +1,100 @@
+from collections import Counter
+
+import pytest
+
+from conftest import assert_supported, load_ship, manifest_lines, names_on, pick_targets, ships
+from tasks.plan_cache import grid_signature
+from tasks.ship_balancer import ShipState, create_ship_grid, update_ship_grid
+from tasks.ship_loader import estimate_unload_cost, plan_load, plan_unload, select_unload_targets
+
+
+@pytest.mark.parametrize("count", [1, 3, 5])
+@pytest.mark.parametrize("ship", ships(20, 40, 60), ids=str)
+def test_unload_removes_every_target(ship, count):
+    ship_grid, _ = load_ship(ship)
+    before = grid_signature(ship_grid)
+    targets = pick_targets(ship_grid, count)
+
+    grid, messages, cost, steps = plan_unload(ship_grid, targets)
+
+    assert grid_signature(ship_grid) == before
+    assert not [message for message in messages if message.startswith("Error")]
+    assert names_on(grid) == names_on(ship_grid) - Counter(targets)
+    assert grid_signature(steps[-1]["grid"]) == grid_signature(grid)
+    assert_supported([grid] + [step["grid"] for step in steps])
+
+
+@pytest.mark.parametrize("ship", ships(40, 60), ids=str)
+def test_searched_unload_is_no_slower_than_fixed_order(ship):
+    ship_grid, _ = load_ship(ship)
+    targets = pick_targets(ship_grid, 4, seed=2)
+
+    fixed_grid, _, fixed_cost, _ = plan_unload(ship_grid, targets, width=0)
+    grid, _, cost, _ = plan_unload(ship_grid, targets)
+
+    assert names_on(grid) == names_on(fixed_grid)
+    assert cost <= fixed_cost
+
+
+def duplicates_ship():
+    """A ship with a stacked pair of 'Dup' containers in column 4 and a third on the floor of column 6."""
+    ship_grid = create_ship_grid(8, 12)
+    cells = {(0, 4): (100, "Dup"), (1, 4): (100, "Dup"), (0, 6): (100, "Dup"), (0, 1): (100, "Other")}
+    update_ship_grid(manifest_lines(cells), ship_grid, [])
+    return ship_grid
+
+
+def test_duplicates_are_picked_jointly():
+    state = ShipState.from_grid(duplicates_ship())
+    origin = (state.rows - 1, 0)
+
+    # Alone, the bottom of the pair costs more than the single one, as its blocker has to move
+    assert estimate_unload_cost(state, (0, 4), origin) > estimate_unload_cost(state, (0, 6), origin)
+    assert select_unload_targets(state, ["Dup", "Dup"], origin) == [("Dup", (1, 4)), ("Dup", (0, 4))]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5])
+def test_name_listed_n_times_unloads_n(count):
+    ship_grid = duplicates_ship()
+
+    grid, messages, cost, steps = plan_unload(ship_grid, ["Dup"] * count)
+
+    assert names_on(grid)["Dup"] == 3 - min(count, 3)
+    assert names_on(grid)["Other"] == 1
+    assert_supported([grid] + [step["grid"] for step in steps])
+
+
+@pytest.mark.parametrize("ship", ships(20, 40, 60), ids=str)
+def test_load_places_every_container(ship):
+    ship_grid, _ = load_ship(ship)
+    loads = ["Fresh1", "Fresh2", "Fresh3"]
+    weights = {"Fresh1": 500, "Fresh2": 4000, "Fresh3": 9000}
+
+    grid, messages, cost, steps = plan_load(ship_grid, loads, weights)
+
+    assert not [message for message in messages if message.startswith("Error")]
+    assert names_on(grid) == names_on(ship_grid) + Counter(loads)
+    assert_supported([grid] + [step["grid"] for step in steps])
+
+
+@pytest.mark.parametrize("balance_aware", [True, False])
+def test_balance_aware_load_ends_balanced(balance_aware):
+    ship_grid = create_ship_grid(8, 12)
+    update_ship_grid(manifest_lines({}), ship_grid, [])
+
+    grid, messages, cost, steps = plan_load(ship_grid, ["A", "B"], {"A": 5000, "B": 5000},
+                                            balance_aware=balance_aware)
+
+    # The old loader stacks both on the leftmost column
+    assert ShipState.from_grid(grid).balance()[2] == balance_aware
+
+
+def test_load_does_not_bury_pending_unloads():
+    ship_grid = create_ship_grid(8, 12)
+    update_ship_grid(manifest_lines({(0, 0): (100, "Target"), (0, 1): (100, "Other")}), ship_grid, [])
+
+    grid, _, _, _ = plan_load(ship_grid, ["Fresh"], {"Fresh": 100}, unload_names=["Target"])
+    buried, _, _, _ = plan_load(ship_grid, ["Fresh"], {"Fresh": 100})
+
+    assert ShipState.from_grid(grid).container_at(1, 0) is None
+    assert ShipState.from_grid(buried).container_at(1, 0).name == "Fresh"
@@ -0,0 +1,87 @@
+import copy
+
+import pytest
+
+from conftest import load_ship, random_walk, ships
+from tasks.plan_cache import grid_signature
+from tasks.ship_balancer import Container, ShipState, create_ship_grid
+
+
+@pytest.mark.parametrize("ship", ships(40, 90), ids=str)
+def test_grid_round_trip(ship):
+    ship_grid, _ = load_ship(ship)
+
+    state = ShipState.from_grid(ship_grid)
+
+    assert grid_signature(state.to_grid()) == grid_signature(ship_grid)
+    written = copy.deepcopy(ship_grid)
+    state.write_to(written)
+    assert grid_signature(written) == grid_signature(ship_grid)
+
+
+def test_copy_is_independent():
+    ship_grid, _ = load_ship("ShipCase4")
+    state = ShipState.from_grid(ship_grid)
+    col = next(c for c in range(state.columns) if state.top(c) >= 0)
+    dst = next(c for c in range(state.columns) if c != col and state.lowest_free(c) >= 0)
+
+    moved = state.copy()
+    moved.move((moved.top(col), col), (moved.lowest_free(dst), dst))
+
+    assert grid_signature(state.to_grid()) == grid_signature(ship_grid)
+    assert grid_signature(moved.to_grid()) != grid_signature(ship_grid)
+
+
+def test_copy_keeps_its_own_containers():
+    state = ShipState.from_grid(create_ship_grid(4, 4))
+    state.place(0, 0, Container(name="Kept", weight=100))
+
+    copied = state.copy()
+    copied.place(0, 1, Container(name="Added", weight=200))
+
+    assert [container.name for container in state.containers] == ["Kept"]
+    assert state.container_at(0, 1) is None
+    assert copied.container_at(0, 0) is state.container_at(0, 0)
+    assert copied.container_at(0, 1).name == "Added"
+
+
+def rescanned_index(state):
+    """heights, counts and floors of every column, by scanning the cells."""
+    heights, counts, floors = [], [], []
+    for c in range(state.columns):
+        blocked = [r for r in range(state.rows) if not state.available[r, c]]
+        heights.append(max(blocked) + 1 if blocked else 0)
+        counts.append(int(state.occupied[:, c].sum()))
+        floor = 0
+        while floor < state.rows and not state.available[floor, c] and not state.occupied[floor, c]:
+            floor += 1
+        floors.append(floor)
+    return heights, counts, floors
+
+
+@pytest.mark.parametrize("ship", ships(20, 60), ids=str)
+def test_column_index_follows_moves(ship):
+    state = ShipState.from_grid(load_ship(ship)[0])
+
+    for state in random_walk(state, 30, seed=3):
+        heights, counts, floors = rescanned_index(state)
+        assert state.heights.tolist() == heights
+        assert state.counts.tolist() == counts
+        assert state.floors.tolist() == floors
+        for c in range(state.columns):
+            assert state.capacity(c) == state.rows - heights[c]
+            assert state.lowest_free(c) == (heights[c] if heights[c] < state.rows else -1)
+            assert state.top(c) == (heights[c] - 1 if counts[c] and state.occupied[heights[c] - 1, c] else -1)
+        free = [(heights[c], c) for c in range(state.columns) if heights[c] < state.rows]
+        assert state.first_free() == (free[0] if free else (-1, -1))
+        assert state.floating() == []
+
+
+def test_floating_finds_unsupported_containers():
+    state = ShipState.from_grid(load_ship("ShipCase4")[0])
+    col = next(c for c in range(state.columns) if state.top(c) > state.floors[c])
+    row = state.top(col)
+
+    state.clear(row - 1, col)
+
+    assert state.floating() == [(row, col)]
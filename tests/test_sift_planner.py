@@ -0,0 +1,62 @@
+import copy
+
+import pytest
+
+from conftest import load_ship, ships, synthetic_ship
+from tasks import sift_planner
+from tasks.balance_search import check_plan, read_columns
+from tasks.move_plan import Move
+from tasks.plan_cache import grid_signature
+from tasks.ship_balancer import ShipState
+from tasks.sift_planner import sift_balance, sift_column_order, sift_fallback, sift_targets
+
+
+def test_sift_column_order():
+    assert sift_column_order(12) == [5, 6, 4, 7, 3, 8, 2, 9, 1, 10, 0, 11]
+
+
+@pytest.mark.parametrize("ship", ships(20, 40, 60), ids=str)
+def test_sift_plans_are_legal(ship):
+    ship_grid, _ = load_ship(ship)
+    initial = copy.deepcopy(ship_grid)
+
+    steps, _ = sift_balance(ship_grid)
+
+    if steps is None:
+        assert grid_signature(ship_grid) == grid_signature(initial)
+        return
+    state = check_plan(initial, steps)
+    assert grid_signature(ship_grid) == grid_signature(state.to_grid())
+    floors, stacks, containers = read_columns(ship_grid)
+    weights = [container.weight for container in containers]
+    goal = sift_targets(len(ship_grid), floors, weights)
+    assert [[weights[i] for i in stack] for stack in stacks] == goal
+
+
+def test_fallback_without_a_plan_leaves_the_grid(monkeypatch):
+    ship_grid, _ = load_ship("ShipCase4")
+    initial = copy.deepcopy(ship_grid)
+    monkeypatch.setattr(sift_planner, "plan_sift", lambda *args: (None, None))
+
+    assert sift_fallback(ship_grid) == ([], [], None)
+    assert grid_signature(ship_grid) == grid_signature(initial)
+
+
+def test_check_plan_rejects_illegal_moves():
+    ship_grid, _ = synthetic_ship(0, 40)
+    state = ShipState.from_grid(ship_grid)
+    col = next(c for c in range(state.columns)
+               if state.heights[c] - state.floors[c] >= 2 and state.heights[c] < state.rows)
+    row = state.top(col)
+    name = state.container_at(row, col).name
+
+    with pytest.raises(ValueError, match="top container"):
+        check_plan(ship_grid, [[Move(row - 1, col, row - 1, col + 1, name)]])
+    with pytest.raises(ValueError, match="no destination"):
+        check_plan(ship_grid, [[Move(row, col, -1, -1, name)]])
+    with pytest.raises(ValueError, match="more than one cell"):
+        check_plan(ship_grid, [[Move(row, col, row + 2, col, name)]])
+    with pytest.raises(ValueError, match="not free"):
+        check_plan(ship_grid, [[Move(row, col, row - 1, col, name)]])
+    with pytest.raises(ValueError, match="top of a column"):
+        check_plan(ship_grid, [[Move(row, col, row + 1, col, name)]])
@@ -0,0 +1,32 @@
+from collections import Counter
+
+import pytest
+
+from conftest import assert_supported, load_ship, names_on, pick_targets, ships
+from tasks.transfer_planner import plan_transfer
+
+
+@pytest.mark.parametrize("ship", ships(20, 40, 60), ids=str)
+def test_transfer_ends_with_targets_gone_and_loads_aboard(ship):
+    ship_grid, _ = load_ship(ship)
+    targets = pick_targets(ship_grid, 3, seed=1)
+    loads = ["Fresh1", "Fresh2"]
+
+    plan = plan_transfer(ship_grid, targets, loads, {"Fresh1": 1500, "Fresh2": 6000})
+
+    assert plan.complete, plan.messages
+    assert names_on(plan.grid) == names_on(ship_grid) - Counter(targets) + Counter(loads)
+    assert_supported([plan.grid] + [step["grid"] for step in plan.steps])
+    if plan.baseline is not None:
+        assert plan.saved == plan.baseline - plan.seconds
+
+
+def test_transfer_reports_a_missing_container():
+    ship_grid, _ = load_ship("ShipCase1")
+
+    plan = plan_transfer(ship_grid, ["NoSuchContainer"], [], {})
+
+    assert not plan.complete and plan.saved is None
+    assert "Error: Only 0 of 1 containers named 'NoSuchContainer' are on the ship" in plan.messages
+    assert names_on(plan.grid) == names_on(ship_grid)
+    assert_supported([plan.grid])